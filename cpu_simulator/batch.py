@@ -0,0 +1,202 @@
+# cpu_simulator/batch.py
+"""
+Birden çok .gtu programını süreç havuzunda (ProcessPoolExecutor) çalıştırır.
+
+Her program ayrı bir işçi süreçte mevcut BIOS (load_and_parse_gtu_program) ve CPU
+sınıflarıyla yüklenip kendi döngü bütçesiyle çalıştırılır. Trace kapalıdır, PRN
+çıktıları bellekte toplanır (ListDevice). Programlar derlenmiş imaj önbelleği
+(program_image.py, kaynağın yanında .gtu.img) üzerinden yüklenir; aynı programın
+tekrar çalıştırılmasında metin yeniden ayrıştırılmaz (--no-cache ile kapatılır).
+--stream ile önbellek yerine .gtu dosyası tek geçişte akış olarak yüklenir
+(bios.stream_gtu_program); büyük programlarda segment listeleri hiç kurulmaz.
+Sonuçlar tek bir tablo olarak döner: durma durumu, IE, son PC/SP, PRN çıktısı, süre.
+
+Kullanım:
+    python batch.py tests/ "variants/*.gtu" -c 5000 --budget os_plus_threads.gtu=20000 -j 8
+    python batch.py tests/ --json > results.json
+    python batch.py big/*.gtu --stream
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from bios import load_and_parse_gtu_program, stream_gtu_program
+from cpu import CPU
+from devices import ListDevice
+from program_image import load_program
+from tracing import TraceSink
+
+DEFAULT_CYCLES = 1000  # main.py ile aynı varsayılan
+
+# program: dosya yolu, halted: CPU durdu mu, ie: memory[3], pc/sp: son değerler,
+# cycles: çalıştırılan döngü, prn: SYSCALL_PRN değerleri, wall: yükleme + çalıştırma süresi (sn),
+# error: yükleme/çalıştırma istisnası (yoksa None), log: CPU'nun konsola yazdığı mesajlar
+BatchResult = namedtuple("BatchResult", "program halted ie pc sp cycles prn wall error log")
+
+
+def find_programs(patterns: Sequence[str]) -> List[str]:
+    """Dizin, glob veya dosya yollarını sıralı ve tekrarsız .gtu dosya listesine çevirir."""
+    programs: List[str] = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "*.gtu"))
+        elif glob.has_magic(pattern):
+            matches = glob.glob(pattern)
+        else:
+            matches = [pattern]
+        programs.extend(sorted(matches))
+    return list(dict.fromkeys(programs))
+
+
+def run_program(path: str,
+                max_cycles: Optional[int] = DEFAULT_CYCLES,
+                use_blocks: bool = False,
+                use_cache: bool = True,
+                fast_forward: bool = False,
+                stream: bool = False) -> BatchResult:
+    """Tek bir programı yükleyip çalıştırır (işçi süreçte çağrılır)."""
+    log = io.StringIO()
+    start = time.perf_counter()
+    cpu = None
+    prn = ListDevice()
+    cycles = 0
+    error = None
+    with contextlib.redirect_stdout(log):
+        try:
+            cpu = CPU(trace=TraceSink(enabled=False), prn_device=prn)
+            if stream:
+                cpu.load_program_stream(stream_gtu_program(path))
+            elif use_cache:
+                cpu.load_program_image(load_program(path))
+            else:
+                data_segment, instruction_segment = load_and_parse_gtu_program(path)
+                if data_segment is None or instruction_segment is None:
+                    raise ValueError(f"Program yüklenemedi: {path}")
+                cpu.load_program_to_memory(data_segment, instruction_segment)
+            engine = cpu
+            if use_blocks:
+                from blocks import BlockEngine
+                engine = BlockEngine(cpu)
+            if fast_forward:
+                from idle import IdleFastForward
+                engine = IdleFastForward(cpu, engine)
+            result = engine.run(max_cycles=max_cycles)
+            cycles = result.cycles
+        except Exception as e:  # Bir programın hatası tüm batch'i durdurmasın
+            error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - start
+    if cpu is None:
+        return BatchResult(path, False, 0, 0, 0, cycles, [], wall, error, log.getvalue())
+    return BatchResult(path, cpu.is_halted, cpu.instructions_executed, cpu.pc, cpu.sp,
+                       cycles, prn.values(), wall, error, log.getvalue())
+
+
+def _budget_for(path: str, budgets: Dict[str, int], default_cycles: Optional[int]) -> Optional[int]:
+    """Bütçe tam yol veya dosya adıyla eşleştirilir."""
+    if path in budgets:
+        return budgets[path]
+    return budgets.get(os.path.basename(path), default_cycles)
+
+
+def run_batch(programs: Sequence[str],
+              *,
+              budgets: Optional[Dict[str, int]] = None,
+              default_cycles: Optional[int] = DEFAULT_CYCLES,
+              jobs: Optional[int] = None,
+              use_blocks: bool = False,
+              use_cache: bool = True,
+              fast_forward: bool = False,
+              stream: bool = False) -> List[BatchResult]:
+    """
+    Programları jobs işçili bir süreç havuzunda çalıştırır; sonuçlar programs sırasıyla döner.
+    jobs=None -> os.cpu_count(), jobs=1 -> havuz kurulmadan bu süreçte çalıştırılır.
+    """
+    budgets = budgets or {}
+    cycle_budgets = [_budget_for(p, budgets, default_cycles) for p in programs]
+    if jobs == 1 or len(programs) <= 1:
+        return [run_program(p, c, use_blocks, use_cache, fast_forward, stream) for p, c in zip(programs, cycle_budgets)]
+    workers = min(jobs or os.cpu_count() or 1, len(programs))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        n = len(programs)
+        return list(pool.map(run_program, programs, cycle_budgets, [use_blocks] * n, [use_cache] * n,
+                             [fast_forward] * n, [stream] * n))
+
+
+def format_table(results: Sequence[BatchResult], prn_limit: int = 8) -> str:
+    """Sonuçları sabit genişlikli bir tabloya çevirir; PRN çıktısı prn_limit değerde kesilir."""
+    header = ("PROGRAM", "HALTED", "IE", "PC", "SP", "CYCLES", "WALL(s)", "PRN")
+    rows = []
+    for r in results:
+        if r.error is not None:
+            prn = r.error
+        else:
+            shown = " ".join(map(str, r.prn[:prn_limit]))
+            prn = f"[{len(r.prn)}] {shown}" + (" ..." if len(r.prn) > prn_limit else "")
+        rows.append((r.program, "yes" if r.halted else "no", str(r.ie), str(r.pc), str(r.sp),
+                     str(r.cycles), f"{r.wall:.3f}", prn))
+    widths = [max(len(row[i]) for row in rows + [header]) for i in range(len(header) - 1)]
+    lines = []
+    for row in [header] + rows:
+        cells = [cell.ljust(width) for cell, width in zip(row, widths)]
+        lines.append("  ".join(cells + [row[-1]]))
+    return "\n".join(lines)
+
+
+def _parse_budget(text: str):
+    name, sep, cycles = text.rpartition("=")
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"Geçersiz bütçe '{text}', beklenen: program.gtu=DÖNGÜ")
+    try:
+        return name, int(cycles)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Geçersiz döngü sayısı: {cycles}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Birden çok .gtu programını paralel çalıştırır.")
+    parser.add_argument("paths", nargs="+", help="dizin, glob veya .gtu dosyası")
+    parser.add_argument("-c", "--cycles", type=int, default=DEFAULT_CYCLES,
+                        help=f"program başına varsayılan döngü bütçesi (varsayılan {DEFAULT_CYCLES})")
+    parser.add_argument("--budget", type=_parse_budget, action="append", default=[],
+                        metavar="PROGRAM=DÖNGÜ", help="tek bir program için döngü bütçesi (tekrarlanabilir)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="işçi süreç sayısı (varsayılan: çekirdek sayısı)")
+    parser.add_argument("--jit", action="store_true", help="BlockEngine ile çalıştır")
+    parser.add_argument("--fast-forward", action="store_true",
+                        help="tüm thread'ler bloklandığında OS'nin bekleme döngüsünü atla (idle.py)")
+    parser.add_argument("--no-cache", action="store_true", help="derlenmiş program imajı önbelleğini kullanma")
+    parser.add_argument("--stream", action="store_true",
+                        help=".gtu dosyasını tek geçişte akış olarak yükle (önbellek kullanılmaz)")
+    parser.add_argument("--json", action="store_true", help="sonuçları JSON olarak yaz")
+    args = parser.parse_args(argv)
+
+    programs = find_programs(args.paths)
+    if not programs:
+        print("Hiç .gtu programı bulunamadı.", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    results = run_batch(programs, budgets=dict(args.budget), default_cycles=args.cycles,
+                        jobs=args.jobs, use_blocks=args.jit, use_cache=not args.no_cache,
+                        fast_forward=args.fast_forward, stream=args.stream)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps([r._asdict() for r in results], indent=2))
+    else:
+        print(format_table(results))
+        total_ie = sum(r.ie for r in results)
+        print(f"\n{len(results)} program, {elapsed:.3f} sn, toplam {total_ie} komut ({total_ie / elapsed:.0f} komut/sn)")
+    return 1 if any(r.error is not None for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
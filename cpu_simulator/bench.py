@@ -0,0 +1,467 @@
+# cpu_simulator/bench.py
+"""
+Yorumlayıcı, BIOS ve OS iş yükleri için benchmark paketi.
+
+Üç grup ölçülür:
+
+    micro – her komut (SET, CPY, CPYI, CPYI2, ADD, ADDI, SUBI, JIF, PUSH/POP, CALL/RET,
+            SYSCALL_PRN/YIELD/HLT) için, o komutun açılmış (unrolled) kopyalarından oluşan
+            bir USER modu döngüsü. Syscall'lar en küçük OS handler'ı (USER 2) ile döner.
+    os    – os_plus_threads.gtu (3 thread) ve ondan üretilen 10 / N thread'li programlar.
+            Üretilen programlarda her thread os_plus_threads'in bubble sort thread'inin
+            (3000-3999) kendi 1000'lik bölgesine taşınmış kopyasıdır; OS tablo tabanlı,
+            round robin bir zamanlayıcıdır (PRN ve YIELD thread'i Ready olarak bırakır).
+    parse – sentetik büyük .gtu dosyasında load_and_parse_gtu_program ve stream_gtu_program.
+
+Her benchmark --repeat kez çalıştırılır ve en iyi süre raporlanır (komut/sn veya MB/sn).
+Tepe bellek kullanımı ayrı bir çalıştırmada tracemalloc ile ölçülür (--no-memory ile kapatılır).
+Sonuçlar -o ile JSON olarak kaydedilir; --baseline verilirse her sonuç kayıtlı değerle
+karşılaştırılır ve --threshold'dan fazla yavaşlama/bellek artışı gerileme sayılır
+(çıkış kodu 1).
+
+Kullanım:
+    python bench.py -o baseline.json
+    python bench.py --baseline baseline.json --threshold 0.10
+    python bench.py --only micro os --jit --threads 40
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque, namedtuple
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from bios import load_and_parse_gtu_program, stream_gtu_program
+from cpu import CPU
+from devices import PrnDevice
+from tcb import DEFAULT_TCB_LAYOUT
+from tracing import TraceSink
+
+OS_PROGRAM = Path(__file__).with_name("os_plus_threads.gtu")
+GROUPS = ("micro", "os", "parse")
+MIN_SAMPLE_SECONDS = 0.1
+MICRO_MEMORY_CYCLES = 20_000  # micro döngülerinde bellek kullanımı ilk turlardan sonra sabittir
+
+# name: benchmark adı, group: micro/os/parse, metric: "ips" veya "mb_s" (büyük olan iyi),
+# value: en iyi çalıştırmanın hızı, work: komut veya bayt sayısı, seconds: en iyi süre,
+# peak_bytes: tracemalloc tepe değeri (ölçülmediyse None)
+BenchResult = namedtuple("BenchResult", "name group metric value work seconds peak_bytes")
+
+# Program: data [(adres, değer)], instructions [(adres, komut)], memory_size, beklenen PRN sayısı
+Program = namedtuple("Program", "data instructions memory_size prn_count")
+
+
+class _CountingDevice(PrnDevice):
+    """PRN kayıtlarını yalnızca sayar (çıktı maliyeti ölçüme karışmasın)."""
+
+    def __init__(self) -> None:
+        super().__init__(batch_size=1)
+        self.count = 0
+
+    def write(self, record) -> None:
+        self.count += 1
+
+
+# --- micro ---
+
+# Döngü USER modunda 1000'den başlar; işlenen hücreler 1500-1515, alt program 1900'dedir.
+_MICRO_COUNTER = 1500
+_MICRO_ZERO = 1501
+_MICRO_UNROLL = 16
+
+# komut adı -> (tekrar birimi, birim kaç kez açılır)
+MICRO_BODIES = {
+    "SET": (["SET 7, 1510"], _MICRO_UNROLL),
+    "CPY": (["CPY 1511, 1510"], _MICRO_UNROLL),
+    "CPYI": (["CPYI 1512, 1510"], _MICRO_UNROLL),
+    "CPYI2": (["CPYI2 1512, 1513"], _MICRO_UNROLL),
+    "ADD": (["ADD 1510, 1"], _MICRO_UNROLL),
+    "ADDI": (["ADDI 1510, 1511"], _MICRO_UNROLL),
+    "SUBI": (["SUBI 1511, 1510"], _MICRO_UNROLL),
+    "JIF": (["JIF 1515, 1000"], _MICRO_UNROLL),
+    "PUSH/POP": (["PUSH 1511", "POP 1510"], _MICRO_UNROLL // 2),
+    "CALL/RET": (["CALL 1900"], _MICRO_UNROLL // 2),
+    "SYSCALL_PRN": (["SYSCALL_PRN 1511"], _MICRO_UNROLL // 2),
+    "SYSCALL_YIELD": (["SYSCALL_YIELD"], _MICRO_UNROLL // 2),
+    "SYSCALL_HLT": (["SYSCALL_HLT"], 1),  # handler dönüş adresini bilmez, tek kopya
+}
+
+
+def micro_program(name: str, instructions: int) -> Program:
+    """name komutunun yaklaşık instructions komut çalıştıran döngü programını üretir."""
+    unit, unroll = MICRO_BODIES[name]
+    body = unit * unroll
+    per_iteration = len(body) + 3  # gövde + ADD, JIF, JIF
+    if name == "CALL/RET":
+        per_iteration += unroll     # her CALL bir RET çalıştırır
+    elif name.startswith("SYSCALL_"):
+        per_iteration += unroll     # her syscall bir handler komutu (USER) çalıştırır
+    iterations = max(1, instructions // per_iteration)
+
+    data = [(0, 200), (1, 1990), (11, 300), (12, 400), (13, 500), (15, 1),
+            (17, 1001), (18, 1000),
+            (_MICRO_COUNTER, iterations), (_MICRO_ZERO, 0),
+            (1510, 0), (1511, 1), (1512, 1511), (1513, 1514), (1515, 1)]
+    code = [(200, "USER 18"),    # thread 1 olarak USER modunda 1000'e geç
+            (300, "USER 17"),    # SYSCALL_HLT: 1001'den devam
+            (400, "USER 2"),     # SYSCALL_YIELD: memory[2] = dönüş adresi
+            (500, "USER 2"),     # SYSCALL_PRN
+            (1900, "RET")]
+    address = 1000
+    for text in body:
+        code.append((address, text))
+        address += 1
+    exit_address = address + 3
+    code.extend([(address, f"ADD {_MICRO_COUNTER}, -1"),
+                 (address + 1, f"JIF {_MICRO_COUNTER}, {exit_address}"),
+                 (address + 2, f"JIF {_MICRO_ZERO}, 1000"),
+                 (exit_address, "HLT")])
+    prn_count = iterations * unroll if name == "SYSCALL_PRN" else 0
+    return Program(data, code, 11000, prn_count)
+
+
+# --- os ---
+
+_THREAD_SOURCE = (3000, 4000)   # os_plus_threads'te bubble sort thread'inin bölgesi
+_TCB_TABLE = 400                # tid -> TCB adresi tablosu
+_KERNEL_STACK_FLOOR = 900       # OS yığını (990'dan aşağı) için ayrılan alanın altı
+# 10'dan sonraki her thread tabloda 1, TCB alanında 7 hücre kullanır
+MAX_OS_THREADS = 10 + (_KERNEL_STACK_FLOOR - (_TCB_TABLE + 11)) // 8
+
+# Üretilen OS'nin sabit hücreleri (scheduler ve handler'lar CPYI/CPYI2 ile kullanır).
+# 62: taranacak thread sayısı, 63/67: adres hesabı, 64: TCB adresi, 66: karşılaştırma,
+# 68: thread durumu, 72: thread PC'si; 70..78 CPYI2 için işaretçi/sabit çiftleri.
+_OS_CONSTANTS = [(70, 1), (71, 70), (73, 2), (74, 1), (75, 76), (76, 0), (77, 78), (78, 3)]
+
+_OS_CODE = """\
+200: SET 1, 16
+201: JIF 15, 220
+202: HLT
+220: SET {threads}, 62
+221: JIF 62, 202
+222: ADD 62, -1
+223: CPY 16, 63
+224: ADD 63, {table}
+225: CPYI 63, 64
+226: ADD 16, 1
+227: CPY 16, 66
+228: SET {threads}, 65
+229: SUBI 65, 66
+230: ADD 66, 1
+231: JIF 66, 240
+232: CPY 64, 67
+233: ADD 67, 1
+234: CPYI 67, 68
+235: JIF 68, 250
+236: JIF 15, 221
+240: SET 1, 16
+241: JIF 15, 232
+250: CPYI 64, 15
+251: CPYI2 71, 67
+252: CPY 64, 67
+253: ADD 67, 3
+254: CPYI 67, 1
+255: CPY 64, 67
+256: ADD 67, 2
+257: CPYI 67, 72
+258: USER 72
+300: CPY 15, 63
+301: ADD 63, {table}
+302: CPYI 63, 64
+303: SET 0, 15
+304: CPY 64, 67
+305: ADD 67, 2
+306: CPYI2 73, 67
+307: CPY 64, 67
+308: ADD 67, 3
+309: CPYI2 74, 67
+310: CPY 64, 67
+311: ADD 67, 1
+312: CPYI2 75, 67
+313: JIF 15, 220
+320: CPY 15, 63
+321: ADD 63, {table}
+322: CPYI 63, 64
+323: SET 0, 15
+324: CPY 64, 67
+325: ADD 67, 1
+326: CPYI2 77, 67
+327: JIF 15, 220
+"""
+
+
+def _relocate(text: str, offset: int) -> str:
+    """Komuttaki thread bölgesi adreslerini offset kadar kaydırır."""
+    parts = text.split()
+    low, high = _THREAD_SOURCE
+    args = []
+    for arg in parts[1:]:
+        value = int(arg.rstrip(","))
+        args.append(str(value + offset if low <= value < high else value))
+    return f"{parts[0]} {', '.join(args)}" if args else parts[0]
+
+
+def os_plus_threads_program() -> Program:
+    with contextlib.redirect_stdout(io.StringIO()):
+        data, instructions = load_and_parse_gtu_program(OS_PROGRAM)
+    return Program(data, instructions, 11000, 9)
+
+
+def generate_os_program(threads: int) -> Program:
+    """
+    threads adet bubble sort thread'i çalıştıran programı üretir. Thread 1-10 CPU'nun
+    varsayılan TCB düzenini (tcb.DEFAULT_TCB_LAYOUT) kullanır; sonrakilerin TCB'leri tablonun
+    arkasına dizilir.
+    """
+    if threads < 1:
+        raise ValueError("threads must be >= 1")
+    bases = {tid: base for tid, base in DEFAULT_TCB_LAYOUT.bases.items() if tid <= threads}
+    extra = _TCB_TABLE + threads + 1
+    for tid in range(11, threads + 1):
+        bases[tid] = extra + 7 * (tid - 11)
+    if max(bases.values()) + 7 > _KERNEL_STACK_FLOOR:
+        raise ValueError(f"too many threads ({threads}) for the kernel area")
+
+    source_data, source_code = os_plus_threads_program()[:2]
+    low, high = _THREAD_SOURCE
+    thread_data = [(a, v) for a, v in source_data if low <= a < high]
+    thread_code = [(a, text) for a, text in source_code if low <= a < high]
+
+    data = [(0, 200), (1, 990), (11, 320), (12, 300), (13, 300), (15, 0), (16, 1)]
+    data.extend(_OS_CONSTANTS)
+    code = []
+    for line in _OS_CODE.format(threads=threads, table=_TCB_TABLE).splitlines():
+        address, text = line.split(":", 1)
+        code.append((int(address), text.strip()))
+    for tid in range(threads + 1):
+        base = bases[tid]
+        data.append((_TCB_TABLE + tid, base))
+        data.extend([(base, tid), (base + 1, 0 if tid else 1)])
+        if tid == 0:
+            continue
+        offset = tid * 1000 - low
+        data.extend([(base + 2, low + offset), (base + 3, low + offset + 990)])
+        for a, v in thread_data:
+            data.append((a + offset, v + offset if low <= v < high else v))
+        code.extend((a + offset, _relocate(text, offset)) for a, text in thread_code)
+    return Program(data, code, (threads + 1) * 1000, 5 * threads)
+
+
+# --- ölçüm ---
+
+def _prepare(program: Program, jit: bool):
+    with contextlib.redirect_stdout(io.StringIO()):
+        cpu = CPU(memory_size=program.memory_size, trace=TraceSink(enabled=False), prn_device=_CountingDevice())
+        cpu.load_program_to_memory(program.data, program.instructions)
+    if jit:
+        from blocks import BlockEngine
+        return cpu, BlockEngine(cpu).run
+    return cpu, cpu.run
+
+
+def _execute(name: str, program: Program, jit: bool, max_cycles: Optional[int] = None):
+    cpu, runner = _prepare(program, jit)
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        result = runner(max_cycles=max_cycles)
+    complete = max_cycles is None
+    if log.getvalue() or (complete and cpu.prn_device.count != program.prn_count):
+        raise RuntimeError(f"{name}: program did not run as expected "
+                           f"(PRN {cpu.prn_device.count}/{program.prn_count}) {log.getvalue().strip()}")
+    return result.instructions, result.elapsed
+
+
+def _peak(func) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_program(name: str, group: str, program: Program, *, repeat: int = 3, jit: bool = False,
+                  measure_memory: bool = True, memory_cycles: Optional[int] = None) -> BenchResult:
+    """
+    Programı repeat kez çalıştırır ve en iyi süreyi alır; yükleme süresi ölçüme dahil değildir.
+    Kısa programlar bir ölçümde en az MIN_SAMPLE_SECONDS sürecek kadar art arda çalıştırılır.
+    Tepe bellek, tracemalloc yavaş olduğu için memory_cycles verilirse o kadar döngüyle ölçülür.
+    """
+    instructions, elapsed = _execute(name, program, jit)
+    rounds = max(1, int(MIN_SAMPLE_SECONDS / max(elapsed, 1e-6)) + 1) if elapsed < MIN_SAMPLE_SECONDS else 1
+    best = None
+    for _ in range(repeat):
+        total = 0.0
+        for _ in range(rounds):
+            instructions, elapsed = _execute(name, program, jit)
+            total += elapsed
+        best = total if best is None else min(best, total)
+    work = instructions * rounds
+    peak = _peak(lambda: _execute(name, program, jit, memory_cycles)) if measure_memory else None
+    return BenchResult(name, group, "ips", work / best, work, best, peak)
+
+
+def write_synthetic_gtu(path, size_bytes: int) -> int:
+    """Yaklaşık size_bytes boyutunda geçerli bir .gtu dosyası yazar; gerçek boyutu döndürür."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# sentetik benchmark programı\nBegin Data Section\n    0 = 200\n    1 = 990\n")
+        address = 20000
+        while f.tell() < size_bytes // 2:
+            f.write("".join(f"    {a} = {a % 997}          # veri\n" for a in range(address, address + 1000)))
+            address += 1000
+        f.write("End Data Section\nBegin Instruction Section\n")
+        while f.tell() < size_bytes:
+            f.write("".join(f"{a}: ADD {a - 1}, 1      # komut\n" for a in range(address, address + 1000)))
+            address += 1000
+        f.write("End Instruction Section\n")
+        return f.tell()
+
+
+def bench_parse(name: str, path, *, repeat: int = 3, measure_memory: bool = True) -> BenchResult:
+    size = os.path.getsize(path)
+    if name == "parse.stream":
+        def parse():
+            deque(stream_gtu_program(path), maxlen=0)
+    else:
+        def parse():
+            load_and_parse_gtu_program(path)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    peak = _peak(parse) if measure_memory else None
+    return BenchResult(name, "parse", "mb_s", size / best / 1e6, size, best, peak)
+
+
+def run_benchmarks(groups=GROUPS, *, repeat: int = 3, jit: bool = False, threads: int = 32,
+                   micro_instructions: int = 100_000, parse_mb: float = 4.0,
+                   measure_memory: bool = True, progress=None) -> List[BenchResult]:
+    results = []
+
+    def add(result):
+        results.append(result)
+        if progress is not None:
+            progress(result)
+
+    if "micro" in groups:
+        for name in MICRO_BODIES:
+            add(bench_program(f"micro.{name}", "micro", micro_program(name, micro_instructions),
+                              repeat=repeat, jit=jit, measure_memory=measure_memory,
+                              memory_cycles=MICRO_MEMORY_CYCLES))
+    if "os" in groups:
+        workloads = [("os.threads3", os_plus_threads_program()), ("os.threads10", generate_os_program(10))]
+        if threads not in (3, 10):
+            workloads.append((f"os.threads{threads}", generate_os_program(threads)))
+        for name, program in workloads:
+            add(bench_program(name, "os", program, repeat=repeat, jit=jit, measure_memory=measure_memory))
+    if "parse" in groups:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "synthetic.gtu")
+            write_synthetic_gtu(path, int(parse_mb * 1e6))
+            for name in ("parse.list", "parse.stream"):
+                add(bench_parse(name, path, repeat=repeat, measure_memory=measure_memory))
+    return results
+
+
+# --- rapor ve karşılaştırma ---
+
+def to_json(results, **meta) -> dict:
+    meta.setdefault("python", platform.python_version())
+    meta.setdefault("platform", platform.platform())
+    return {"meta": meta, "results": {r.name: r._asdict() for r in results}}
+
+
+def compare(results, baseline: dict, threshold: float) -> Dict[str, List[str]]:
+    """
+    Sonuçları baseline JSON'uyla karşılaştırır. {ad: [gerileme açıklamaları]} döndürür;
+    hız (value) threshold oranından fazla düştüyse veya tepe bellek o kadar arttıysa gerilemedir.
+    """
+    regressions = {}
+    stored = baseline.get("results", {})
+    for r in results:
+        old = stored.get(r.name)
+        if old is None:
+            continue
+        problems = []
+        if r.value < old["value"] * (1 - threshold):
+            problems.append(f"{r.metric} {old['value']:.0f} -> {r.value:.0f} ({r.value / old['value'] - 1:+.1%})")
+        if r.peak_bytes is not None and old.get("peak_bytes"):
+            # Küçük değerlerde tracemalloc gürültüsü gerileme sayılmasın (64 KB tolerans)
+            if r.peak_bytes > old["peak_bytes"] * (1 + threshold) + 65536:
+                problems.append(f"peak {old['peak_bytes']} -> {r.peak_bytes} bytes")
+        if problems:
+            regressions[r.name] = problems
+    return regressions
+
+
+def format_result(r: BenchResult, baseline: Optional[dict] = None) -> str:
+    unit = "komut/sn" if r.metric == "ips" else "MB/sn"
+    peak = "-" if r.peak_bytes is None else f"{r.peak_bytes / 1024:.0f} KB"
+    line = f"{r.name:<20} {r.value:>14,.0f} {unit:<8} {r.seconds:>9.4f} sn  tepe {peak:>10}"
+    old = (baseline or {}).get("results", {}).get(r.name)
+    if old is not None:
+        line += f"  ({r.value / old['value'] - 1:+.1%})"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GTU-C312 simülatörü benchmark paketi.")
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=list(GROUPS), help="çalıştırılacak gruplar")
+    parser.add_argument("--repeat", type=int, default=3, help="her benchmark kaç kez çalışsın (en iyisi alınır)")
+    parser.add_argument("--jit", action="store_true", help="programları BlockEngine ile çalıştır")
+    parser.add_argument("--threads", type=int, default=32, help="üretilen OS iş yükündeki thread sayısı")
+    parser.add_argument("--micro-instructions", type=int, default=100_000,
+                        help="micro benchmark başına yaklaşık komut sayısı")
+    parser.add_argument("--parse-mb", type=float, default=4.0, help="sentetik .gtu dosyasının boyutu (MB)")
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc ile tepe bellek ölçme")
+    parser.add_argument("-o", "--output", help="sonuçları bu JSON dosyasına yaz")
+    parser.add_argument("--baseline", help="karşılaştırılacak JSON sonuç dosyası")
+    parser.add_argument("--threshold", type=float, default=0.10, help="gerileme eşiği (oran, varsayılan 0.10)")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be >= 1")
+    if not 1 <= args.threads <= MAX_OS_THREADS:
+        parser.error(f"--threads must be between 1 and {MAX_OS_THREADS}")
+
+    baseline = None
+    engine = "blocks" if args.jit else "run"
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        stored_engine = baseline.get("meta", {}).get("engine")
+        if stored_engine is not None and stored_engine != engine:
+            print(f"Uyarı: baseline '{stored_engine}' motoruyla, bu çalıştırma '{engine}' ile ölçülüyor.")
+
+    results = run_benchmarks(args.only, repeat=args.repeat, jit=args.jit, threads=args.threads,
+                             micro_instructions=args.micro_instructions, parse_mb=args.parse_mb,
+                             measure_memory=not args.no_memory,
+                             progress=lambda r: print(format_result(r, baseline), flush=True))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(to_json(results, engine=engine, repeat=args.repeat), f, indent=2)
+        print(f"Sonuçlar yazıldı: {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark gerilemiş (eşik {args.threshold:.0%}):")
+            for name, problems in regressions.items():
+                print(f"  {name}: {'; '.join(problems)}")
+            return 1
+        print(f"\nGerileme yok (eşik {args.threshold:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
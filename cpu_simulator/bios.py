@@ -13,12 +13,14 @@ Key features vs. previous implementation
 5. **Code/Data overlap check** – raises ValueError before returning if an address is defined in both segments.
 6. **Sorted output**           – output lists are ascending by address for deterministic loading.
 7. **Verbose diagnostics**     – precise file & line info in all warnings/errors.
+8. **Streaming mode**          – stream_gtu_program yields records in one pass with flag‑map checks.
+9. **Text input**              – parse_gtu_text parses program text that is not in a file.
 
 © 2025 – Helper rewrite for ChatGPT user.
 """
 from __future__ import annotations
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterable, Iterator, List, Tuple
 
 DataSeg  = List[Tuple[int, int]]
 InstrSeg = List[Tuple[int, str]]
@@ -39,25 +41,20 @@ def _warn(msg: str) -> None:
     print(f"BIOS Warning: {msg}")
 
 
-def load_and_parse_gtu_program(filepath: str | Path,
-                               *,
-                               allow_overlap: bool = False) -> Tuple[DataSeg, InstrSeg]:
-    """Parse the given .gtu file, returning (data_segment, instruction_segment).
+_SEEN_DATA = 1
+_SEEN_CODE = 2
+_FLAG_MAP_LIMIT = 1 << 26  # addresses beyond this (or negative) fall back to a dict
 
-    Raises FileNotFoundError or ValueError on severe problems unless handled
-    by caller. When *allow_overlap* is False (default), encountering the same
-    address in both data and code sections aborts with ValueError.
-    """
-    fp = Path(filepath)
-    if not fp.is_file():
-        raise FileNotFoundError(fp)
 
-    data_map: dict[int, int] = {}
-    code_map: dict[int, str] = {}
+def _iter_records(fp: str | Path, lines: Iterable[str]) -> Iterator[Tuple[bool, int, int | str]]:
+    """Yield (is_code, addr, value) for every well‑formed DATA/CODE line in file order.
 
+    Section markers are consumed here; malformed lines are reported with
+    _warn and skipped. Duplicate and overlap handling is left to the caller.
+    """
     in_data = in_code = False
 
-    for line_no, raw in enumerate(fp.read_text().splitlines(), start=1):
+    for line_no, raw in enumerate(lines, start=1):
         stripped = _strip_comment(raw).strip()
         if not stripped:
             continue  # blank or full‑line comment
@@ -93,10 +90,7 @@ def load_and_parse_gtu_program(filepath: str | Path,
             except ValueError:
                 _warn(f"Non‑integer data at {fp}:{line_no}: '{raw.strip()}'")
                 continue
-            if addr in data_map:
-                _warn(f"Duplicate data addr {addr} – keeping first value ({data_map[addr]}), ignoring {val}")
-                continue
-            data_map[addr] = val
+            yield False, addr, val
             continue
 
         # --- CODE line ---
@@ -114,15 +108,52 @@ def load_and_parse_gtu_program(filepath: str | Path,
             if not instr:
                 _warn(f"Empty instruction at {fp}:{line_no}")
                 continue
-            if addr in code_map:
-                _warn(f"Duplicate instruction addr {addr} – keeping first instruction '{code_map[addr]}', ignoring '{instr}'")
-                continue
-            code_map[addr] = instr
+            yield True, addr, instr
             continue
 
         # If we reach here, line is outside any recognised section
         _warn(f"Line outside section at {fp}:{line_no}: '{raw.strip()}'")
 
+
+def load_and_parse_gtu_program(filepath: str | Path,
+                               *,
+                               allow_overlap: bool = False) -> Tuple[DataSeg, InstrSeg]:
+    """Parse the given .gtu file, returning (data_segment, instruction_segment).
+
+    Raises FileNotFoundError or ValueError on severe problems unless handled
+    by caller. When *allow_overlap* is False (default), encountering the same
+    address in both data and code sections aborts with ValueError.
+    """
+    fp = Path(filepath)
+    if not fp.is_file():
+        raise FileNotFoundError(fp)
+    return parse_gtu_text(fp.read_text(), source=fp, allow_overlap=allow_overlap)
+
+
+def parse_gtu_text(text: str,
+                   *,
+                   source: str | Path = "<text>",
+                   allow_overlap: bool = False) -> Tuple[DataSeg, InstrSeg]:
+    """Parse .gtu program text that is already in memory (e.g. received over a socket).
+
+    Same result and diagnostics as load_and_parse_gtu_program; *source* is only
+    used in warning messages in place of the file name.
+    """
+    data_map: dict[int, int] = {}
+    code_map: dict[int, str] = {}
+
+    for is_code, addr, value in _iter_records(source, text.splitlines()):
+        if is_code:
+            if addr in code_map:
+                _warn(f"Duplicate instruction addr {addr} – keeping first instruction '{code_map[addr]}', ignoring '{value}'")
+                continue
+            code_map[addr] = value
+        else:
+            if addr in data_map:
+                _warn(f"Duplicate data addr {addr} – keeping first value ({data_map[addr]}), ignoring {value}")
+                continue
+            data_map[addr] = value
+
     # ---------- Post‑processing ----------
     overlap = set(data_map).intersection(code_map)
     if overlap and not allow_overlap:
@@ -133,6 +164,68 @@ def load_and_parse_gtu_program(filepath: str | Path,
     return data_segment, instr_segment
 
 
+def stream_gtu_program(filepath: str | Path,
+                       *,
+                       allow_overlap: bool = False) -> Iterator[Tuple[int, int | str]]:
+    """Single‑pass streaming variant of load_and_parse_gtu_program.
+
+    Reads the file line by line and yields (address, value) records in file
+    order: *value* is an int for DATA lines and an upper‑cased instruction
+    string for CODE lines. Only a compact per‑address flag map is kept (two
+    bits used per address), so memory use does not grow with the number of
+    lines and there is no sort pass.
+
+    Differences from the list‑based loader:
+      * duplicate warnings cannot quote the first value (it is not stored);
+      * an overlap raises ValueError when the second definition is reached,
+        after earlier records have already been yielded;
+      * with *allow_overlap* the instruction wins, matching the load order of
+        load_program_to_memory (data first, then code).
+
+    Feed the generator straight into CPU.load_program_stream(records).
+    """
+    fp = Path(filepath)
+    if not fp.is_file():
+        raise FileNotFoundError(fp)
+
+    # Two flag bits per address (_SEEN_DATA / _SEEN_CODE) in one bytearray,
+    # grown on demand; one lookup per record covers duplicates and overlaps.
+    seen = bytearray()
+    seen_other: dict[int, int] = {}
+
+    with fp.open() as lines:
+        for is_code, addr, value in _iter_records(fp, lines):
+            if 0 <= addr < _FLAG_MAP_LIMIT:
+                if addr >= len(seen):
+                    seen.extend(bytes(max(addr + 1 - len(seen), len(seen))))
+                flags = seen[addr]
+            else:
+                flags = seen_other.get(addr, 0)
+
+            if is_code:
+                if flags & _SEEN_CODE:
+                    _warn(f"Duplicate instruction addr {addr} – keeping first instruction, ignoring '{value}'")
+                    continue
+                if flags & _SEEN_DATA and not allow_overlap:
+                    raise ValueError(f"Overlapping DATA/CODE addresses detected: [{addr}]")
+                new_flags = flags | _SEEN_CODE
+            else:
+                if flags & _SEEN_DATA:
+                    _warn(f"Duplicate data addr {addr} – keeping first value, ignoring {value}")
+                    continue
+                if flags & _SEEN_CODE and not allow_overlap:
+                    raise ValueError(f"Overlapping DATA/CODE addresses detected: [{addr}]")
+                new_flags = flags | _SEEN_DATA
+
+            if 0 <= addr < _FLAG_MAP_LIMIT:
+                seen[addr] = new_flags
+            else:
+                seen_other[addr] = new_flags
+            if flags & _SEEN_CODE:
+                continue  # allow_overlap: instruction already loaded and wins
+            yield addr, value
+
+
 # Optional self‑test when run directly ---------------------------------------------------------
 if __name__ == "__main__":
     import argparse, sys
@@ -0,0 +1,399 @@
+# cpu_simulator/blocks.py
+"""
+Temel blok (basic block) derleyicisi ve yürütme motoru.
+
+CPU.run() her komut için fetch + dispatch + handler çağrısı yapar. Bubble sort ve
+linear search thread'lerinin iç döngüleri gibi düz (dallanmasız) komut dizilerinde bu
+maliyet baskındır. BlockEngine, komut deposundan (load_program_to_memory'nin
+load_and_parse_gtu_program çıktısından doldurduğu code) düz blokları bulur ve sıcak
+blokları tek bir Python fonksiyonuna derler (üretilen kaynak + compile()).
+
+Blok sınırları:
+    - JIF blokta son komut olarak derlenir (dallanma sonucu bloğun dönüş değeridir).
+    - CALL, RET, USER, SYSCALL_*, HLT ve memory[0]'a (PC) dokunan her komut bloğu
+      bitirir; bunlar yorumlanır.
+    - Komut hücresine yazan (veya komut hücresinden kopyalayan) komutlar derlenmez.
+
+Derlenmiş blok dışındaki komutlar (örn. OS'nin CALL/RET/SYSCALL yolları) CPU.run() ile
+aynı hızlı döngüde (CPU._run_until_hot) yorumlanır. Sıcaklık sıçrama hedeflerinde ve blok
+çıkışlarında sayılır; döngü yalnızca sıcak (derlenmiş ya da derlenecek) bir hedefte motora
+döner. İlk komutu derlenemeyen adresler bir kez "soğuk" olarak işaretlenir: bunlara yapılan
+sıçramalar sayılmaz.
+
+Blok fonksiyonu IE'yi (memory[3]) ve o anki thread'in UsedIE alanını toplu günceller.
+Bu sayaçları okuyan/yazan bir komuttan (örn. OS'nin CPY 3, 70'i) hemen önce sayaçlar
+senkronlanır; memory[15]'e yazan bir komuttan sonra UsedIE'nin yazılacağı TCB yeniden
+çözülür. Böylece bellek her gözlemlenebilir noktada run_cycle() ile birebir aynıdır.
+
+Adres kontrolleri CPU'nun o anki erişim haritasına (mpu.py) göre derleme anında yapılır;
+bloklar harita başına ayrı tutulur (KERNEL, USER ya da izole thread başına bir tablo).
+Dolaylı erişimler (CPYI, CPYI2 ve PUSH/POP'un yığın adresi) çalışma anında aynı haritayla
+kontrol edilir; geçersiz/korumalı adres, komut hücresi, sayaç adresi (ya da yazılacaksa
+memory[15]) görülürse blok o komuttan önce çıkar ve komut yorumlanır (hata mesajları ve
+durdurma davranışı böylece değişmez). ADD/ADDI/SUBI sonucu
+bir bellek kelimesine (signed 64-bit) sığmazsa da blok o komuttan önce çıkar; taşmayı
+yorumlayıcı raporlar. Sığmayan sabitli SET derlenmez.
+
+Komut deposu her değiştiğinde Memory.code_version artar; motor sürüm değiştiğinde
+Memory.code_changes() ile değişen hücreleri alır ve yalnızca o hücrelere bağlı blokları
+(komutları veya sabit adresli işlenenleri o hücrede olanları) ve soğuk işaretlerini atar
+(self-modifying kod desteği). Değişiklik kaydı yetmezse tüm bloklar atılır.
+
+Kullanım:
+    engine = BlockEngine(cpu)
+    result = engine.run(max_cycles=100000)   # CPU.run() ile aynı RunResult
+"""
+from __future__ import annotations
+import time
+from collections import namedtuple
+from typing import Dict, Optional, Set
+
+from cpu import CPU, RunResult
+from memory import WORD_MAX, WORD_MIN
+from mpu import AccessMap
+
+# Blok içinde derlenebilen komutlar (JIF yalnızca son komut olabilir)
+_STRAIGHT_LINE = ("SET", "CPY", "CPYI", "CPYI2", "ADD", "ADDI", "SUBI", "PUSH", "POP")
+_BRANCH = "JIF"
+
+# start: ilk komut adresi, length: komut sayısı, func: derlenmiş fonksiyon, source: üretilen kaynak,
+# cells: derlenmiş komutların ve sabit adresli işlenenlerinin hücreleri (bu hücreler değişirse blok atılır)
+Block = namedtuple("Block", "start length func source cells")
+
+
+class BlockEngine:
+    """CPU'yu derlenmiş temel bloklarla çalıştırır.
+
+    *hot_threshold*    – bir adrese bu kadar kez sıçrandıktan (veya bir bloktan oraya
+                         çıkıldıktan) sonra oradaki blok derlenir (1 -> hemen). Bir bloğun
+                         derlenmesi ~100 µs sürer; eşik bunu geri kazanmayacak kısa ömürlü
+                         kodu yorumlamada bırakır.
+    *max_block_length* – tek bir blokta derlenecek en fazla komut sayısı.
+    """
+
+    def __init__(self, cpu: CPU, *, hot_threshold: int = 64, max_block_length: int = 64) -> None:
+        if hot_threshold < 1:
+            raise ValueError("hot_threshold must be >= 1")
+        if max_block_length < 1:
+            raise ValueError("max_block_length must be >= 1")
+        self.cpu = cpu
+        self.hot_threshold = hot_threshold
+        self.max_block_length = max_block_length
+
+        # Alt sınıf bir komutu yeniden tanımladıysa o komut derlenmez, yorumlanır.
+        table = type(cpu).OPCODES
+        self._names = {
+            op.code: name for name, op in table.items()
+            if name in _STRAIGHT_LINE + (_BRANCH,) and op.handler is CPU.OPCODES[name].handler
+        }
+        # Erişim haritası başına ayrı blok tabloları: pc -> Block. Haritalar koruma nesnesinde
+        # önbelleklenir; yalnızca bölge listesi tutar, hash'lenebilirdir. Soğuk (derlenemeyen)
+        # adresler ve sıcaklık sayaçları haritalar arasında ortaktır: syscall/USER geçişlerinde
+        # yorumlama döngüsü harita değişti diye motora dönmez.
+        self._blocks: Dict[AccessMap, Dict[int, Block]] = {}
+        self._cold: Set[int] = set()
+        self._heat: Dict[int, int] = {}
+        # hücre -> {(harita, pc): Block ya da None (soğuk)}; hücre değişince bu kayıtlar atılır
+        self._owners: Dict[int, Dict[tuple, Optional[Block]]] = {}
+        self.invalidate()
+
+        self.compiled_blocks = 0
+        self.block_cycles = 0
+        self.interpreted_cycles = 0
+
+    def invalidate(self) -> None:
+        """Derlenmiş tüm blokları atar ve CPU'nun TCB düzenini yeniden okur."""
+        self._blocks.clear()
+        self._cold.clear()
+        self._heat.clear()
+        self._owners.clear()
+        self._version = self.cpu.memory.code_version
+        # thread id -> UsedIE adresi (CPU'nun yüklemede çözdüğü tablo); IE ve UsedIE
+        # adresleri blok içinde senkron noktasıdır.
+        self._used_ie = self.cpu._used_ie_index
+        self._counters = frozenset(self._used_ie.values()) | {CPU.REG_INSTR_EXECUTED}
+
+    def _refresh(self) -> None:
+        """Komut deposunda değişen hücrelere bağlı blokları ve soğuk işaretlerini atar."""
+        memory = self.cpu.memory
+        changes = memory.code_changes(self._version)
+        if changes is None:
+            self.invalidate()
+            return
+        self._version = memory.code_version
+        owners = self._owners
+        for address in changes:
+            for (access, start), block in owners.pop(address, {}).items():
+                if block is None:
+                    self._cold.discard(start)
+                elif self._blocks[access].get(start) is block:
+                    del self._blocks[access][start]
+
+    def _install(self, start: int, access: AccessMap) -> Optional[Block]:
+        """start adresini derler; derlenemezse soğuk işaretler. Bloğu (veya None) döndürür."""
+        block = self.compile(start, access)
+        if block is None:
+            self._cold.add(start)
+            cells = (start,)
+        else:
+            self._blocks[access][start] = block
+            cells = block.cells
+        key = (access, start)
+        for cell in cells:
+            self._owners.setdefault(cell, {})[key] = block
+        return block
+
+    # --- yürütme ---
+    def run(self, max_cycles=None, deadline=None, stop=None) -> RunResult:
+        """
+        CPU.run() ile aynı sözleşme: durana veya bir sınıra ulaşana kadar çalıştırır.
+
+        max_cycles tam olarak uygulanır (kalan bütçeye sığmayan blok yorumlanır).
+        deadline ve stop blok sınırlarında ve yorumlanan her komuttan önce kontrol edilir.
+        CPU'da olay abonesi (add_hook) varsa her komut CPU.run() ile yorumlanır.
+        """
+        cpu = self.cpu
+        if cpu._hooks:
+            return cpu.run(max_cycles, deadline, stop)  # Olay aboneleri varken bloklar derlenmez
+        memory = cpu.memory
+        data = cpu._data
+        code = cpu._code
+        if memory.code_version != self._version or self._used_ie is not cpu._used_ie_index:
+            self.invalidate()
+        used_of = self._used_ie.get
+        step = cpu.step
+        run_until_hot = cpu._run_until_hot
+        cold = self._cold
+        heat = self._heat
+        hot_threshold = self.hot_threshold
+        check_interval = cpu.DEADLINE_CHECK_INTERVAL
+        perf_counter = time.perf_counter
+
+        limit = max_cycles if max_cycles is not None else -1
+        start_ie = data[CPU.REG_INSTR_EXECUTED]
+        start = perf_counter()
+        cycles = 0
+        block_cycles = 0
+        next_deadline_check = 0
+        reason = "halted"
+        access = None  # tablolar erişim haritası değiştiğinde yeniden seçilir
+
+        while not cpu.is_halted:
+            if cycles == limit:
+                reason = "max_cycles"
+                break
+            if deadline is not None and cycles >= next_deadline_check:
+                next_deadline_check = cycles + check_interval
+                if perf_counter() >= deadline:
+                    reason = "deadline"
+                    break
+            if stop is not None and stop(cpu):
+                reason = "stop"
+                break
+            if memory.code_version != self._version:
+                self._refresh()
+                used_of = self._used_ie.get
+                access = None
+
+            pc = data[0]
+            if cpu._access is not access:
+                access = cpu._access
+                blocks = self._blocks.setdefault(access, {})
+            block = blocks.get(pc)
+            if block is None and pc not in cold:
+                # Derlenen adresin sayacı eşikte kalır: yorumlanan kod oraya sıçrayınca motora döner
+                count = heat.get(pc, 0) + 1
+                heat[pc] = count
+                if count >= hot_threshold:
+                    block = self._install(pc, access)
+
+            if block is not None:
+                if limit < 0 or block.length <= limit - cycles:
+                    next_pc, executed = block.func(data, code, used_of)
+                    data[0] = next_pc
+                    cycles += executed
+                    block_cycles += executed
+                    if executed == block.length:
+                        continue
+                    # Blok bir komuttan önce çıktı; o komut yorumlanır.
+            else:
+                # Derlenmemiş komutlar hızlı döngüde, sıcak bir sıçrama hedefine gelene kadar
+                stopped, executed = run_until_hot(cold, heat, hot_threshold,
+                                                  limit - cycles if limit >= 0 else -1, deadline, stop)
+                cycles += executed
+                if stopped == "deadline" or stopped == "stop":
+                    reason = stopped
+                    break
+                continue
+
+            step()
+            cycles += 1
+
+        elapsed = perf_counter() - start
+        self.block_cycles += block_cycles
+        self.interpreted_cycles += cycles - block_cycles
+        return RunResult(reason, cycles, data[CPU.REG_INSTR_EXECUTED] - start_ie, elapsed)
+
+    # --- derleme ---
+    def compile(self, start: int, access: Optional[AccessMap] = None) -> Optional[Block]:
+        """
+        start adresinden başlayan bloğu access erişim haritasıyla (varsayılan: CPU'nun
+        o anki haritası) derler; ilk komut derlenemiyorsa None döndürür. Tek komutluk blok
+        da (max_block_length 1 değilse) None döner: motor turu o komutu yorumlamaktan
+        ucuz değildir.
+        """
+        if access is None:
+            access = self.cpu._access
+        source, length, cells = self._translate(start, access)
+        if length == 0 or length < 2 <= self.max_block_length:
+            return None
+        namespace = {}
+        exec(compile(source, f"<block {start}>", "exec"), {"COUNTERS": self._counters, "HOLES": access.holes}, namespace)
+        self.compiled_blocks += 1
+        return Block(start, length, namespace["block"], source, cells)
+
+    def _translate(self, start, access):
+        """Bloğun Python kaynağını, komut sayısını ve bağlı olduğu hücreleri üretir."""
+        code = self.cpu._code
+        # memory[0] (PC) blok içinde okunmaz/yazılmaz; diğer adresler haritada izinli olmalı
+        allowed = lambda a: a >= 1 and a in access
+        low, high = max(access.low, 1), access.high
+        counters = self._counters
+        tid_address = 15
+        sp_address = CPU.REG_SP
+
+        def outside(var, write=False):
+            # Çalışma anında bilinen adres için yorumlayıcıya bırakma koşulu
+            condition = f"not ({low} <= {var} < {high}) or {var} in HOLES or {var} in code or {var} in COUNTERS"
+            return condition + (f" or {var} == {tid_address}" if write else "")
+
+        body = []
+        cells = set()
+        ie_done = 0    # IE'si belleğe yazılmış komut sayısı
+        used_done = 0  # UsedIE'si belleğe yazılmış komut sayısı
+        next_pc = start
+        pc = start
+        n = 0
+
+        def flush(ie_to, used_to, indent="    "):
+            lines = []
+            if ie_to > ie_done:
+                lines.append(f"{indent}data[3] += {ie_to - ie_done}")
+            if used_to > used_done:
+                lines.append(f"{indent}if u >= 0: data[u] += {used_to - used_done}")
+            elif used_to < used_done:  # Senkronlanmış ama yürütülmeden çıkılan komut geri alınır
+                lines.append(f"{indent}if u >= 0: data[u] -= {used_done - used_to}")
+            return lines
+
+        while n < self.max_block_length:
+            entry = code.get(pc)
+            if entry is None or pc not in access:  # Korumalı adresten fetch yorumlanır (hata verir)
+                break
+            _, (opcode_id, operands, error) = entry
+            name = self._names.get(opcode_id)
+            if error is not None or name is None:
+                break
+
+            if name == "SET":
+                if not WORD_MIN <= operands[0] <= WORD_MAX:
+                    break  # Sığmayan sabit; yorumlayıcı raporlar
+                reads, writes = (), (operands[1],)
+            elif name == "CPY" or name == "CPYI":
+                reads, writes = (operands[0],), (operands[1],)
+            elif name == "CPYI2":
+                reads, writes = operands, ()
+            elif name == "PUSH":
+                reads, writes = operands, ()
+            elif name == "POP":
+                if operands[0] == sp_address:
+                    break  # SP'ye POP: sonraki SP += 1 taşabilir; yorumlanır
+                reads, writes = (), operands
+            elif name == "ADD":
+                reads, writes = (operands[0],), (operands[0],)
+            elif name == "ADDI":
+                reads, writes = operands, (operands[0],)
+            elif name == "SUBI":
+                reads, writes = operands, (operands[1],)
+            else:  # JIF
+                reads, writes = (operands[0],), ()
+            touched = reads + writes
+            if any(not allowed(a) or a in code for a in touched):
+                break
+            if name in ("CPYI", "CPYI2") and any(a in counters for a in touched):
+                break  # İşaretçi okunmadan önce sayaçların senkronlanması gerekirdi; yorumlanır.
+
+            lines = [f"    # {pc}: {name} {', '.join(map(str, operands))}"]
+            if name == "CPYI":
+                # Kaynak adres çalışma anında bilinir; olağan dışı durumlar yorumlayıcıya kalır.
+                pointer, dest = operands
+                lines.append(f"    a = data[{pointer}]")
+                lines.append(f"    if {outside('a')}:")
+                lines.extend(flush(n, n, "        "))
+                lines.append(f"        return {pc}, {n}")
+            elif name == "CPYI2":
+                lines.append(f"    a = data[{operands[0]}]")
+                lines.append(f"    b = data[{operands[1]}]")
+                lines.append(f"    if {outside('a')} or {outside('b', write=True)}:")
+                lines.extend(flush(n, n, "        "))
+                lines.append(f"        return {pc}, {n}")
+            elif name == "PUSH" or name == "POP":
+                # Yığın adresi çalışma anında bilinir
+                lines.append(f"    s = data[{sp_address}]" + (" - 1" if name == "PUSH" else ""))
+                lines.append(f"    if {outside('s', write=name == 'PUSH')}:")
+                lines.extend(flush(n, n, "        "))
+                lines.append(f"        return {pc}, {n}")
+            if any(a in counters for a in touched):
+                lines.extend(flush(n, n + 1))
+                ie_done, used_done = n, n + 1
+
+            if name == "SET":
+                lines.append(f"    data[{operands[1]}] = {operands[0]}")
+            elif name == "CPY":
+                lines.append(f"    data[{operands[1]}] = data[{operands[0]}]")
+            elif name == "CPYI":
+                lines.append(f"    data[{operands[1]}] = data[a]")
+            elif name == "CPYI2":
+                lines.append("    data[b] = data[a]")
+            elif name == "PUSH":
+                lines.append(f"    data[{sp_address}] = s")
+                lines.append(f"    data[s] = data[{operands[0]}]")
+            elif name == "POP":
+                lines.append(f"    data[{operands[0]}] = data[s]")
+                lines.append(f"    data[{sp_address}] = s + 1")
+            elif name in ("ADD", "ADDI", "SUBI"):
+                if name == "ADD":
+                    dest, value = operands[0], f"data[{operands[0]}] + {operands[1]}"
+                elif name == "ADDI":
+                    dest, value = operands[0], f"data[{operands[0]}] + data[{operands[1]}]"
+                else:
+                    dest, value = operands[1], f"data[{operands[0]}] - data[{operands[1]}]"
+                lines.append(f"    v = {value}")
+                lines.append(f"    if not {WORD_MIN} <= v <= {WORD_MAX}:")
+                lines.extend(flush(n, n, "        "))
+                lines.append(f"        return {pc}, {n}")
+                lines.append(f"    data[{dest}] = v")
+            else:
+                lines.append(f"    next_pc = {operands[1]} if data[{operands[0]}] <= 0 else {pc + 1}")
+
+            if tid_address in writes:
+                # Bu komutun UsedIE'si eski thread'e yazılır, sonrakiler yeni thread'e.
+                lines.extend(flush(0, n + 1))
+                used_done = max(used_done, n + 1)
+                lines.append(f"    u = used_of(data[{tid_address}], -1)")
+
+            body.extend(lines)
+            cells.add(pc)
+            cells.update(touched)
+            n += 1
+            pc += 1
+            next_pc = pc
+            if name == _BRANCH:
+                next_pc = "next_pc"
+                break
+
+        source = ["def block(data, code, used_of):",
+                  f"    u = used_of(data[{tid_address}], -1)"]
+        source.extend(body)
+        source.extend(flush(n, n))
+        source.append(f"    return {next_pc}, {n}")
+        return "\n".join(source) + "\n", n, frozenset(cells)
@@ -0,0 +1,340 @@
+# cpu_simulator/checkpoint.py
+"""
+CPU durumunun diskteki ikili checkpoint formatı ve periyodik checkpoint alma.
+
+Dosya düzeni (tüm başlık alanları little-endian):
+
+    0   8s   MAGIC  b"GTUCKPT\\0"
+    8   H    format sürümü (CHECKPOINT_VERSION)
+    10  H    bayraklar: 1 = USER modu, 2 = CPU durmuş, 4 = kelimeler big-endian
+    12  I    kelime boyutu (bayt, 8)
+    16  Q    bellek boyutu (kelime sayısı)
+    24  Q    komut kaydı sayısı
+    32  ...  bellek kelimeleri (bellek boyutu x 8 bayt, makinenin bayt sırasıyla)
+    ...      komut kayıtları: her biri <QI (adres, uzunluk) + UTF-8 komut string'i
+
+Veri bölümü 8 bayt hizalıdır; CheckpointView dosyayı mmap ile açar ve kelimeleri
+kopyalamadan memoryview olarak verir. load_checkpoint() tek bir buffer kopyasıyla
+CPU.restore() için bir Snapshot üretir. Komutlar string olarak saklanır ve geri
+yüklenirken CPU'nun komut tablosuyla yeniden çözülür.
+
+Kullanım:
+    save_checkpoint(cpu, "run.ckpt")
+    cpu.restore(load_checkpoint("run.ckpt"))
+
+    python checkpoint.py run os_plus_threads.gtu --every 500 --dir ckpts
+    python checkpoint.py resume ckpts/ie_0000001500.ckpt -c 10000
+    python checkpoint.py info ckpts/ie_0000001500.ckpt
+
+MappedMemory aynı formatta bir dosyayı CPU'nun belleği olarak kullanır: kelimeler dosyaya
+mmap ile eşlenir, böylece çalışan bir makine `info` ile izlenebilir ve yeniden açılabilir.
+
+    cpu = CPU(memory=MappedMemory("run.mem", 11000))
+"""
+from __future__ import annotations
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Callable, Iterator, Optional, Tuple
+
+from cpu import CPU, Snapshot
+from memory import WORD_TYPECODE, ViewMemory
+
+MAGIC = b"GTUCKPT\0"
+CHECKPOINT_VERSION = 1
+_HEADER = struct.Struct("<8sHHIQQ")
+_CODE_RECORD = struct.Struct("<QI")
+
+FLAG_USER_MODE = 1
+FLAG_HALTED = 2
+FLAG_BIG_ENDIAN = 4
+
+_WORD_SIZE = array(WORD_TYPECODE).itemsize
+
+
+def save_checkpoint(source, path: str) -> None:
+    """CPU'yu veya bir Snapshot'ı path'e yazar (önce geçici dosyaya, sonra yerine taşır)."""
+    snapshot = source.snapshot() if isinstance(source, CPU) else source
+    data = snapshot.data if isinstance(snapshot.data, array) else array(WORD_TYPECODE, snapshot.data)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_header(snapshot.mode, snapshot.is_halted, len(data), len(snapshot.code)))
+        data.tofile(f)
+        _write_code(f, snapshot.code)
+    os.replace(tmp_path, path)
+
+
+def _header(mode: str, is_halted: bool, memory_size: int, code_count: int) -> bytes:
+    flags = 0
+    if mode == "USER":
+        flags |= FLAG_USER_MODE
+    if is_halted:
+        flags |= FLAG_HALTED
+    if sys.byteorder == "big":
+        flags |= FLAG_BIG_ENDIAN
+    return _HEADER.pack(MAGIC, CHECKPOINT_VERSION, flags, _WORD_SIZE, memory_size, code_count)
+
+
+def _write_code(f, code) -> None:
+    """Komut kayıtlarını adres sırasıyla yazar; code değerleri string veya (string, çözülmüş)."""
+    for address in sorted(code):
+        entry = code[address]
+        text = (entry if isinstance(entry, str) else entry[0]).encode("utf-8")
+        f.write(_CODE_RECORD.pack(address, len(text)))
+        f.write(text)
+
+
+class CheckpointView:
+    """
+    Bir checkpoint dosyasını mmap ile salt okunur açar.
+
+    words – bellek kelimeleri üzerinde kopyasız memoryview ('q'); örn. view.words[3] IE'dir.
+            mmap'e bağlı olduğu için close()'dan önce bırakılmalıdır (del veya release()).
+    mode, is_halted, memory_size – başlık bilgileri.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # boş dosya
+            self._file.close()
+            raise ValueError(f"{path}: not a GTU checkpoint")
+        try:
+            self._parse_header()
+        except ValueError:
+            self.close()
+            raise
+
+    def _parse_header(self) -> None:
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"{self.path}: not a GTU checkpoint")
+        magic, version, flags, word_size, memory_size, code_count = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path}: not a GTU checkpoint")
+        if version != CHECKPOINT_VERSION:
+            raise ValueError(f"{self.path}: unsupported checkpoint version {version} (expected {CHECKPOINT_VERSION})")
+        if word_size != _WORD_SIZE:
+            raise ValueError(f"{self.path}: word size {word_size} does not match {_WORD_SIZE}")
+        self.mode = "USER" if flags & FLAG_USER_MODE else "KERNEL"
+        self.is_halted = bool(flags & FLAG_HALTED)
+        self.swapped = bool(flags & FLAG_BIG_ENDIAN) != (sys.byteorder == "big")
+        self.memory_size = memory_size
+        self.code_count = code_count
+        self._data_start = _HEADER.size
+        self._code_start = self._data_start + memory_size * word_size
+        if len(self._map) < self._code_start:
+            raise ValueError(f"{self.path}: truncated checkpoint")
+        self._view = memoryview(self._map)
+
+    @property
+    def words(self) -> memoryview:
+        if self.swapped:
+            raise ValueError(f"{self.path}: checkpoint byte order differs from this machine; use snapshot()")
+        return self._view[self._data_start:self._code_start].cast(WORD_TYPECODE)
+
+    def code(self) -> Iterator[Tuple[int, str]]:
+        """(adres, komut_string) kayıtlarını dosyadan sırayla okur."""
+        offset = self._code_start
+        for _ in range(self.code_count):
+            address, length = _CODE_RECORD.unpack_from(self._map, offset)
+            offset += _CODE_RECORD.size
+            yield address, bytes(self._view[offset:offset + length]).decode("utf-8")
+            offset += length
+
+    def snapshot(self) -> Snapshot:
+        """Dosyadaki durumu CPU.restore() ile yüklenebilecek bir Snapshot'a kopyalar."""
+        data = array(WORD_TYPECODE, bytes(self.memory_size * _WORD_SIZE))
+        with memoryview(data) as target:
+            target.cast("B")[:] = self._view[self._data_start:self._code_start]
+        if self.swapped:
+            data.byteswap()
+        return Snapshot(data, dict(self.code()), self.mode, self.is_halted)
+
+    def close(self) -> None:
+        if self._map is not None:
+            if hasattr(self, "_view"):
+                self._view.release()
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+    def __enter__(self) -> "CheckpointView":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class MappedMemory(ViewMemory):
+    """
+    Bellek kelimeleri bir dosyaya mmap ile eşlenir (data, dosya üzerinde bir memoryview('q')).
+    Dosya checkpoint formatındadır; çalışma sürerken başka bir süreç CheckpointView veya
+    `python checkpoint.py info` ile okuyabilir. Süreç çökse de son bellek durumu diskte kalır.
+
+    *path* – bellek dosyası; yoksa *size* kelimelik sıfır bellekle oluşturulur, varsa
+             yeniden açılır (size verilirse dosyadakiyle aynı olmalıdır).
+
+    Komut deposu ve başlıktaki mod/durma bayrakları sync() (ve close()) ile yazılır;
+    yeniden açılan dosyanın durumu cpu.restore(memory.state()) ile CPU'ya alınır.
+    """
+
+    def __init__(self, path: str, size: Optional[int] = None,
+                 decode: Optional[Callable[[str], tuple]] = None) -> None:
+        self.path = path
+        self.mode, self.is_halted = "KERNEL", False
+        code = {}
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with CheckpointView(path) as view:
+                if view.swapped:
+                    raise ValueError(f"{path}: memory file byte order differs from this machine")
+                if size is not None and size != view.memory_size:
+                    raise ValueError(f"{path}: memory size {view.memory_size} does not match {size}")
+                size, self.mode, self.is_halted = view.memory_size, view.mode, view.is_halted
+                code = dict(view.code())
+        elif size is None:
+            raise ValueError(f"{path}: size is required to create a memory file")
+        else:
+            with open(path, "wb") as f:
+                f.write(_header(self.mode, self.is_halted, size, 0))
+                f.truncate(_HEADER.size + size * _WORD_SIZE)
+
+        self._data_end = _HEADER.size + size * _WORD_SIZE
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), self._data_end)
+        self._view = memoryview(self._map)
+        super().__init__(self._view[_HEADER.size:self._data_end].cast(WORD_TYPECODE), code, decode)
+
+    def state(self) -> Snapshot:
+        """Dosyadaki durum (bellek kopyalanmaz); CPU.restore() ile yüklenir."""
+        return Snapshot(self._words, dict(self.code), self.mode, self.is_halted)
+
+    # --- dosya ---
+    def sync(self, mode: Optional[str] = None, is_halted: Optional[bool] = None) -> None:
+        """Komut deposunu ve başlığı (mod, durma) dosyaya yazar ve eşlemeyi diske boşaltır."""
+        if mode is not None:
+            self.mode = mode
+        if is_halted is not None:
+            self.is_halted = bool(is_halted)
+        f = self._file
+        f.seek(self._data_end)
+        _write_code(f, self.code)
+        f.truncate()
+        f.flush()
+        self._map[:_HEADER.size] = _header(self.mode, self.is_halted, self.size, len(self.code))
+        self._map.flush()
+
+    def close(self) -> None:
+        """sync() yapar ve dosyayı kapatır; CPU bu bellekle artık çalıştırılamaz."""
+        if self._map is None:
+            return
+        self.sync()
+        self.data = None
+        self._words.release()
+        self._view.release()
+        self._map.close()
+        self._file.close()
+        self._map = None
+
+
+def load_checkpoint(path: str) -> Snapshot:
+    """Checkpoint dosyasını okuyup Snapshot döndürür."""
+    with CheckpointView(path) as view:
+        return view.snapshot()
+
+
+def checkpoint_path(directory: str, ie: int) -> str:
+    return os.path.join(directory, f"ie_{ie:010d}.ckpt")
+
+
+def run_with_checkpoints(cpu, every: int, directory: str, *, max_cycles: Optional[int] = None, runner=None):
+    """
+    CPU'yu every döngülük parçalar halinde çalıştırır ve her parçadan sonra
+    directory/ie_<IE>.ckpt dosyasına checkpoint yazar. runner verilmezse cpu.run,
+    verilirse aynı imzalı bir run (örn. BlockEngine(cpu).run) kullanılır.
+    Döngü başına ek maliyet yoktur. (son RunResult'ın nedeni, toplam döngü, yazılan dosyalar) döner.
+    """
+    if every < 1:
+        raise ValueError("every must be >= 1")
+    runner = runner or cpu.run
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    cycles = 0
+    reason = "halted"
+    while not cpu.is_halted:
+        budget = every if max_cycles is None else min(every, max_cycles - cycles)
+        if budget <= 0:
+            reason = "max_cycles"
+            break
+        result = runner(max_cycles=budget)
+        cycles += result.cycles
+        path = checkpoint_path(directory, cpu.instructions_executed)
+        save_checkpoint(cpu, path)
+        written.append(path)
+        reason = result.reason
+        if reason not in ("max_cycles", "halted"):
+            break
+    return reason, cycles, written
+
+
+def _make_cpu(jit: bool):
+    from blocks import BlockEngine
+    from devices import FileDevice
+    from tracing import TraceSink
+    cpu = CPU(trace=TraceSink("instructions_output.txt", mode="a"), prn_device=FileDevice("output.txt"))
+    return cpu, (BlockEngine(cpu).run if jit else cpu.run)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GTU-C312 checkpoint araçları.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_p = sub.add_parser("run", help="programı checkpoint alarak çalıştır")
+    run_p.add_argument("program")
+    resume_p = sub.add_parser("resume", help="checkpoint'ten devam et")
+    resume_p.add_argument("checkpoint")
+    for p in (run_p, resume_p):
+        p.add_argument("-c", "--cycles", type=int, default=None, help="en fazla döngü (varsayılan: durana kadar)")
+        p.add_argument("--every", type=int, default=0, help="her N döngüde checkpoint al (0: alma)")
+        p.add_argument("--dir", default="checkpoints", help="checkpoint dizini")
+        p.add_argument("--jit", action="store_true", help="BlockEngine ile çalıştır")
+    info_p = sub.add_parser("info", help="checkpoint başlığını yazdır")
+    info_p.add_argument("checkpoint")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        with CheckpointView(args.checkpoint) as view:
+            words = view.snapshot().data if view.swapped else view.words
+            print(f"{args.checkpoint}: memory={view.memory_size} code={view.code_count} "
+                  f"mode={view.mode} halted={view.is_halted} PC={words[0]} SP={words[1]} IE={words[3]}")
+            del words
+        return 0
+
+    cpu, runner = _make_cpu(args.jit)
+    try:
+        if args.command == "run":
+            from bios import load_and_parse_gtu_program
+            data_segment, instruction_segment = load_and_parse_gtu_program(args.program)
+            cpu.load_program_to_memory(data_segment, instruction_segment)
+        else:
+            cpu.restore(load_checkpoint(args.checkpoint))
+            print(f"Checkpoint yüklendi: {args.checkpoint} (IE={cpu.instructions_executed}, PC={cpu.pc})")
+        if args.every:
+            reason, cycles, written = run_with_checkpoints(cpu, args.every, args.dir,
+                                                           max_cycles=args.cycles, runner=runner)
+            print(f"{len(written)} checkpoint yazıldı: {args.dir}")
+        else:
+            result = runner(max_cycles=args.cycles)
+            reason, cycles = result.reason, result.cycles
+        print(f"Durum: {reason}, {cycles} döngü, IE={cpu.instructions_executed}, PC={cpu.pc}, SP={cpu.sp}")
+    finally:
+        cpu.trace.close()
+        cpu.prn_device.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,42 @@
 # cpu_simulator/cpu.py
-import sys
+import time
+from collections import namedtuple
+from devices import FileDevice, PrnRecord
+from hooks import EVENTS as HOOK_EVENTS, SYSCALLS, memory_effects
+from memory import Memory
+from mpu import MemoryProtection
+from tcb import DEFAULT_TCB_LAYOUT, TcbLayout
+
+# Kelimeye (signed 64-bit) sığmayan bir yazma: array('q') OverflowError, memoryview ValueError verir
+_WORD_ERRORS = (OverflowError, ValueError)
+
+# Komut tablosu kaydı: code -> dispatch listesindeki indeks, arity -> beklenen argüman sayısı
+Opcode = namedtuple("Opcode", "code name arity handler")
+
+def opcode(name, arity):
+    """CPU metodunu verilen isim ve argüman sayısıyla komut tablosuna kaydeder."""
+    def mark(func):
+        func.opcode_spec = (name, arity)
+        return func
+    return mark
+
+class RunResult(namedtuple("RunResult", "reason cycles instructions elapsed")):
+    """
+    CPU.run() sonucu.
+    reason: "halted", "max_cycles", "deadline" veya "stop" (durdurma koşulu sağlandı)
+    cycles: çalıştırılan döngü sayısı, instructions: bu çalışmada artan IE (memory[3])
+    """
+    __slots__ = ()
 
-class MultiWriter:
-    def __init__(self, *writers):
-        self.writers = writers
+    @property
+    def ips(self):
+        """Saniyedeki yürütülen komut sayısı."""
+        return self.instructions / self.elapsed if self.elapsed > 0 else 0.0
 
-    def write(self, message):
-        for w in self.writers:
-            w.write(message)
+# CPU.snapshot() çıktısı: data (array kopyası), code ({adres: komut}), mode, is_halted.
+# Trace ve PRN aygıtı dış kaynaklardır, görüntüye dahil edilmez.
+Snapshot = namedtuple("Snapshot", "data code mode is_halted")
 
-    def flush(self):
-        for w in self.writers:
-            w.flush()
 class CPU:
     # ÖZEL BELLEK KONUMLARI (Sabitler olarak tanımlayabiliriz)
     REG_PC = 0
@@ -39,12 +64,64 @@ class CPU:
     # Bu kontrolleri PUSH ve POP içine ekleyeceğiz. OS yüklendiğinde her thread için
     # stack_base ve stack_limit değerlerini ayarlayabilir. Şimdilik genel bir kontrol yapalım.
 
+    # Komut tablosu: {"SET": Opcode(...), ...}. @opcode ile işaretlenen metotlardan doldurulur,
+    # yeni komutlar register_opcode ile eklenebilir (if/elif zincirine dokunmadan).
+    OPCODES = {}
 
-    def __init__(self, memory_size=11000): # Proje dokümanındaki adres aralığını kapsasın
-        # Bellek: Basit bir byte listesi (veya int listesi, sayılarımız long integer olacağı için)
-        # Proje dokümanı sayıların "signed long integers" olduğunu belirtiyor.
-        # Python'ın tamsayıları zaten keyfi hassasiyete sahip olduğu için bu konuda endişelenmemize gerek yok.
-        self.memory = [0] * memory_size
+    @classmethod
+    def register_opcode(cls, name, arity, handler):
+        """
+        Komut tablosuna yeni bir komut ekler (veya mevcut olanı değiştirir).
+        handler(cpu, *operandlar) imzasında olmalı ve bir sonraki PC'yi ya da
+        başarısızlıkta None döndürmelidir. Kayıt, CPU örneği oluşturulmadan önce yapılmalıdır.
+        """
+        if "OPCODES" not in cls.__dict__: # Alt sınıf, üst sınıfın tablosunu değiştirmesin
+            cls.OPCODES = dict(cls.OPCODES)
+        name = name.upper()
+        existing = cls.OPCODES.get(name)
+        code = existing.code if existing is not None else len(cls.OPCODES)
+        cls.OPCODES[name] = Opcode(code, name, arity, handler)
+
+    @classmethod
+    def _register_marked_opcodes(cls):
+        for attr in list(vars(cls).values()):
+            spec = getattr(attr, "opcode_spec", None)
+            if spec is not None:
+                cls.register_opcode(spec[0], spec[1], attr)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._register_marked_opcodes()
+
+
+    def __init__(self, memory_size=11000, trace=None, prn_device=None, memory=None, tcb_layout=None, protection=None): # Proje dokümanındaki adres aralığını kapsasın
+        # Bellek: veri kelimeleri array('q') içinde, komutlar ayrı bir çözülmüş komut deposunda
+        # (memory.py). Proje dokümanı sayıların "signed long integers" olduğunu belirtiyor.
+        # memory verilirse (başka bir bellek gerçeklemesi) memory_size yok sayılır.
+        self.memory = memory if memory is not None else Memory(memory_size)
+        # Komutlar belleğe yazıldığı anda bir kez çözülür: code = {adres: (komut_string, (komut_id, operandlar, hata))}
+        self.memory.decode = self._decode
+        self._bind_memory()
+
+        # Bellek koruması (mpu.py): mod/thread başına izin haritası; verilmezse USER modu
+        # 1000 altına erişemez. Harita yalnızca mod değişirken seçilir (mode özelliği).
+        self._mode = "KERNEL"
+        self.set_protection(protection)
+
+        # TCB düzeni (tcb.py): program yüklenirken veri bölümündeki tanımlayıcıdan veya
+        # yükleyici seçeneğinden çözülür; tanımlanmamışsa bu düzen kullanılır.
+        self._default_tcb_layout = tcb_layout if tcb_layout is not None else DEFAULT_TCB_LAYOUT
+        self.set_tcb_layout(self._default_tcb_layout)
+
+        # Komut id'si -> bu örneğe bağlı handler metodu (sabit zamanlı dispatch)
+        self._dispatch = [None] * len(self.OPCODES)
+        self._opcode_names = [None] * len(self.OPCODES)
+        for op in self.OPCODES.values():
+            self._dispatch[op.code] = op.handler.__get__(self)
+            self._opcode_names[op.code] = op.name
+
+        # Olay aboneleri (hooks.py): {olay: [callback, ...]}, yalnızca abonesi olan olaylar
+        self._hooks = {}
         
         # Bellek Eşlemeli Yazmaçlar (Memory-Mapped Registers)
         # Bu yazmaçlar aslında belleğin ilk birkaç hücresidir.
@@ -61,533 +138,594 @@ class CPU:
         # Şimdilik bunları doğrudan kullanmayabiliriz ama yerleri belli.
         
         # OS'nin syscall handler adreslerini ve yığın sınırlarını başlangıçta
-        # data segmentinde ayarlaması beklenir. Testler için varsayılanlar:
-        self.memory[CPU.MEM_OS_SYSCALL_HLT_HANDLER] = 0 # OS bu adresi kendi HLT handler'ı ile güncellemeli
-        self.memory[CPU.MEM_OS_SYSCALL_YIELD_HANDLER] = 0 # OS bu adresi kendi YIELD handler'ı ile güncellemeli
+        # data segmentinde ayarlaması beklenir. Testler için varsayılanlar (verilen bellek,
+        # örn. yeniden açılan bir bellek dosyası, olduğu gibi kullanılır):
+        if memory is None:
+            self.memory[CPU.MEM_OS_SYSCALL_HLT_HANDLER] = 0 # OS bu adresi kendi HLT handler'ı ile güncellemeli
+            self.memory[CPU.MEM_OS_SYSCALL_YIELD_HANDLER] = 0 # OS bu adresi kendi YIELD handler'ı ile güncellemeli
         
         # Her iplik için yığın sınırları OS tarafından yönetilmeli.
         # Testler için varsayılan SP'yi (memory[1]) kullanacağız.
         # self.current_thread_stack_base = 0 # İpliğin yığın başlangıcı (en yüksek adres)
         # self.current_thread_stack_limit = 0 # İpliğin yığın sonu (en düşük adres)
 
+        # Trace çıktısı (CALL/RET/USER/SYSCALL satırları ve hatalar):
+        # trace verilmezse stdout'a, TraceSink verilirse ona yazılır.
+        self.set_trace(trace)
+
+        # SYSCALL_PRN çıktı aygıtı (devices.py). Verilmezse eskisi gibi output.txt'ye
+        # eklenir; dosya ilk PRN'de bir kez açılır ve her kayıt anında yazılır. Bu varsayılan
+        # aygıt CPU'ya aittir ve close() (veya `with CPU() as cpu:`) ile kapatılır.
+        self._own_prn_device = None
+        if prn_device is None:
+            prn_device = self._own_prn_device = FileDevice("output.txt", batch_size=1)
+        self.prn_device = prn_device
+
         print("GTU-C312 CPU initialized.")
 
+    def close(self):
+        """
+        CPU'nun kendi oluşturduğu PRN aygıtını (varsayılan output.txt) kapatır. Dışarıdan
+        verilen trace ve prn_device çağıranındır, onlara dokunulmaz.
+        """
+        if self._own_prn_device is not None:
+            self._own_prn_device.close()
+            self._own_prn_device = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def set_trace(self, trace):
+        """
+        CPU'nun trace hedefini ayarlar. trace.enabled False ise trace satırları hiç
+        üretilmez; handler'lardaki tek maliyet bir `is not None` kontrolüdür.
+        """
+        self.trace = trace
+        if trace is None:
+            self._trace = print
+        elif trace.enabled:
+            self._trace = trace.write
+        else:
+            self._trace = None
+
+    def add_hook(self, event, callback):
+        """
+        event olayına callback'i abone eder (olaylar ve imzalar için hooks.py).
+        Abone varken run() olay yayan döngüyü kullanır; çalışan bir run() döngüsü
+        sonraki run() çağrısına kadar değişmez.
+        """
+        if event not in HOOK_EVENTS:
+            raise ValueError(f"Unknown hook event '{event}', expected one of {HOOK_EVENTS}")
+        self._hooks.setdefault(event, []).append(callback)
+        return callback
+
+    def remove_hook(self, event, callback):
+        callbacks = self._hooks.get(event, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if not callbacks:
+            self._hooks.pop(event, None)
+
+    def _emit(self, event, *args):
+        for callback in tuple(self._hooks.get(event, ())):
+            callback(self, *args)
+
+    def _report(self, message):
+        """Hata/uyarı mesajları trace kapalı olsa bile kaybolmaz."""
+        if self._trace is not None:
+            self._trace(message)
+        else:
+            print(message)
+
+    def _bind_memory(self):
+        """Handler'ların hızlı erişim için kullandığı bellek depolarını (yeniden) bağlar."""
+        self._data = self.memory.data
+        self._code = self.memory.code
+        self._memory_size = len(self.memory)
+
+    def track_memory_writes(self, enabled=True):
+        """
+        Bellek yazma takibini açar/kapatır (debug modları için). Açıkken
+        memory.take_writes() son çağrıdan beri yazılan adresleri verir.
+        """
+        if enabled:
+            self.memory.enable_write_tracking()
+        else:
+            self.memory.disable_write_tracking()
+        self._bind_memory()
+
+    # Yazmaçlar (adres 0-3) hiçbir zaman komut hücresi olmadığı için doğrudan data'ya erişilir.
     @property
     def pc(self):
-        return self.memory[CPU.REG_PC]
+        return self._data[CPU.REG_PC]
 
     @pc.setter
     def pc(self, value):
-        self.memory[CPU.REG_PC] = value
+        self._data[CPU.REG_PC] = value
 
     @property
     def sp(self):
-        return self.memory[CPU.REG_SP]
+        return self._data[CPU.REG_SP]
 
     @sp.setter
     def sp(self, value):
-        self.memory[CPU.REG_SP] = value
+        self._data[CPU.REG_SP] = value
 
     @property
     def syscall_result(self):
-        return self.memory[CPU.REG_SYSCALL_RESULT]
+        return self._data[CPU.REG_SYSCALL_RESULT]
 
     @syscall_result.setter
     def syscall_result(self, value):
-        self.memory[CPU.REG_SYSCALL_RESULT] = value
+        self._data[CPU.REG_SYSCALL_RESULT] = value
 
     @property
     def instructions_executed(self):
-        return self.memory[CPU.REG_INSTR_EXECUTED]
+        return self._data[CPU.REG_INSTR_EXECUTED]
 
     @instructions_executed.setter
     def instructions_executed(self, value):
-        self.memory[CPU.REG_INSTR_EXECUTED] = value
+        self._data[CPU.REG_INSTR_EXECUTED] = value
     
+    @property
+    def mode(self):
+        return self._mode
+
+    @mode.setter
+    def mode(self, value):
+        # Erişim haritası burada, mod değişirken seçilir: USER'da memory[15]'teki thread'inki.
+        self._mode = value
+        protection = self.protection
+        access = protection.user_map(self._data[15]) if value == "USER" else protection.kernel_map
+        self._access = access
+        self._access_low, self._access_high, self._access_holes = access.low, access.high, access.holes
+
+    def set_protection(self, protection=None):
+        """
+        Bellek koruma haritalarını ayarlar (mpu.MemoryProtection). None -> eski kural
+        (USER modu 1000 altına erişemez). Koruma bellekle aynı boyutta olmalıdır.
+        """
+        if protection is None:
+            protection = MemoryProtection(self._memory_size)
+        elif protection.size != self._memory_size:
+            raise ValueError(f"Protection size {protection.size} does not match memory size {self._memory_size}")
+        self.protection = protection
+        self.mode = self._mode # o anki mod için haritayı yeniden seç
+
+    def _can_access(self, address):
+        """
+        Koruma kuralının tek yeri: adres o anki erişim haritasında mı? Harita mod setter'ında
+        seçilir; burada yalnızca sınırlar ve (varsa) bölgeler arası delikler kontrol edilir.
+        Hata mesajı vermez, ihlali çağıran _fault ile raporlar.
+        """
+        return self._access_low <= address < self._access_high and address not in self._access_holes
+
     def _is_valid_address(self, address, operation_type="access"):
         """Bellek adresinin geçerli olup olmadığını ve erişim haklarını kontrol eder."""
-        #print(f"DEBUG: Checking address {address} for {operation_type}, Mode: {self.mode}")  # EKLE
-    
-        if not (0 <= address < len(self.memory)):
-            print(f"Error: {operation_type.capitalize()} to invalid memory address {address}. Halting.")
-            self.is_halted = True
-            return False
-        
-        if self.mode == "USER" and address < 1000:
-            print(f"Error: USER mode attempted to {operation_type} protected memory address {address}. Thread will be shut down. Halting.")
-            self.is_halted = True # OS bunu daha sofistike yönetecek
-            return False
-        return True
+        if self._can_access(address):
+            return True
+        self._fault(address, operation_type)
+        return False
+
+    def _fault(self, address, operation_type):
+        """
+        Erişim ihlalini raporlar ve CPU'yu durdurur. Handler'lar erişimi izin haritasıyla
+        kendileri kontrol eder; mesaj yalnızca burada, ihlal anında biçimlendirilir.
+        Handler'ın başarısızlık dönüşü için None döndürür.
+        """
+        if not (0 <= address < self._memory_size):
+            self._report(f"Error: {operation_type.capitalize()} to invalid memory address {address}. Halting.")
+        else:
+            self._report(f"Error: USER mode attempted to {operation_type} protected memory address {address}. Thread will be shut down. Halting.")
+        self.is_halted = True # OS bunu daha sofistike yönetecek
+        return None
     
+    def _overflow(self, address, value, operation):
+        """
+        Bellek kelimesine (signed 64-bit, array('q')) sığmayan bir sonucu raporlar ve CPU'yu
+        durdurur; hücre değişmez. _fault gibi handler'ın başarısızlık dönüşü için None döndürür.
+        """
+        self._report(f"Error: {operation} value {value} does not fit in a signed 64-bit word at memory address {address}. Halting.")
+        self.is_halted = True
+        return None
+
     # DEĞİŞTİRİLDİ
     def _fetch(self):
         """
         Program Sayacının (PC) gösterdiği adresten bir sonraki komutu alır.
-        Şimdilik komutların string olarak bellekte saklandığını varsayalım.
-        BIOS yüklerken komutları bu şekilde yerleştirecek.
+        Komutlar bellekte ayrı bir komut deposunda çözülmüş olarak tutulur;
+        memory[pc] komut hücreleri için komut string'ini döndürür.
         """
         instruction_address = self.pc
         # Artık _is_valid_address ile hem sınırları hem de USER mod erişimini kontrol ediyoruz.
         if not self._is_valid_address(instruction_address, "fetch from"): 
              return None
         
-        # Komutlarımızın program dosyasında "KOMUT PARAM1 PARAM2" formatında olacağını varsayıyoruz.
-        # BIOS bunları belleğe string olarak veya ayrıştırılmış bir formatta yükleyebilir.
-        # Şimdilik string olarak tutalım.
         instruction_str = self.memory[instruction_address]
         # print(f"Fetched from addr {instruction_address}: {instruction_str}") # Debug
         return instruction_str
 
+    def _decode(self, instruction_str):
+        """
+        Komut string'ini komut tablosuna (OPCODES) göre (komut_id, operandlar, hata) biçimine çözer.
+        Argüman sayısı ve tamsayı formatı kontrolleri burada, komut başına bir kez yapılır;
+        hatalı bir komut yürütüldüğünde hata mesajı basılır ve CPU durur.
+        """
+        parts = instruction_str.strip().upper().split()
+        if not parts:
+            return None, (), "Warning: Invalid instruction format or empty instruction. Halting."
+        command = parts[0]
+        args = [arg.rstrip(',') for arg in parts[1:]]
+
+        opcode = self.OPCODES.get(command)
+        if opcode is None:
+            return None, (), f"Error: Unknown command '{command}'. Halting."
+        if len(args) != opcode.arity:
+            if opcode.arity == 0:
+                return None, (), f"Error: {command} does not take arguments, got {len(args)}. Halting."
+            plural = "argument" if opcode.arity == 1 else "arguments"
+            return None, (), f"Error: {command} requires {opcode.arity} {plural}, got {len(args)}. Halting."
+        try:
+            operands = tuple(int(arg) for arg in args)
+        except ValueError:
+            return None, (), f"Error: Invalid arguments for {command}: {args}. Halting."
+        return opcode.code, operands, None
+
+    def _decoded_at(self, address, instruction_str):
+        """Adresteki komutun çözülmüş halini komut deposundan verir."""
+        entry = self._code.get(address)
+        # Depo, hücreye yazılan her değerde güncellenir; buraya başka bir string geldiyse çöz.
+        if entry is None or entry[0] is not instruction_str:
+            return self._decode(instruction_str)
+        return entry[1]
+
 # DEĞİŞTİRİLDİ 6 (CPYI2 eklendi, syscall'lar güncellendi, PUSH/POP'a yığın kontrolü eklendi)
     def _decode_execute(self, instruction_str):
         """
         Alınan komut string'ini çözer ve yürütür.
-        CPYI2 eklendi.
-        SYSCALL'lar OS'ye tipini ve sonucunu/parametrelerini bildirecek şekilde güncellendi.
-        PUSH/POP komutlarına temel yığın sınırı kontrolleri eklendi.
-        SYSCALL_HLT ve SYSCALL_YIELD OS handler'larına PC'yi yönlendiriyor.
+        Komut, OPCODES tablosundaki handler'a tek bir liste erişimiyle yönlendirilir.
+        Handler'lar başarıda bir sonraki PC'yi, başarısızlıkta (veya HLT'de) None döndürür.
         """
         #print(f"[DECODE_EXECUTE] PC={self.pc} -> '{instruction_str}' Mode={self.mode} | SysRes={self.syscall_result} | IE={self.instructions_executed}")
 
         if not instruction_str or not isinstance(instruction_str, str):
-            print(f"Warning: Invalid instruction format or empty instruction at PC {self.pc}. Halting.")
+            self._report(f"Warning: Invalid instruction format or empty instruction at PC {self.pc}. Halting.")
             self.is_halted = True
             return
 
-        parts = instruction_str.strip().upper().split()
-        command = parts[0]
-        args = [arg.rstrip(',') for arg in parts[1:]] 
-
-        executed_successfully = False
-        pc_incremented_by_command = False
-        
-        original_mode_before_syscall = self.mode # Sadece bilgilendirme amaçlı, dönüşü OS yönetir.
-
-        if command.startswith("SYSCALL"):
-            self.mode = "KERNEL"
-
-        if command == "HLT":
+        # Komut her döngüde yeniden ayrıştırılmaz; önbellekteki çözülmüş hali kullanılır.
+        code, operands, error = self._decoded_at(self.pc, instruction_str)
+        if error is not None:
+            self._report(error)
             self.is_halted = True
-            return 
-        elif command == "SET":
-            # ... (SET kodu aynı) ...
-            if len(args) == 2:
-                try:
-                    value_to_set = int(args[0]) 
-                    memory_address = int(args[1])
-                    if self._is_valid_address(memory_address, "write to"):
-                        #print(f"[SET] memory[{memory_address}] = {value_to_set}")
-
-                        self.memory[memory_address] = value_to_set
-                        executed_successfully = True
-                        if memory_address == CPU.REG_PC: # Eğer PC'ye yazılıyorsa
-                            pc_incremented_by_command = True # PC zaten komutla değişti
-                except ValueError: # ...
-                    print(f"Error: Invalid arguments for SET: {args}. Halting.")
-                    self.is_halted = True
-            else: # ...
-                print(f"Error: SET requires 2 arguments, got {len(args)}. Halting.")
-                self.is_halted = True
-        elif command == "CPY":
-            # ... (CPY kodu aynı) ...
-            if len(args) == 2:
-                try:
-                    source_address = int(args[0])
-                    dest_address = int(args[1])
-                    if self._is_valid_address(source_address, "read from") and \
-                       self._is_valid_address(dest_address, "write to"):
-                        #print(f"[CPY] memory[{dest_address}] = memory[{source_address}] ({self.memory[dest_address]})")
-
-                        self.memory[dest_address] = self.memory[source_address]
-                        executed_successfully = True
-                            # DÜZELTME: Eğer hedef adres PC ise, PC manuel olarak değiştirilmiş demektir
-                        if dest_address == CPU.REG_PC:  # PC = memory[0]
-                            pc_incremented_by_command = True
-                except ValueError: # ...
-                    print(f"Error: Invalid arguments for CPY: {args}. Halting.")
-                    self.is_halted = True
-                except Exception as e: # Genel hata yakalama (opsiyonel debug için)
-                     print(f"Unexpected error in CPY: {e}. Halting.")
-                     self.is_halted = True
-            else: # ...
-                print(f"Error: CPY requires 2 arguments, got {len(args)}. Halting.")
-                self.is_halted = True
-        elif command == "CPYI":
-            if len(args) == 2:
-                try:
-                    pointer_address = int(args[0]) 
-                    dest_address = int(args[1])   
-                    if self._is_valid_address(pointer_address, "read from (pointer for CPYI)") and \
-                       self._is_valid_address(dest_address, "write to (CPYI)"):
-                        source_address_via_pointer = self.memory[pointer_address] 
-                        if self._is_valid_address(source_address_via_pointer, "read from (indirect for CPYI)"):
-                            self.memory[dest_address] = self.memory[source_address_via_pointer]
-                            executed_successfully = True
-                except ValueError: # ...
-                    print(f"Error: Invalid arguments for CPYI: {args}. Halting.")
-                    self.is_halted = True
-            else: # ...
-                print(f"Error: CPYI requires 2 arguments, got {len(args)}. Halting.")
-                self.is_halted = True
-        # YENİ EKLENEN KOMUT
-        elif command == "CPYI2":
-            if len(args) == 2:
-                try:
-                    src_ptr = int(args[0])    # A1
-                    dest_ptr = int(args[1])   # A2
-                    if self._is_valid_address(src_ptr, "read pointer") and \
-                    self._is_valid_address(dest_ptr, "write pointer"):
-
-                        src_addr = self.memory[src_ptr]     # memory[A1]
-                        dest_addr = self.memory[dest_ptr]   # memory[A2]
-
-                        if self._is_valid_address(src_addr, "indirect read") and \
-                        self._is_valid_address(dest_addr, "indirect write"):
-
-                            self.memory[dest_addr] = self.memory[src_addr]  # memory[memory[A2]] = memory[memory[A1]]
-                            executed_successfully = True
-
-                            if dest_addr == CPU.REG_PC:
-                                pc_incremented_by_command = True
-                except Exception as e:
-                    print(f"CPYI2 error: {e}. Halting.")
-                    self.is_halted = True
-            else:
-                print("Error: CPYI2 requires 2 arguments. Halting.")
-                self.is_halted = True
-
-        elif command == "ADD":
-            # ... (ADD kodu aynı) ...
-            if len(args) == 2:
-                try:
-                    memory_address = int(args[0]) 
-                    value_to_add = int(args[1])   
-                    if self._is_valid_address(memory_address, "read/write for ADD"):
-                        self.memory[memory_address] += value_to_add
-                        executed_successfully = True
-                except ValueError: # ...
-                    print(f"Error: Invalid arguments for ADD: {args}. Halting.")
-                    self.is_halted = True
-            else: # ...
-                print(f"Error: ADD requires 2 arguments, got {len(args)}. Halting.")
-                self.is_halted = True
-        elif command == "ADDI":
-            # ... (ADDI kodu aynı) ...
-            if len(args) == 2:
-                try:
-                    dest_address = int(args[0])         
-                    source_val_address = int(args[1])   
-                    if self._is_valid_address(dest_address, "read/write for ADDI") and \
-                       self._is_valid_address(source_val_address, "read from for ADDI"):
-                        self.memory[dest_address] += self.memory[source_val_address]
-                        executed_successfully = True
-                except ValueError: # ...
-                    print(f"Error: Invalid arguments for ADDI: {args}. Halting.")
-                    self.is_halted = True
-            else: # ...
-                print(f"Error: ADDI requires 2 arguments, got {len(args)}. Halting.")
-                self.is_halted = True
-        elif command == "SUBI":
-            # ... (SUBI kodu aynı) ...
-            if len(args) == 2:
-                try:
-                    address1 = int(args[0]) 
-                    address2 = int(args[1]) 
-                    if self._is_valid_address(address1, "read from for SUBI (A1)") and \
-                       self._is_valid_address(address2, "read/write for SUBI (A2)"):
-                        self.memory[address2] = self.memory[address1] - self.memory[address2]
-                        executed_successfully = True
-                except ValueError: # ...
-                    print(f"Error: Invalid arguments for SUBI: {args}. Halting.")
-                    self.is_halted = True
-            else: # ...
-                print(f"Error: SUBI requires 2 arguments, got {len(args)}. Halting.")
-                self.is_halted = True
-        elif command == "JIF":
-            # ... (JIF kodu aynı) ...
-            if len(args) == 2:
-                try:
-                    condition_address = int(args[0]) 
-                    jump_target_address = int(args[1]) 
-                    if self._is_valid_address(condition_address, "read from for JIF condition"):
-                        condition_value = self.memory[condition_address]
-                        if condition_value <= 0:
-                            self.pc = jump_target_address
-                            pc_incremented_by_command = True 
-                        executed_successfully = True 
-                except ValueError: # ...
-                    print(f"Error: Invalid arguments for JIF: {args}. Halting.")
-                    self.is_halted = True
-            else: # ...
-                print(f"Error: JIF requires 2 arguments, got {len(args)}. Halting.")
-                self.is_halted = True
-        # YENİ EKLENEN KOMUTLAR
-        elif command == "PUSH": 
-            if len(args) == 1:
-                try:
-                    source_address = int(args[0])
-                    # Yığın sınırı kontrolü (basit): SP, 0'ın altına inmemeli (veya iplik yığın alanı alt sınırı)
-                    # Daha gelişmiş kontrol için ipliğe özel yığın sınırları (limit ve base) gerekir.
-                    # Şimdilik, _is_valid_address(self.sp - 1) zaten SP'nin 0'ın altına inmesini engeller.
-                    # Ek olarak, SP'nin belirli bir alt sınırı (örn: iplik için ayrılan segment başı) geçmemesini sağlamalıyız.
-                    # Bu proje kapsamında OS, ipliklerin SP'lerini ve yığınlarını yönetecek.
-                    # CPU sadece SP'nin geçerli bir bellek adresi olup olmadığını kontrol eder.
-                    # "Stack Overflow" mantığı daha çok OS seviyesinde anlam kazanır.
-                    # CPU için, SP'nin yazacağı adres geçerli mi ona bakarız.
-                    
-                    if self._is_valid_address(source_address, "read from for PUSH"):
-                        value_to_push = self.memory[source_address]
-                        potential_sp = self.sp - 1
-                        if self._is_valid_address(potential_sp, "write to stack for PUSH"): # Yazılacak yığın adresi geçerli mi?
-                            self.sp = potential_sp # SP'yi sadece adres geçerliyse güncelle
-                            self.memory[self.sp] = value_to_push
-                            executed_successfully = True
-                        # else: Hata _is_valid_address içinde zaten verildi.
-                except ValueError:
-                    print(f"Error: Invalid argument for PUSH: {args}. Halting.")
-                    self.is_halted = True
-            else:
-                print(f"Error: PUSH requires 1 argument, got {len(args)}. Halting.")
-                self.is_halted = True
-
-        elif command == "POP": 
-            if len(args) == 1:
-                try:
-                    dest_address = int(args[0])
-                    # Yığın sınırı kontrolü (basit): SP, yığının başlangıçta ayarlandığı "base" değerini geçmemeli.
-                    # Bu, programın mantığına ve SP'nin başlangıç değerine bağlıdır.
-                    # Eğer self.sp, ipliğin yığın için ayrılan alanının başlangıç (en yüksek) adresindeyse, POP yapılamaz (underflow).
-                    # CPU için, SP'nin okuyacağı adres geçerli mi ona bakarız.
-                    if self._is_valid_address(self.sp, "read from stack for POP"): # Okunacak yığın adresi geçerli mi?
-                        value_popped = self.memory[self.sp]
-                        # self.sp += 1 # SP'yi artırmadan önce hedef adresin geçerliliğini kontrol et
-                        if self._is_valid_address(dest_address, "write to for POP"):
-                            self.memory[dest_address] = value_popped
-                            self.sp += 1 # Sadece başarılı yazma sonrası SP'yi artır
-                            executed_successfully = True
-                        # else: Hedef adres hatası _is_valid_address içinde verildi.
-                    # else: SP okuma hatası _is_valid_address içinde verildi.
-                except ValueError:
-                    print(f"Error: Invalid argument for POP: {args}. Halting.")
-                    self.is_halted = True
-            else:
-                print(f"Error: POP requires 1 argument, got {len(args)}. Halting.")
-                self.is_halted = True
-
-        elif command == "CALL": # Format: CALL C (Dönüş adresini yığına it, PC = C yap)
-            if len(args) == 1:
-                try:
-                    jump_target_address = int(args[0])
-                    return_address = self.pc + 1 # Bir sonraki komutun adresi
-
-                    self.sp -= 1 # Yığın aşağı doğru büyür
-                    if self._is_valid_address(self.sp, "write return address to stack for CALL"):
-                        print(f"[CALL] SP={self.sp+1} -> SP={self.sp}, Return Addr={return_address}, Jump To={jump_target_address}")
-
-                        self.memory[self.sp] = return_address
-                        self.pc = jump_target_address
-                        pc_incremented_by_command = True
-                        executed_successfully = True
-                    else:
-                        self.sp += 1 # Başarısız olursa SP'yi geri al
-                        print(f"Error: Stack Pointer ({self.sp+1} -> {self.sp}) points to invalid/protected memory for CALL. Halting.")
-                        self.is_halted = True
-                except ValueError:
-                    print(f"Error: Invalid argument for CALL: {args}. Halting.")
-                    self.is_halted = True
-            else:
-                print(f"Error: CALL requires 1 argument, got {len(args)}. Halting.")
-                self.is_halted = True
-
-        elif command == "RET": # Format: RET (Yığından dönüş adresini çek, PC'yi ona ayarla)
-            if not args: # Argüman almaz
-                print(f"[RET] Trying to pop return address from SP={self.sp}")
-                if self._is_valid_address(self.sp, "read return address from stack for RET"):
-                    return_address = self.memory[self.sp]
-                    self.sp += 1 # SP artar
-                    print(f"[RET] Returning to address {return_address}, SP={self.sp}")
-                    self.pc = return_address
-                    pc_incremented_by_command = True
-                    executed_successfully = True
-                else:
-                    print("[RET] Invalid SP address!")
-            else:
-                print(f"Error: RET does not take arguments, got {len(args)}. Halting.")
-                self.is_halted = True
-
-        elif command == "USER": # Format: USER A (CPU'yu USER moduna geçir, PC = memory[A])
-            if len(args) == 1:
-                try:
-                    address_containing_new_pc = int(args[0])
-                    if self._is_valid_address(address_containing_new_pc, "read new PC address for USER"):
-                        print(f"--------------------- USER MODE'a geciliyor (Thread ID: {self.memory[15]})")
-                        new_pc_value = self.memory[address_containing_new_pc]
-                        self.mode = "USER"
-                        self.pc = new_pc_value
-                        pc_incremented_by_command = True
-                        executed_successfully = True
-                        print(f"Switched to USER mode. New PC = {self.pc} (hedef adres: {address_containing_new_pc} iceriginden)")
-                    # else: Adres gecersizse _is_valid_address icinde durdurulur.
-                except ValueError:
-                    print(f"Error: Invalid argument for USER: {args}. Halting.")
-                    self.is_halted = True
-            else:
-                print(f"Error: USER requires 1 argument, got {len(args)}. Halting.")
-                self.is_halted = True
-        
-        elif command == "SYSCALL_PRN": 
-            if len(args) == 1:
-                try:
-                    address_to_print = int(args[0])
-                    if self._is_valid_address(address_to_print, "read for SYSCALL_PRN"):
-                        value_to_print = self.memory[address_to_print]
-
-                        print(f"[SYSCALL_PRN Output]: {value_to_print}")
-
-                        try:
-                            with open("output.txt", "a", encoding="utf-8") as f:
-                                f.write(
-                                    f"SYSCALL_PRN VALUE={value_to_print}| TID={self.memory[15]} | PC={self.pc} | IE={self.instructions_executed} \n"
-                                )
-                        except Exception as e:
-                            print(f"[ERROR] output.txt yazılamadı: {e}")
-
-                        self.memory[CPU.MEM_OS_SYSCALL_TYPE] = 0
-                        self.syscall_result = self.pc + 1
-
-                        os_prn_handler_address = self.memory[CPU.MEM_OS_SYSCALL_PRN_HANDLER]
-                        if self._is_valid_address(os_prn_handler_address, "jump to OS PRN handler"):
-                            self.pc = os_prn_handler_address
-                            pc_incremented_by_command = True
-                            executed_successfully = True
-                        else:
-                            print(f"Error: Invalid OS PRN handler address at memory[{CPU.MEM_OS_SYSCALL_PRN_HANDLER}]. Halting.")
-                            self.is_halted = True
-                except ValueError:
-                    print(f"Error: Invalid argument for SYSCALL_PRN: {args}. Halting.")
-                    self.is_halted = True
-            else:
-                print(f"Error: SYSCALL_PRN requires 1 argument, got {len(args)}. Halting.")
-                self.is_halted = True
-
-        elif command == "SYSCALL_HLT": 
-            if not args:
-                # print(f"[SYSCALL_HLT]: Thread halt. PC will jump to OS HLT handler.") # Debug
-                self.memory[CPU.MEM_OS_SYSCALL_TYPE] = 1 # HLT syscall kodu
-                self.syscall_result = 0 # Genel sonuç (başarılı)
-                
-                os_handler_address = self.memory[CPU.MEM_OS_SYSCALL_HLT_HANDLER]
-                if self._is_valid_address(os_handler_address, "jump to OS HLT handler"):
-                    print("--------------------------------- KERNEL MODE'a geçildi (System Call)")
-                    
-                    self.pc = os_handler_address
-                    pc_incremented_by_command = True
-                    executed_successfully = True
-                else:
-                    print(f"Error: Invalid OS HLT handler address configured at memory[{CPU.MEM_OS_SYSCALL_HLT_HANDLER}]. Halting.")
-                    self.is_halted = True
-            else:
-                print(f"Error: SYSCALL_HLT does not take arguments, got {len(args)}. Halting.")
-                self.is_halted = True
-
-        elif command == "SYSCALL_YIELD": 
-            print("--------------------------------- KERNEL MODE'a geçildi (System Call)")
-
-            print(f"[CPU_DEBUG] Entering SYSCALL_YIELD; memory[15]={self.memory[15]}")
-            if not args:
-                self.memory[CPU.MEM_OS_SYSCALL_TYPE] = 2 # YIELD syscall kodu
-
-                # YIELD yapan ipliğin dönüş PC'sini (bir sonraki komutun adresi)
-                # syscall_result'a (memory[2]) kaydet.
-                self.syscall_result = self.pc + 1 
-
-                # print(f"[SYSCALL_YIELD]: CPU yield. Return PC={self.syscall_result}. PC will jump to OS YIELD handler.") # Debug
-
-                os_handler_address = self.memory[CPU.MEM_OS_SYSCALL_YIELD_HANDLER]
-                if self._is_valid_address(os_handler_address, "jump to OS YIELD handler"):
-                    # self.mode = "KERNEL" # Zaten syscall başında KERNEL moda geçildi
-                    self.pc = os_handler_address
-                    pc_incremented_by_command = True
-                    executed_successfully = True
-                else:
-                    print(f"Error: Invalid OS YIELD handler address configured at memory[{CPU.MEM_OS_SYSCALL_YIELD_HANDLER}]. Halting.")
-                    self.is_halted = True
-            else:
-                print(f"Error: SYSCALL_YIELD does not take arguments, got {len(args)}. Halting.")
-                self.is_halted = True
+            return
 
-        else: # Bu else bloğu en sonda kalmalı
-            print(f"Error: Unknown command '{command}'. Halting.")
-            self.is_halted = True
-            return 
+        next_pc = self._dispatch[code](*operands)
 
-        if executed_successfully:
+        if next_pc is not None:
             #print(f"DEBUG: Before IE increment: IE={self.instructions_executed}, Current Command: {command}") # DEBUG SATIRI
-            if not pc_incremented_by_command:
-                self.pc += 1
+            self.pc = next_pc
             self.instructions_executed += 1 # Bu self.memory[3] oluyor
-            thread_id = self.memory[15]
-            if thread_id == 0:
-                tcb_range = range(21, 27)
-            elif thread_id == 1:
-                tcb_range = range(31, 37)
-            elif thread_id == 2:
-                tcb_range = range(41, 47)
-            else:
-                tcb_range = []
-            
-
-            for base in [20, 30, 40, 50]:  # TCB0, TCB1, TCB2
-                tcb_id = self.memory[base]
-                values = [self.memory[base + offset] for offset in range(7)]
-                #print(f"mem[{base}-{base+6}] (ID={tcb_id}):", " | ".join(f"{v}" for v in values))
-
-            #print(f"------ [TCB Snapshot for Thread ID {thread_id}] ------")
-            #for addr in tcb_range:
-               #print(f"mem[{addr}]={self.memory[addr]}", end=" | ")
-            #print("")
             #value_at_sp = "N/A" # Eger SP gecersiz bir adres ise veya yigin bos ise
             #if 0 <= self.sp < len(self.memory): # SP gecerli bir adres mi diye kontrol et
                 #value_at_sp = self.memory[self.sp]
             #print(f"IE: {self.instructions_executed} | Next PC: {self.pc} | Mode: {self.mode} | SP: {self.sp} (ValAtSP: {value_at_sp}) | Syscall Result: {self.syscall_result}")
         
         elif not self.is_halted: 
-            print(f"Error: Command '{command}' with args {args} could not be executed successfully. Halting.")
+            self._execution_failed(instruction_str, operands)
+
+    def _execution_failed(self, instruction_str, operands):
+        command = instruction_str.strip().upper().split()[0]
+        self._report(f"Error: Command '{command}' with args {list(operands)} could not be executed successfully. Halting.")
+        self.is_halted = True
+
+    # --- Komut handler'ları ---
+    # Her handler çözülmüş tamsayı operandlarını alır ve bir sonraki PC'yi döndürür.
+    # PC'yi kendisi belirlemeyen komutlar PC + 1 döndürür (yazma PC'ye yapıldıysa yeni değer + 1).
+    # Bellek hız için doğrudan data/code depolarından okunur; komut hücresine yapılan her
+    # yazma o hücrenin çözülmüş komutunu geçersiz kılar.
+
+    @opcode("HLT", 0)
+    def _op_hlt(self):
+        self.is_halted = True
+        return None
+
+    @opcode("SET", 2)
+    def _op_set(self, value_to_set, memory_address):
+        if not self._can_access(memory_address):
+            return self._fault(memory_address, "write to")
+        #print(f"[SET] memory[{memory_address}] = {value_to_set}")
+        data = self._data
+        try:
+            data[memory_address] = value_to_set
+        except _WORD_ERRORS:
+            return self._overflow(memory_address, value_to_set, "SET")
+        if memory_address in self._code:
+            self.memory.invalidate(memory_address)
+        if memory_address == CPU.REG_PC: # Eğer PC'ye yazılıyorsa PC zaten komutla değişti
+            return data[0]
+        return data[0] + 1
+
+    @opcode("CPY", 2)
+    def _op_cpy(self, source_address, dest_address):
+        if not self._can_access(source_address):
+            return self._fault(source_address, "read from")
+        if not self._can_access(dest_address):
+            return self._fault(dest_address, "write to")
+        #print(f"[CPY] memory[{dest_address}] = memory[{source_address}] ({self.memory[dest_address]})")
+        data = self._data
+        code = self._code
+        if source_address in code or dest_address in code:
+            self.memory.copy_cell(source_address, dest_address) # Komut hücresi de kopyalanabilir
+        else:
+            data[dest_address] = data[source_address]
+        # DÜZELTME: Eğer hedef adres PC ise, PC manuel olarak değiştirilmiş demektir
+        if dest_address == CPU.REG_PC:  # PC = memory[0]
+            return data[0]
+        return data[0] + 1
+
+    @opcode("CPYI", 2)
+    def _op_cpyi(self, pointer_address, dest_address):
+        if not self._can_access(pointer_address):
+            return self._fault(pointer_address, "read from (pointer for CPYI)")
+        if not self._can_access(dest_address):
+            return self._fault(dest_address, "write to (CPYI)")
+        data = self._data
+        source_address_via_pointer = data[pointer_address]
+        if not self._can_access(source_address_via_pointer):
+            return self._fault(source_address_via_pointer, "read from (indirect for CPYI)")
+        code = self._code
+        if source_address_via_pointer in code or dest_address in code:
+            self.memory.copy_cell(source_address_via_pointer, dest_address)
+        else:
+            data[dest_address] = data[source_address_via_pointer]
+        return data[0] + 1
+
+    # YENİ EKLENEN KOMUT
+    @opcode("CPYI2", 2)
+    def _op_cpyi2(self, src_ptr, dest_ptr):
+        if not self._can_access(src_ptr):
+            return self._fault(src_ptr, "read pointer")
+        if not self._can_access(dest_ptr):
+            return self._fault(dest_ptr, "write pointer")
+        data = self._data
+        src_addr = data[src_ptr]     # memory[A1]
+        dest_addr = data[dest_ptr]   # memory[A2]
+        if not self._can_access(src_addr):
+            return self._fault(src_addr, "indirect read")
+        if not self._can_access(dest_addr):
+            return self._fault(dest_addr, "indirect write")
+        code = self._code
+        if src_addr in code or dest_addr in code:
+            self.memory.copy_cell(src_addr, dest_addr)
+        else:
+            data[dest_addr] = data[src_addr]  # memory[memory[A2]] = memory[memory[A1]]
+        if dest_addr == CPU.REG_PC:
+            return data[0]
+        return data[0] + 1
+
+    @opcode("ADD", 2)
+    def _op_add(self, memory_address, value_to_add):
+        if not self._can_access(memory_address):
+            return self._fault(memory_address, "read/write for ADD")
+        data = self._data
+        try:
+            data[memory_address] += value_to_add
+        except _WORD_ERRORS:
+            return self._overflow(memory_address, data[memory_address] + value_to_add, "ADD")
+        if memory_address in self._code:
+            self.memory.invalidate(memory_address)
+        return data[0] + 1
+
+    @opcode("ADDI", 2)
+    def _op_addi(self, dest_address, source_val_address):
+        if not self._can_access(dest_address):
+            return self._fault(dest_address, "read/write for ADDI")
+        if not self._can_access(source_val_address):
+            return self._fault(source_val_address, "read from for ADDI")
+        data = self._data
+        try:
+            data[dest_address] += data[source_val_address]
+        except _WORD_ERRORS:
+            return self._overflow(dest_address, data[dest_address] + data[source_val_address], "ADDI")
+        if dest_address in self._code:
+            self.memory.invalidate(dest_address)
+        return data[0] + 1
+
+    @opcode("SUBI", 2)
+    def _op_subi(self, address1, address2):
+        if not self._can_access(address1):
+            return self._fault(address1, "read from for SUBI (A1)")
+        if not self._can_access(address2):
+            return self._fault(address2, "read/write for SUBI (A2)")
+        data = self._data
+        try:
+            data[address2] = data[address1] - data[address2]
+        except _WORD_ERRORS:
+            return self._overflow(address2, data[address1] - data[address2], "SUBI")
+        if address2 in self._code:
+            self.memory.invalidate(address2)
+        return data[0] + 1
+
+    @opcode("JIF", 2)
+    def _op_jif(self, condition_address, jump_target_address):
+        if not self._can_access(condition_address):
+            return self._fault(condition_address, "read from for JIF condition")
+        data = self._data
+        if data[condition_address] <= 0:
+            return jump_target_address
+        return data[0] + 1
+
+    # YENİ EKLENEN KOMUTLAR
+    @opcode("PUSH", 1)
+    def _op_push(self, source_address):
+        # CPU sadece SP'nin yazacağı adres geçerli mi ona bakar.
+        # "Stack Overflow" mantığı daha çok OS seviyesinde anlam kazanır; OS, ipliklerin
+        # SP'lerini ve yığınlarını yönetir.
+        if not self._can_access(source_address):
+            return self._fault(source_address, "read from for PUSH")
+        data = self._data
+        potential_sp = data[CPU.REG_SP] - 1
+        if not self._can_access(potential_sp): # Yazılacak yığın adresi geçerli mi?
+            return self._fault(potential_sp, "write to stack for PUSH")
+        data[CPU.REG_SP] = potential_sp # SP'yi sadece adres geçerliyse güncelle
+        self.memory.copy_cell(source_address, potential_sp)
+        return data[0] + 1
+
+    @opcode("POP", 1)
+    def _op_pop(self, dest_address):
+        # CPU için, SP'nin okuyacağı adres geçerli mi ona bakarız.
+        data = self._data
+        sp = data[CPU.REG_SP]
+        if not self._can_access(sp): # Okunacak yığın adresi geçerli mi?
+            return self._fault(sp, "read from stack for POP")
+        if not self._can_access(dest_address):
+            return self._fault(dest_address, "write to for POP")
+        self.memory.copy_cell(sp, dest_address)
+        data[CPU.REG_SP] += 1 # Sadece başarılı yazma sonrası SP'yi artır
+        return data[0] + 1
+
+    @opcode("CALL", 1)
+    def _op_call(self, jump_target_address): # Format: CALL C (Dönüş adresini yığına it, PC = C yap)
+        data = self._data
+        return_address = data[0] + 1 # Bir sonraki komutun adresi
+
+        sp = data[CPU.REG_SP] - 1 # Yığın aşağı doğru büyür
+        if not self._can_access(sp):
+            self._fault(sp, "write return address to stack for CALL")
+            self._report(f"Error: Stack Pointer ({sp+1} -> {sp}) points to invalid/protected memory for CALL. Halting.")
             self.is_halted = True
+            return None
+        data[CPU.REG_SP] = sp
+        if self._trace is not None:
+            self._trace(f"[CALL] SP={sp+1} -> SP={sp}, Return Addr={return_address}, Jump To={jump_target_address}")
+        data[sp] = return_address
+        if sp in self._code:
+            self.memory.invalidate(sp)
+        return jump_target_address
+
+    @opcode("RET", 0)
+    def _op_ret(self): # Format: RET (Yığından dönüş adresini çek, PC'yi ona ayarla)
+        data = self._data
+        sp = data[CPU.REG_SP]
+        if self._trace is not None:
+            self._trace(f"[RET] Trying to pop return address from SP={sp}")
+        if not self._can_access(sp):
+            self._fault(sp, "read return address from stack for RET")
+            self._report("[RET] Invalid SP address!")
+            return None
+        return_address = data[sp]
+        data[CPU.REG_SP] = sp + 1 # SP artar
+        if self._trace is not None:
+            self._trace(f"[RET] Returning to address {return_address}, SP={sp + 1}")
+        return return_address
+
+    @opcode("USER", 1)
+    def _op_user(self, address_containing_new_pc): # Format: USER A (CPU'yu USER moduna geçir, PC = memory[A])
+        if not self._can_access(address_containing_new_pc):
+            return self._fault(address_containing_new_pc, "read new PC address for USER") # CPU _fault icinde durdurulur.
+        data = self._data
+        if self._trace is not None:
+            self._trace(f"--------------------- USER MODE'a geciliyor (Thread ID: {data[15]})")
+        new_pc_value = data[address_containing_new_pc]
+        self.mode = "USER"
+        if self._trace is not None:
+            self._trace(f"Switched to USER mode. New PC = {new_pc_value} (hedef adres: {address_containing_new_pc} iceriginden)")
+        return new_pc_value
+
+    @opcode("SYSCALL_PRN", 1)
+    def _op_syscall_prn(self, address_to_print):
+        self.mode = "KERNEL"
+        if not self._can_access(address_to_print):
+            return self._fault(address_to_print, "read for SYSCALL_PRN")
+        data = self._data
+        value_to_print = self.memory[address_to_print] # Komut hücresi ise komut string'i yazdırılır
+
+        if self._trace is not None:
+            self._trace(f"[SYSCALL_PRN Output]: {value_to_print}")
+
+        pc = data[CPU.REG_PC]
+        try:
+            self.prn_device.write(PrnRecord(value_to_print, data[15], pc, data[CPU.REG_INSTR_EXECUTED]))
+        except Exception as e:
+            self._report(f"[ERROR] PRN çıktısı yazılamadı: {e}")
 
+        data[CPU.MEM_OS_SYSCALL_TYPE] = 0
+        data[CPU.REG_SYSCALL_RESULT] = pc + 1
+
+        os_prn_handler_address = data[CPU.MEM_OS_SYSCALL_PRN_HANDLER]
+        if not self._can_access(os_prn_handler_address):
+            self._fault(os_prn_handler_address, "jump to OS PRN handler")
+            self._report(f"Error: Invalid OS PRN handler address at memory[{CPU.MEM_OS_SYSCALL_PRN_HANDLER}]. Halting.")
+            self.is_halted = True
+            return None
+        return os_prn_handler_address
+
+    @opcode("SYSCALL_HLT", 0)
+    def _op_syscall_hlt(self):
+        self.mode = "KERNEL"
+        # print(f"[SYSCALL_HLT]: Thread halt. PC will jump to OS HLT handler.") # Debug
+        data = self._data
+        data[CPU.MEM_OS_SYSCALL_TYPE] = 1 # HLT syscall kodu
+        data[CPU.REG_SYSCALL_RESULT] = 0 # Genel sonuç (başarılı)
+
+        os_handler_address = data[CPU.MEM_OS_SYSCALL_HLT_HANDLER]
+        if not self._can_access(os_handler_address):
+            self._fault(os_handler_address, "jump to OS HLT handler")
+            self._report(f"Error: Invalid OS HLT handler address configured at memory[{CPU.MEM_OS_SYSCALL_HLT_HANDLER}]. Halting.")
+            self.is_halted = True
+            return None
+        if self._trace is not None:
+            self._trace("--------------------------------- KERNEL MODE'a geçildi (System Call)")
+        return os_handler_address
+
+    @opcode("SYSCALL_YIELD", 0)
+    def _op_syscall_yield(self):
+        self.mode = "KERNEL"
+        data = self._data
+        if self._trace is not None:
+            self._trace("--------------------------------- KERNEL MODE'a geçildi (System Call)")
+            self._trace(f"[CPU_DEBUG] Entering SYSCALL_YIELD; memory[15]={data[15]}")
+        data[CPU.MEM_OS_SYSCALL_TYPE] = 2 # YIELD syscall kodu
+
+        # YIELD yapan ipliğin dönüş PC'sini (bir sonraki komutun adresi)
+        # syscall_result'a (memory[2]) kaydet.
+        data[CPU.REG_SYSCALL_RESULT] = data[CPU.REG_PC] + 1
+
+        os_handler_address = data[CPU.MEM_OS_SYSCALL_YIELD_HANDLER]
+        if not self._can_access(os_handler_address):
+            self._fault(os_handler_address, "jump to OS YIELD handler")
+            self._report(f"Error: Invalid OS YIELD handler address configured at memory[{CPU.MEM_OS_SYSCALL_YIELD_HANDLER}]. Halting.")
+            self.is_halted = True
+            return None
+        return os_handler_address
+
+
+    def set_tcb_layout(self, layout):
+        """
+        TCB düzenini ayarlar ve thread id -> UsedIE adresi tablosunu bir kez hesaplar
+        (bellek dışına düşen adresler atlanır).
+        """
+        self.tcb_layout = layout
+        self._used_ie_index = layout.field_addresses("used_ie", self._memory_size)
+
+    def _resolve_tcb_layout(self, tcb_layout=None):
+        """Yüklemeden sonra düzeni seçer: yükleyici seçeneği > veri bölümündeki tanımlayıcı > varsayılan."""
+        if tcb_layout is None:
+            try:
+                tcb_layout = TcbLayout.from_memory(self._data)
+            except ValueError as e:
+                print(f"Warning: {e}. Using the default TCB layout.")
+        self.set_tcb_layout(tcb_layout if tcb_layout is not None else self._default_tcb_layout)
 
-    
     def _update_thread_used_ie(self, thread_id):
-        """Her thread için UsedIE (kullanılan instruction sayısı) güncelle"""
-        try:
-            thread_id = int(thread_id)
-            
-            # TCB base adreslerini tanımla
-            tcb_bases = {
-                0: 20,   # OS (Thread 0)
-                1: 30,   # Thread 1
-                2: 40,   # Thread 2
-                3: 50,   # Thread 3
-                4: 100,  # Thread 4
-                5: 107,  # Thread 5
-                6: 114,  # Thread 6
-                7: 121,  # Thread 7
-                8: 128,  # Thread 8
-                9: 135,  # Thread 9
-                10: 142  # Thread 10
-            }
-            
-            if thread_id in tcb_bases:
-                tcb_base = tcb_bases[thread_id]
-                used_ie_addr = tcb_base + 6  # UsedIE offset = 6
-                
-                # UsedIE'yi 1 arttır
-                current_used_ie = int(self.memory[used_ie_addr])
-                self.memory[used_ie_addr] = current_used_ie + 1
-                
-        except (ValueError, TypeError, IndexError):
-            # Hata durumunda sessizce devam et
-            pass
+        """Çalışan thread'in UsedIE (kullanılan instruction sayısı) alanını 1 artırır."""
+        used_ie_address = self._used_ie_index.get(thread_id)
+        if used_ie_address is not None:
+            self._data[used_ie_address] += 1
     
     # ... (run_cycle ve load_program_to_memory fonksiyonları aynı) ...
 
@@ -595,21 +733,299 @@ class CPU:
         """
         Tek bir CPU döngüsünü çalıştırır: Fetch, Decode, Execute.
         """
+        if self._hooks:
+            self._step_hooked()
+            return
         if not self.is_halted:
-            with open("instructions_output.txt", "a", encoding="utf-8") as f:
-                multi_out = MultiWriter(sys.stdout, f)
-                #print(f"[RUN_CYCLE] IE: {self.memory[3]} PC: {self.pc}, SP: {self.sp}, Mode: {self.mode}, Thread: {self.memory[15]}", file=multi_out)
-                current_thread_id = self.memory[15]  # current_running_thread_id
-                self._update_thread_used_ie(current_thread_id)
-                instruction_str = self._fetch()
-                if instruction_str and not self.is_halted:
-                    original_stdout = sys.stdout
-                    sys.stdout = multi_out
-                    self._decode_execute(instruction_str)
-                    sys.stdout = original_stdout
+            #print(f"[RUN_CYCLE] IE: {self.memory[3]} PC: {self.pc}, SP: {self.sp}, Mode: {self.mode}, Thread: {self.memory[15]}")
+            current_thread_id = self._data[15]  # current_running_thread_id
+            self._update_thread_used_ie(current_thread_id)
+            instruction_str = self._fetch()
+            if instruction_str and not self.is_halted:
+                self._decode_execute(instruction_str)
 
+    # Deadline kontrolü her döngüde saat okumasın diye bu kadar döngüde bir yapılır.
+    DEADLINE_CHECK_INTERVAL = 1024
 
-    def load_program_to_memory(self, program_data_segment, program_instruction_segment, os_offset=21, thread_offsets=None):
+    def run(self, max_cycles=None, deadline=None, stop=None):
+        """
+        CPU'yu durana kadar (veya bir sınır aşılana kadar) hızlı döngüde çalıştırır.
+
+        max_cycles: en fazla çalıştırılacak döngü sayısı (None -> sınırsız)
+        deadline:   time.perf_counter() cinsinden mutlak bitiş zamanı (None -> yok)
+        stop:       stop(cpu) True döndürdüğünde her döngü başında durur (None -> yok)
+
+        run_cycle() ile aynı sonucu üretir; fark, döngü başına property/metot çağrılarının
+        yerel değişkenlerle değiştirilmesidir. Bellek eşlemeli yazmaçlar (PC, IE) misafir
+        kod tarafından okunduğu için (örn. OS'nin CPY 3, 70'i) her komutta doğrudan liste
+        yazımıyla güncellenir. Adım adım debug modları run_cycle() kullanmaya devam eder.
+        Olay abonesi (add_hook) varsa olay yayan _run_hooked() döngüsü kullanılır.
+        """
+        if self._hooks:
+            return self._run_hooked(max_cycles, deadline, stop)
+        data = self._data
+        code = self._code
+        dispatch = self._dispatch
+        used_ie_of = self._used_ie_index.get
+        check_interval = self.DEADLINE_CHECK_INTERVAL
+        perf_counter = time.perf_counter
+
+        limit = max_cycles if max_cycles is not None else -1
+        start_ie = data[CPU.REG_INSTR_EXECUTED]
+        start = perf_counter()
+        cycles = 0
+        reason = "halted"
+
+        while not self.is_halted:
+            if cycles == limit:
+                reason = "max_cycles"
+                break
+            if deadline is not None and cycles % check_interval == 0 and perf_counter() >= deadline:
+                reason = "deadline"
+                break
+            if stop is not None and stop(self):
+                reason = "stop"
+                break
+            cycles += 1
+
+            used_ie_address = used_ie_of(data[15])
+            if used_ie_address is not None:
+                data[used_ie_address] += 1
+
+            # --- Fetch + Decode (komut deposundan, çözülmüş halde) ---
+            pc = data[0]
+            if not self._can_access(pc):
+                self._fault(pc, "fetch from") # Hata mesajını basar ve durdurur
+                continue
+            entry = code.get(pc)
+            if entry is None:
+                if data[pc]:
+                    self._decode_execute(data[pc]) # Veri hücresi yürütülemez: uyarı + durdurma
+                continue # Boş hücre: run_cycle'daki gibi hiçbir şey yapılmaz
+            instruction_str, (opcode_id, operands, error) = entry
+            if error is not None:
+                if instruction_str:
+                    self._report(error)
+                    self.is_halted = True
+                    break
+                continue
+
+            # --- Execute ---
+            next_pc = dispatch[opcode_id](*operands)
+            if next_pc is None:
+                if not self.is_halted:
+                    self._execution_failed(instruction_str, operands)
+                break
+            data[0] = next_pc
+            data[3] += 1
+
+        elapsed = perf_counter() - start
+        return RunResult(reason, cycles, data[CPU.REG_INSTR_EXECUTED] - start_ie, elapsed)
+
+    def step(self):
+        """
+        run() döngüsünün tek bir turunu çalıştırır (sınır kontrolleri olmadan).
+        Kendi döngüsünü yöneten motorlar (örn. blocks.BlockEngine) yorumlanan komutlar
+        için run_cycle() yerine bunu kullanır; sonuç run_cycle() ile aynıdır.
+        """
+        if self._hooks:
+            self._step_hooked()
+            return
+        if self.is_halted:
+            return
+        data = self._data
+        self._update_thread_used_ie(data[15])
+        pc = data[0]
+        if not self._can_access(pc):
+            self._fault(pc, "fetch from")
+            return
+        entry = self._code.get(pc)
+        if entry is None:
+            if data[pc]:
+                self._decode_execute(data[pc])
+            return
+        instruction_str, (opcode_id, operands, error) = entry
+        if error is not None:
+            if instruction_str:
+                self._report(error)
+                self.is_halted = True
+            return
+        next_pc = self._dispatch[opcode_id](*operands)
+        if next_pc is None:
+            if not self.is_halted:
+                self._execution_failed(instruction_str, operands)
+            return
+        data[0] = next_pc
+        data[3] += 1
+
+    def _run_until_hot(self, through, heat, threshold, max_cycles, deadline=None, stop=None):
+        """
+        run() döngüsünü sıcak bir sıçrama hedefine gelene kadar çalıştırır. Kendi döngüsünü
+        yöneten motorlar (örn. blocks.BlockEngine) derlemedikleri komut dizilerini step()
+        yerine bununla yorumlar. PC + 1 dışına her sıçramada hedef through kümesinde değilse
+        heat[hedef] bir artırılır; sayaç threshold'a ulaştıysa döngü hedefte durur ve kararı
+        motora bırakır. İlk komuttan önce sınırları (max_cycles > 0, deadline, stop) çağıran
+        kontrol etmiştir. (reason, cycles) döndürür; sıcak hedefte durulduysa reason None'dır.
+        Olay abonesi varsa tek bir step() çalıştırılır.
+        """
+        if self._hooks:
+            self.step()
+            return ("halted" if self.is_halted else None), 1
+        data = self._data
+        code = self._code
+        dispatch = self._dispatch
+        used_ie_of = self._used_ie_index.get
+        check_interval = self.DEADLINE_CHECK_INTERVAL
+        perf_counter = time.perf_counter
+
+        cycles = 0
+        while not self.is_halted:
+            if cycles == max_cycles:
+                return "max_cycles", cycles
+            if deadline is not None and cycles % check_interval == 0 and cycles and perf_counter() >= deadline:
+                return "deadline", cycles
+            if stop is not None and cycles and stop(self):
+                return "stop", cycles
+            cycles += 1
+
+            used_ie_address = used_ie_of(data[15])
+            if used_ie_address is not None:
+                data[used_ie_address] += 1
+
+            pc = data[0]
+            if not self._can_access(pc):
+                self._fault(pc, "fetch from")
+                continue
+            entry = code.get(pc)
+            if entry is None:
+                if data[pc]:
+                    self._decode_execute(data[pc])
+                continue
+            instruction_str, (opcode_id, operands, error) = entry
+            if error is not None:
+                if instruction_str:
+                    self._report(error)
+                    self.is_halted = True
+                    break
+                continue
+
+            next_pc = dispatch[opcode_id](*operands)
+            if next_pc is None:
+                if not self.is_halted:
+                    self._execution_failed(instruction_str, operands)
+                break
+            data[0] = next_pc
+            data[3] += 1
+            if next_pc != pc + 1 and next_pc not in through:
+                count = heat.get(next_pc, 0) + 1
+                heat[next_pc] = count
+                if count >= threshold:
+                    return None, cycles
+        return "halted", cycles
+
+    def _run_hooked(self, max_cycles=None, deadline=None, stop=None):
+        """run() ile aynı sözleşme; her döngü olay yayan _step_hooked() ile çalışır."""
+        data = self._data
+        perf_counter = time.perf_counter
+        limit = max_cycles if max_cycles is not None else -1
+        start_ie = data[CPU.REG_INSTR_EXECUTED]
+        start = perf_counter()
+        cycles = 0
+        reason = "halted"
+        while not self.is_halted:
+            if cycles == limit:
+                reason = "max_cycles"
+                break
+            if deadline is not None and perf_counter() >= deadline:
+                reason = "deadline"
+                break
+            if stop is not None and stop(self):
+                reason = "stop"
+                break
+            cycles += 1
+            self._step_hooked()
+        elapsed = perf_counter() - start
+        return RunResult(reason, cycles, self._data[CPU.REG_INSTR_EXECUTED] - start_ie, elapsed)
+
+    def _step_hooked(self):
+        """step() ile aynı tek döngü; abone olunan olayları yayar."""
+        if self.is_halted:
+            return
+        data = self._data
+        pc = data[0]
+        mode = self.mode
+        entry = None
+        if not self._can_access(pc):
+            self._update_thread_used_ie(data[15])
+            self._fault(pc, "fetch from")
+        else:
+            entry = self._code.get(pc)
+            if entry is None:
+                self._update_thread_used_ie(data[15])
+                if data[pc]:
+                    self._decode_execute(data[pc])
+            elif entry[1][2] is not None:
+                self._update_thread_used_ie(data[15])
+                if entry[0]:
+                    self._report(entry[1][2])
+                    self.is_halted = True
+                entry = None
+        if entry is None:
+            if self.is_halted:
+                self._emit("halt", pc)
+            return
+
+        hooks = self._hooks
+        instruction_str, (opcode_id, operands, _) = entry
+        name = self._opcode_names[opcode_id]
+        if "before_instruction" in hooks:
+            # Döngünün UsedIE artışından önce: callback döngü öncesi durumu görür
+            self._emit("before_instruction", pc, instruction_str)
+        self._update_thread_used_ie(data[15])
+        effects = None
+        if "memory_read" in hooks or "memory_write" in hooks:
+            effects = memory_effects(name, operands, data)
+
+        next_pc = self._dispatch[opcode_id](*operands)
+        if next_pc is not None:
+            data[0] = next_pc
+            data[3] += 1
+        elif not self.is_halted:
+            self._execution_failed(instruction_str, operands)
+
+        if next_pc is not None and effects is not None:
+            reads, writes = effects
+            if "memory_read" in hooks:
+                for address in reads:
+                    self._emit("memory_read", address)
+            if "memory_write" in hooks:
+                for address in writes:
+                    self._emit("memory_write", address, self.memory[address])
+        if self.mode != mode:
+            self._emit("mode_change", mode, self.mode)
+        if next_pc is not None and name in SYSCALLS:
+            self._emit("syscall", name, pc)
+        self._emit("after_instruction", pc, instruction_str, next_pc)
+        if self.is_halted:
+            self._emit("halt", pc)
+
+
+    def snapshot(self):
+        """
+        Makine durumunu (bellek, mod, durma durumu) yakalar. Bellek tek bir buffer
+        kopyasıyla alınır; checkpoint.save_checkpoint() ile diske yazılabilir.
+        """
+        data, code = self.memory.snapshot()
+        return Snapshot(data, code, self.mode, self.is_halted)
+
+    def restore(self, snapshot):
+        """snapshot() (veya checkpoint.load_checkpoint()) ile alınan durumu geri yükler."""
+        self.memory.restore(snapshot.data, snapshot.code)
+        self._resolve_tcb_layout()
+        self.mode = snapshot.mode
+        self.is_halted = snapshot.is_halted
+
+    def load_program_to_memory(self, program_data_segment, program_instruction_segment, os_offset=21, thread_offsets=None, tcb_layout=None):
         """
         BIOS'un yapacağı gibi, programın veri ve komut segmentlerini belleğe yükler.
         Bu metod daha sonra bios.py'a taşınabilir veya oradan çağrılabilir.
@@ -618,11 +1034,13 @@ class CPU:
         program_instruction_segment: [(adres, "KOMUT ARG1 ARG2"), ...] formatında bir liste
         os_offset: OS komutlarının ve verilerinin başlayacağı adres
         thread_offsets: {thread_id: başlangıç_adresi} şeklinde bir sözlük
+        tcb_layout: tcb.TcbLayout; verilmezse veri bölümündeki tanımlayıcıdan (memory[4])
+                    veya CPU'nun varsayılan düzeninden alınır
         """
         print("Loading program to memory...")
         # Veri Segmenti Yükleme
         for address, value in program_data_segment:
-            if 0 <= address < len(self.memory):
+            if 0 <= address < self._memory_size:
                 self.memory[address] = value
                 # print(f"Loaded data: memory[{address}] = {value}") # Debug
             else:
@@ -634,7 +1052,8 @@ class CPU:
         for address, instruction_string in program_instruction_segment:
             actual_address = address # Şimdilik doğrudan adresi kullanalım.
                                     # OS için bu adres os_offset'ten başlayabilir.
-            if 0 <= actual_address < len(self.memory):
+            if 0 <= actual_address < self._memory_size:
+                # Komut deposuna yazılırken bir kez çözülür, döngüde tekrar ayrıştırılmaz.
                 self.memory[actual_address] = instruction_string
                 # print(f"Loaded instruction: memory[{actual_address}] = \"{instruction_string}\"") # Debug
             else:
@@ -642,6 +1061,56 @@ class CPU:
         
         # Başlangıç PC'si genellikle veri segmentinde adres 0'da ayarlanır.
         # self.pc = self.memory[0] # Eğer BIOS yüklerken PC'yi (adres 0) ayarladıysa
+        self._resolve_tcb_layout(tcb_layout)
+        print(f"Program loaded. Initial PC: {self.pc}, SP: {self.sp}")
+
+    def load_program_stream(self, records, tcb_layout=None):
+        """
+        bios.stream_gtu_program() kayıt akışını belleğe yükler: (adres, int) veri, (adres, str)
+        komut kaydı. Kayıtlar dosya sırasıyla, listeye toplanmadan tek geçişte yazılır;
+        sonuç load_program_to_memory ile aynıdır.
+        """
+        print("Loading program to memory...")
+        memory = self.memory
+        memory_size = self._memory_size
+        for address, value in records:
+            if 0 <= address < memory_size:
+                memory[address] = value # str ise komut deposuna çözülerek yazılır
+            elif isinstance(value, str):
+                print(f"Warning: Instruction address {address} is out of bounds.")
+            else:
+                print(f"Warning: Data address {address} is out of bounds.")
+        self._resolve_tcb_layout(tcb_layout)
+        print(f"Program loaded. Initial PC: {self.pc}, SP: {self.sp}")
+
+    def load_program_image(self, image, tcb_layout=None):
+        """
+        program_image.ProgramImage'ı belleğe yükler; load_program_to_memory ile aynı sonucu
+        verir, ancak komutlar metinden ayrıştırılmaz (imajda önceden çözülmüştür).
+        """
+        print("Loading program to memory...")
+        data = self._data
+        memory_size = self._memory_size
+        for address, value in zip(image.data_addresses, image.data_values):
+            if 0 <= address < memory_size:
+                self.memory[address] = value
+            else:
+                print(f"Warning: Data address {address} is out of bounds.")
+
+        opcodes = self.OPCODES
+        code = self._code
+        for address, instruction_string, name, operands in image.instructions:
+            if not (0 <= address < memory_size):
+                print(f"Warning: Instruction address {address} is out of bounds.")
+                continue
+            op = opcodes.get(name)
+            if op is not None and op.arity == len(operands):
+                data[address] = 0
+                code[address] = (instruction_string, (op.code, operands, None))
+            else:
+                self.memory[address] = instruction_string # Hata mesajı için normal decode yolu
+        self.memory.code_changed()
+        self._resolve_tcb_layout(tcb_layout)
         print(f"Program loaded. Initial PC: {self.pc}, SP: {self.sp}")
 
     # YENİ METOT (Debug amaçlı, main.py'dan çağrılabilir)
@@ -651,9 +1120,8 @@ class CPU:
             end_addr = len(self.memory)
         
         print(f"\n--- Memory Dump (Addresses {start_addr}-{end_addr-1}) ---")
-        for i in range(start_addr, end_addr):
-            if self.memory[i] != 0: # Sadece sıfır olmayanları veya belirli bir aralığı yazdırabiliriz
-                print(f"Mem[{i:04d}]: {self.memory[i]}")
+        for i, value in self.memory.nonzero(start_addr, end_addr): # Sadece sıfır olmayanlar
+            print(f"Mem[{i:04d}]: {value}")
         print("--- End of Memory Dump ---")
 
     def get_cpu_state_for_debug(self):
@@ -668,6 +1136,8 @@ class CPU:
             "OS_Syscall_Type": self.memory[CPU.MEM_OS_SYSCALL_TYPE]
         }
 
+CPU._register_marked_opcodes()
+
 # DEĞİŞTİRİLDİ 7 (Testler güncellenen syscall mantığına ve CPYI2'ye göre ayarlanacak)
 def run_all_cpu_tests():
     """CPU sınıfının tüm komutlarını test eden ana fonksiyon."""
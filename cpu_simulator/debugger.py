@@ -0,0 +1,476 @@
+# cpu_simulator/debugger.py
+"""
+Etkileşimli hata ayıklayıcı: PC durma noktaları, bellek izleme noktaları ve koşullar.
+
+simulate.py -D 2 her komuttan önce ENTER bekler ve tüm bellek bölgelerini döker.
+Debugger bunun yerine programı durma noktaları arasında tam hızda CPU.run(stop=...)
+ile çalıştırır; durma noktası yokken döngü başına maliyet tek bir küme (hash set) aramasıdır:
+
+    - PC durma noktaları (break 205, koşullu: break 205 if memory[15] == 3) ve izlenen
+      adreslere yazabilecek komutların PC'leri aynı kümede tutulur.
+    - İzleme noktaları (watch 100): komutun yazacağı adresler (hooks.memory_effects)
+      yalnızca aday PC'lerde hesaplanır. Adres komuta gömülüyse (SET, CPY, ADD, ...)
+      komut yalnızca o adresi izlerken aday olur; dolaylı yazanlar (CPYI2, PUSH, CALL)
+      her zaman adaydır. Komut deposu değişirse (self-modifying kod) küme yeniden hesaplanır.
+    - Genel koşullar (break if IE > 500) her döngüde değerlendirilir (yavaştır) ve
+      koşul yanlıştan doğruya döndüğünde durur. until KOŞUL koşul doğru olana kadar çalışır.
+
+Koşullarda kullanılabilen adlar: memory (memory[i]), PC, SP, IE, thread (memory[15]),
+mode ("KERNEL"/"USER"). PC ve IE'nin döngüce güncellenmesi ile UsedIE sayacı bellek
+yazması sayılmaz (hooks.py ile aynı); bunlar koşullarla izlenir. register_opcode ile
+eklenen komutların yazdıkları izlenemez.
+
+Kullanım:
+    python simulate.py os_plus_threads.gtu -D 4
+    (gtu-dbg) break 500
+    (gtu-dbg) watch 3551 3555
+    (gtu-dbg) break if memory[15] == 3 and IE > 500
+    (gtu-dbg) continue
+    (gtu-dbg) dump 3551 3555
+    (gtu-dbg) tcb
+"""
+from __future__ import annotations
+import cmd
+from collections import namedtuple
+from typing import Dict, List, Optional, Set
+
+from hooks import memory_effects
+
+_INDIRECT_WRITES = frozenset(("CPYI2", "PUSH", "CALL"))  # yazdığı adres belleğe bağlı komutlar
+
+Condition = namedtuple("Condition", "text code")
+Stop = namedtuple("Stop", "kind number detail")   # kind: breakpoint, watch, condition, until, halted, error
+
+
+def compile_condition(text: str) -> Condition:
+    """Koşul ifadesini bir kez derler; sözdizimi hatasında ValueError verir."""
+    try:
+        return Condition(text, compile(text, "<koşul>", "eval"))
+    except SyntaxError as e:
+        raise ValueError(f"Invalid condition {text!r}: {e.msg}") from None
+
+
+class Debugger:
+    """
+    *cpu* üzerinde durma noktaları ile çalıştırma. Durma noktalarının her birinin bir
+    numarası vardır (info ile listelenir, delete ile silinir).
+    """
+
+    def __init__(self, cpu) -> None:
+        self.cpu = cpu
+        self.breakpoints: Dict[int, Optional[Condition]] = {}   # pc -> koşul (None: koşulsuz)
+        self.watches: Set[int] = set()
+        self.conditions: Dict[int, Condition] = {}              # numara -> genel koşul
+        self._numbers: Dict[int, tuple] = {}                    # numara -> ("break", pc) / ("watch", adres) / ("cond", numara)
+        self._next_number = 1
+        self._last: Dict[int, bool] = {}                        # genel koşulların son değeri
+        self._stops: Set[int] = set()
+        self._watch_pcs: Set[int] = set()
+        self._code_version = None
+        self._pending: Optional[Stop] = None                    # run() içinde tetiklenen genel koşul
+
+    # --- durma noktaları ---
+    def _number(self, key: tuple) -> int:
+        number = self._next_number
+        self._next_number += 1
+        self._numbers[number] = key
+        self._code_version = None
+        return number
+
+    def add_breakpoint(self, pc: int, condition: Optional[str] = None) -> int:
+        if not 0 <= pc < len(self.cpu.memory):
+            raise ValueError(f"Breakpoint address {pc} is outside memory")
+        self.breakpoints[pc] = compile_condition(condition) if condition else None
+        for number, key in list(self._numbers.items()):
+            if key == ("break", pc):
+                del self._numbers[number]
+        return self._number(("break", pc))
+
+    def add_watch(self, address: int) -> int:
+        if not 0 <= address < len(self.cpu.memory):
+            raise ValueError(f"Watch address {address} is outside memory")
+        if address in self.watches:
+            return next(n for n, key in self._numbers.items() if key == ("watch", address))
+        self.watches.add(address)
+        return self._number(("watch", address))
+
+    def add_condition(self, text: str) -> int:
+        condition = compile_condition(text)
+        number = self._next_number
+        self._number(("cond", number))
+        self.conditions[number] = condition
+        self._last[number] = self._evaluate(condition) is True
+        return number
+
+    def delete(self, number: Optional[int] = None) -> None:
+        """Numaralı durma noktasını (None: hepsini) siler; bilinmeyen numara KeyError verir."""
+        if number is None:
+            self.breakpoints.clear()
+            self.watches.clear()
+            self.conditions.clear()
+            self._numbers.clear()
+        else:
+            kind, key = self._numbers.pop(number)
+            if kind == "break":
+                del self.breakpoints[key]
+            elif kind == "watch":
+                self.watches.discard(key)
+            else:
+                del self.conditions[key]
+                self._last.pop(key, None)
+        self._code_version = None
+
+    def points(self) -> List[tuple]:
+        """(numara, tür, açıklama) listesi."""
+        result = []
+        for number, (kind, key) in sorted(self._numbers.items()):
+            if kind == "break":
+                condition = self.breakpoints[key]
+                result.append((number, "break", f"PC={key}" + (f" if {condition.text}" if condition else "")))
+            elif kind == "watch":
+                result.append((number, "watch", f"memory[{key}]"))
+            else:
+                result.append((number, "cond", self.conditions[key].text))
+        return result
+
+    # --- koşullar ---
+    def namespace(self) -> dict:
+        cpu = self.cpu
+        data = cpu._data
+        return {"memory": cpu.memory, "PC": data[0], "SP": data[1], "IE": data[3],
+                "thread": data[15], "mode": cpu.mode}
+
+    def _evaluate(self, condition: Condition):
+        """Koşulun değeri (bool) veya hata mesajı (str)."""
+        try:
+            return bool(eval(condition.code, {"__builtins__": {}}, self.namespace()))
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+
+    # --- aday PC'ler ---
+    def _refresh(self) -> None:
+        """Durma kümesini (PC durma noktaları + izlenen adreslere yazabilecek komutlar) yeniler."""
+        cpu = self.cpu
+        self._code_version = cpu.memory.code_version
+        watch_pcs = set()
+        if self.watches:
+            names = cpu._opcode_names
+            data = cpu._data
+            for pc, (_, (opcode_id, operands, error)) in cpu._code.items():
+                if error is not None:
+                    continue
+                name = names[opcode_id]
+                if name in _INDIRECT_WRITES:
+                    watch_pcs.add(pc)
+                    continue
+                effects = memory_effects(name, operands, data)
+                if effects is not None and not self.watches.isdisjoint(effects[1]):
+                    watch_pcs.add(pc)
+        self._watch_pcs = watch_pcs
+        self._stops = set(self.breakpoints) | watch_pcs
+
+    def _predicate(self, until: Optional[Condition]):
+        """CPU.run(stop=...) için döngü başı kontrolü; en hızlı yol tek bir küme aramasıdır."""
+        data = self.cpu._data
+        stops = self._stops
+        memory = self.cpu.memory
+        version = self._code_version
+        if until is None and not self.conditions:
+            if not self.watches:
+                return lambda cpu: data[0] in stops
+            return lambda cpu: data[0] in stops or memory.code_version != version
+
+        def stop(cpu):
+            if data[0] in stops or memory.code_version != version:
+                return True
+            if until is not None and self._evaluate(until) is not False:
+                return True
+            return self._conditions_changed() is not None
+        return stop
+
+    def _conditions_changed(self) -> Optional[Stop]:
+        """Yanlıştan doğruya dönen (veya hata veren) ilk genel koşul; son değerleri günceller."""
+        hit = None
+        for number, condition in self.conditions.items():
+            value = self._evaluate(condition)
+            if isinstance(value, str):
+                hit = hit or Stop("error", number, f"{condition.text}: {value}")
+                continue
+            if value and not self._last[number]:
+                hit = hit or Stop("condition", number, condition.text)
+            self._last[number] = value
+        self._pending = hit
+        return hit
+
+    # --- yürütme ---
+    def step(self) -> Optional[Stop]:
+        """Bir komut yürütür; izlenen bir adrese yazdıysa veya CPU durduysa Stop döndürür."""
+        cpu = self.cpu
+        if cpu.is_halted:
+            return Stop("halted", None, f"PC={cpu.pc}")
+        if self._code_version != cpu.memory.code_version:
+            self._refresh()
+        pc = cpu._data[0]
+        hits = self._watch_hits(pc) if pc in self._watch_pcs else ()
+        old = [(address, cpu.memory[address]) for address in hits]
+        cpu.step()
+        if cpu.is_halted:
+            return Stop("halted", None, f"PC={cpu.pc}")
+        if old:
+            changes = ", ".join(f"memory[{a}]: {value} -> {cpu.memory[a]}" for a, value in old)
+            number = next(n for n, key in self._numbers.items() if key == ("watch", old[0][0]))
+            return Stop("watch", number, f"PC={pc}: {changes}")
+        return None
+
+    def _watch_hits(self, pc: int) -> List[int]:
+        cpu = self.cpu
+        entry = cpu._code.get(pc)
+        if entry is None or entry[1][2] is not None:
+            return []
+        opcode_id, operands, _ = entry[1]
+        effects = memory_effects(cpu._opcode_names[opcode_id], operands, cpu._data)
+        if effects is None:
+            return []
+        return sorted(self.watches.intersection(effects[1]))
+
+    def cont(self, until: Optional[str] = None) -> Stop:
+        """
+        Bulunulan komutu yürütür ve bir durma noktasına, until koşuluna veya CPU durana
+        kadar tam hızda çalıştırır.
+        """
+        cpu = self.cpu
+        until = compile_condition(until) if until else None
+        self._refresh()
+        hit = self.step()
+        while hit is None:
+            if until is not None:
+                value = self._evaluate(until)
+                if value is not False:
+                    return Stop("until" if value is True else "error", None, until.text if value is True else value)
+            self._pending = None
+            result = cpu.run(stop=self._predicate(until))
+            if result.reason != "stop":
+                return Stop("halted", None, f"PC={cpu.pc}")
+            hit = self._pending or self._check(until)
+        return hit
+
+    def _check(self, until: Optional[Condition]) -> Optional[Stop]:
+        """run() durduğunda nedeni bulur; durulacak bir şey yoksa komutu geçer (None)."""
+        cpu = self.cpu
+        if self._code_version != cpu.memory.code_version:
+            self._refresh()
+            return None
+        if until is not None:
+            value = self._evaluate(until)
+            if value is not False:
+                return Stop("until" if value is True else "error", None, until.text if value is True else value)
+        pc = cpu._data[0]
+        if pc in self.breakpoints:
+            condition = self.breakpoints[pc]
+            value = True if condition is None else self._evaluate(condition)
+            number = next(n for n, key in self._numbers.items() if key == ("break", pc))
+            if value is True:
+                return Stop("breakpoint", number, f"PC={pc}" + (f" if {condition.text}" if condition else ""))
+            if isinstance(value, str):
+                return Stop("error", number, f"{condition.text}: {value}")
+        if pc in self._stops:
+            return self.step()
+        return None
+
+
+# --- gösterim ---
+def format_location(cpu) -> str:
+    pc = cpu.pc
+    instruction = cpu.memory[pc] if 0 <= pc < len(cpu.memory) else "?"
+    return f"[IE {cpu.instructions_executed}] PC={pc}: {instruction}"
+
+
+def format_stop(stop: Stop) -> str:
+    label = {"breakpoint": "Durma noktası", "watch": "İzleme noktası", "condition": "Koşul",
+             "until": "until", "halted": "CPU durdu", "error": "Koşul hatası"}[stop.kind]
+    number = f" {stop.number}" if stop.number is not None else ""
+    return f"{label}{number}: {stop.detail}"
+
+
+class DebuggerShell(cmd.Cmd):
+    """Debugger için komut satırı (simulate.py -D 4). Komutlar: help ile listelenir."""
+
+    intro = "GTU-C312 hata ayıklayıcı. Komutlar için: help"
+    prompt = "(gtu-dbg) "
+
+    def __init__(self, debugger: Debugger, stdin=None, stdout=None, log=None) -> None:
+        super().__init__(stdin=stdin, stdout=stdout)
+        if stdin is not None:
+            self.use_rawinput = False
+        self.debugger = debugger
+        self.cpu = debugger.cpu
+        self.log = log
+
+    def _print(self, line: str = "") -> None:
+        print(line, file=self.stdout)
+        if self.log is not None:
+            print(line, file=self.log)
+
+    def _error(self, message) -> None:
+        self._print(f"Hata: {message}")
+
+    def _address(self, text: str) -> int:
+        try:
+            return int(text, 0)
+        except ValueError:
+            raise ValueError(f"Geçersiz adres: {text}") from None
+
+    def emptyline(self):
+        return False  # boş satır son komutu tekrarlamaz
+
+    def default(self, line):
+        self._error(f"bilinmeyen komut: {line} (help)")
+
+    # --- durma noktaları ---
+    def do_break(self, arg):
+        """break PC [if KOŞUL] | break if KOŞUL – PC durma noktası veya genel koşul ekler."""
+        head, _, condition = arg.partition(" if ")
+        head = head.strip()
+        try:
+            if arg.strip().startswith("if "):
+                number = self.debugger.add_condition(arg.strip()[3:])
+                self._print(f"Koşul {number}: {arg.strip()[3:]}")
+            elif head:
+                number = self.debugger.add_breakpoint(self._address(head), condition.strip() or None)
+                self._print(f"Durma noktası {number}: PC={head}" + (f" if {condition.strip()}" if condition.strip() else ""))
+            else:
+                self._error("kullanım: break PC [if KOŞUL] | break if KOŞUL")
+        except ValueError as e:
+            self._error(e)
+
+    def do_watch(self, arg):
+        """watch ADRES [BİTİŞ] – adrese (veya [ADRES, BİTİŞ] aralığına) yazıldığında durur."""
+        parts = arg.split()
+        if not 1 <= len(parts) <= 2:
+            self._error("kullanım: watch ADRES [BİTİŞ]")
+            return
+        try:
+            start = self._address(parts[0])
+            end = self._address(parts[1]) if len(parts) == 2 else start
+            if end < start:
+                raise ValueError(f"Boş aralık: {start}-{end}")
+            for address in range(start, end + 1):
+                number = self.debugger.add_watch(address)
+                self._print(f"İzleme noktası {number}: memory[{address}]")
+        except ValueError as e:
+            self._error(e)
+
+    def do_delete(self, arg):
+        """delete [NUMARA ...] – durma noktalarını siler (numarasız: hepsini)."""
+        try:
+            if not arg.strip():
+                self.debugger.delete()
+            for text in arg.split():
+                self.debugger.delete(int(text))
+        except (KeyError, ValueError):
+            self._error(f"böyle bir durma noktası yok: {arg}")
+
+    def do_info(self, arg):
+        """info – durma noktalarını, izleme noktalarını ve koşulları listeler."""
+        points = self.debugger.points()
+        if not points:
+            self._print("Durma noktası yok.")
+        for number, kind, detail in points:
+            self._print(f"{number:>3}  {kind:<6} {detail}")
+
+    # --- yürütme ---
+    def do_continue(self, arg):
+        """continue – bir sonraki durma noktasına kadar tam hızda çalıştırır."""
+        self._run(None)
+
+    def do_until(self, arg):
+        """until KOŞUL – koşul doğru olana kadar çalıştırır (örn. until IE >= 1000)."""
+        if not arg.strip():
+            self._error("kullanım: until KOŞUL")
+            return
+        self._run(arg.strip())
+
+    def do_step(self, arg):
+        """step [N] – N komut (varsayılan 1) yürütür; izleme noktasında veya CPU durunca erken biter."""
+        try:
+            count = int(arg) if arg.strip() else 1
+        except ValueError:
+            self._error(f"Geçersiz sayı: {arg}")
+            return
+        hit = None
+        for _ in range(count):
+            hit = self.debugger.step()
+            if hit is not None:
+                break
+        if hit is not None:
+            self._print(format_stop(hit))
+        self._print(format_location(self.cpu))
+
+    def _run(self, until):
+        if self.cpu.is_halted:
+            self._print("CPU durdu; çalıştırılacak komut yok.")
+            return
+        try:
+            hit = self.debugger.cont(until)
+        except ValueError as e:
+            self._error(e)
+            return
+        except KeyboardInterrupt:
+            hit = Stop("until", None, "kullanıcı durdurdu")
+        self._print(format_stop(hit))
+        self._print(format_location(self.cpu))
+
+    # --- inceleme ---
+    def do_regs(self, arg):
+        """regs – yazmaçlar, mod ve bulunulan komut."""
+        cpu = self.cpu
+        self._print(f"PC={cpu.pc} SP={cpu.sp} SR={cpu.syscall_result} IE={cpu.instructions_executed} "
+                    f"mode={cpu.mode} thread={cpu.memory[15]} halted={cpu.is_halted}")
+        self._print(format_location(cpu))
+
+    def do_dump(self, arg):
+        """dump BAŞ [BİT] – [BAŞ, BİT] aralığındaki hücreleri yazdırır (komut hücreleri dahil)."""
+        parts = arg.split()
+        if not 1 <= len(parts) <= 2:
+            self._error("kullanım: dump BAŞ [BİT]")
+            return
+        try:
+            start = self._address(parts[0])
+            end = self._address(parts[1]) if len(parts) == 2 else start
+        except ValueError as e:
+            self._error(e)
+            return
+        memory = self.cpu.memory
+        for address in range(max(start, 0), min(end, len(memory) - 1) + 1):
+            self._print(f"mem[{address}] = {memory[address]}")
+
+    def do_tcb(self, arg):
+        """tcb – TCB tablosu (State, SavedPC, SavedSP, UnblockIE, StartIE, UsedIE)."""
+        cpu = self.cpu
+        layout = cpu.tcb_layout
+        current = cpu.memory[15]
+        for tid in sorted(layout.bases):
+            if layout.bases[tid] < len(cpu.memory):
+                tcb = layout.read(cpu.memory, tid)
+                marker = "*" if tid == current else " "
+                self._print(f"TCB[{tid}]{marker} State={tcb['state']}, PC={tcb['pc']}, SP={tcb['sp']}, "
+                            f"UnblockIE={tcb['unblock_ie']}, StartIE={tcb['start_ie']}, UsedIE={tcb['used_ie']}")
+
+    def do_quit(self, arg):
+        """quit – hata ayıklayıcıdan çıkar."""
+        return True
+
+    def do_EOF(self, arg):
+        self._print()
+        return True
+
+    # kısa adlar
+    do_b = do_break
+    do_w = do_watch
+    do_d = do_delete
+    do_c = do_continue
+    do_s = do_step
+    do_x = do_dump
+    do_r = do_regs
+    do_q = do_quit
+
@@ -0,0 +1,127 @@
+# cpu_simulator/devices.py
+"""
+SYSCALL_PRN çıktı aygıtları.
+
+CPU her SYSCALL_PRN için bir PrnRecord üretir ve bunu kendisine verilen aygıta yazar.
+Aygıtlar kayıtları batch_size kadar biriktirip topluca iletir; böylece yazdırma yoğun
+thread'ler her değer için dosya açma maliyeti ödemez.
+
+    ListDevice   – kayıtları bellekte tutar (testler ve gömülü kullanım için, diske dokunmaz)
+    FileDevice   – output.txt formatında tamponlu dosya yazımı
+    PipeDevice   – multiprocessing Pipe bağlantısına kayıt listeleri gönderir
+    QueueDevice  – queue.Queue (veya multiprocessing.Queue) içine kayıt listeleri koyar
+
+Kullanım:
+    device = ListDevice()
+    cpu = CPU(prn_device=device)
+    ...
+    print([r.value for r in device.records])
+"""
+from __future__ import annotations
+from collections import namedtuple
+from typing import List, Optional
+
+# value: yazdırılan değer, tid: memory[15], pc: SYSCALL_PRN'in adresi, ie: o andaki memory[3]
+PrnRecord = namedtuple("PrnRecord", "value tid pc ie")
+
+
+def format_record(record: PrnRecord) -> str:
+    """Kaydı output.txt'nin satır formatına çevirir."""
+    return f"SYSCALL_PRN VALUE={record.value}| TID={record.tid} | PC={record.pc} | IE={record.ie} \n"
+
+
+class PrnDevice:
+    """Tüm PRN aygıtlarının temel sınıfı; batch_size kayıt birikince _write_batch çağrılır."""
+
+    def __init__(self, batch_size: int = 64) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.batch_size = batch_size
+        self._batch: List[PrnRecord] = []
+
+    def write(self, record: PrnRecord) -> None:
+        batch = self._batch
+        batch.append(record)
+        if len(batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._batch:
+            batch, self._batch = self._batch, []
+            self._write_batch(batch)
+
+    def close(self) -> None:
+        self.flush()
+
+    def _write_batch(self, records: List[PrnRecord]) -> None:
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ListDevice(PrnDevice):
+    """Kayıtları self.records listesinde toplar."""
+
+    def __init__(self) -> None:
+        super().__init__(batch_size=1)
+        self.records: List[PrnRecord] = []
+
+    def write(self, record: PrnRecord) -> None:
+        self.records.append(record)
+
+    def values(self) -> list:
+        return [r.value for r in self.records]
+
+
+class FileDevice(PrnDevice):
+    """Kayıtları output.txt formatında bir dosyaya yazar.
+
+    Dosya ilk yazımda bir kez açılır ve close() çağrılana kadar açık kalır; mode="w" ise
+    hemen açılır, böylece hiç PRN yürütmeyen bir çalışma da önceki çıktıyı siler.
+    batch_size=1 verilirse her kayıt anında yazılır (çıktı kaybı riski olmadan).
+    """
+
+    def __init__(self, path: str = "output.txt", *, mode: str = "a", batch_size: int = 64) -> None:
+        super().__init__(batch_size)
+        self.path = path
+        self.mode = mode
+        self._file = open(path, mode, encoding="utf-8") if "w" in mode else None
+
+    def _write_batch(self, records: List[PrnRecord]) -> None:
+        if self._file is None:
+            self._file = open(self.path, self.mode, encoding="utf-8")
+        self._file.write("".join(format_record(r) for r in records))
+        self._file.flush()
+
+    def close(self) -> None:
+        super().close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class PipeDevice(PrnDevice):
+    """multiprocessing.Pipe bağlantısına her batch için tek bir send() yapar."""
+
+    def __init__(self, connection, *, batch_size: int = 64) -> None:
+        super().__init__(batch_size)
+        self.connection = connection
+
+    def _write_batch(self, records: List[PrnRecord]) -> None:
+        self.connection.send(records)
+
+
+class QueueDevice(PrnDevice):
+    """queue.Queue / multiprocessing.Queue içine her batch için tek bir put() yapar."""
+
+    def __init__(self, queue, *, batch_size: int = 64, timeout: Optional[float] = None) -> None:
+        super().__init__(batch_size)
+        self.queue = queue
+        self.timeout = timeout
+
+    def _write_batch(self, records: List[PrnRecord]) -> None:
+        self.queue.put(records, timeout=self.timeout)
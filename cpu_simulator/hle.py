@@ -0,0 +1,454 @@
+# cpu_simulator/hle.py
+"""
+OS syscall'larının yüksek seviye emülasyonu (HLE).
+
+os_plus_threads.gtu'da tek bir SYSCALL_YIELD veya SYSCALL_PRN onlarca misafir komutu
+çalıştırır: 300/400/500'deki handler, blok kontrolü (570), zamanlayıcı (600) ve
+CHECK_IF_ALL_THREADS_HALTED (700). EmulatedKernel seçilen syscall'ları Python'da
+yürütür. Emüle edilmeyen syscall'lar misafir handler'lara gider; iki yol aynı
+bellek hücrelerini kullandığı için karıştırılabilir.
+
+Profiler gibi CPU örneğinin dispatch tablosundaki syscall handler'larını sarmalar:
+CPU'nun kendi handler'ı önce çalışır (PRN çıktısı, memory[2]/[10], KERNEL modu),
+ardından misafir OS'nin komutları komut komut modellenir ve bir sonraki thread'in
+PC'sine dönülür. Model misafirin yaptığı her yazmayı yapar (TCB alanları, memory[16],
+geçici hücreler 17/18/70-73/78-80, yığındaki dönüş adresleri, SP) ve atlanan her
+komut için IE'yi ve o anki thread'in UsedIE'sini artırır. Böylece StartIE/UnblockIE
+ve bloklanma kararları (IE > UnblockIE) misafir koşusundakiyle aynı IE saatinde
+verilir: PRN sırası, TCB tablosu ve son bellek birebir aynıdır. Misafirin tuhaflıkları
+da korunur (örn. T1 Halted iken T2'nin blok kontrolü memory[70]'teki eski değeri kullanır).
+
+Hiçbir thread hazır değilken misafir zamanlayıcı döngüsü de tur tur modellenir. Döngü
+artık hiçbir thread'in durumunu değiştiremiyorsa (tüm UnblockIE'ler geçmiş ve bir tur
+boyunca değişiklik yok) model misafire zamanlayıcının başında (600) devreder; misafir
+orada max_cycles'a kadar döner.
+
+Model os_plus_threads.gtu'nun OS'sine göredir: üç thread (T1/T2/T3 yuvaları) ve
+aşağıdaki adresler.
+
+Kullanım:
+    with EmulatedKernel(cpu, syscalls=("SYSCALL_YIELD", "SYSCALL_PRN")) as kernel:
+        cpu.run()
+    print(kernel.emulated, kernel.guest_ie)
+
+    python hle.py os_plus_threads.gtu --syscalls YIELD,PRN
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import sys
+from collections import Counter
+from typing import Iterable, Optional, Sequence
+
+from cpu import CPU
+from hooks import SYSCALLS
+
+DEFAULT_THREADS = (1, 2, 3)  # os_plus_threads.gtu zamanlayıcısının çalıştırdığı thread'ler
+PRN_BLOCK_IE = 100           # PRN sonrası bloklanma süresi (misafir: ADD 73, 100)
+
+READY, RUNNING, BLOCKED, HALTED = 0, 1, 2, 3
+OS_THREAD = 0
+
+# os_plus_threads.gtu OS'sinin kullandığı hücreler ve adresler
+NEXT_THREAD = 16                           # memory[16]: sıradaki aday thread
+SAVED_PC, SAVED_SP = 17, 18
+TEMP_A, TEMP_B, TEMP_ID, TEMP_UNBLOCK = 70, 71, 72, 73
+STATE_COPIES = (78, 79, 80)                # CHECK_IF_ALL_THREADS_HALTED'ın kopyaları
+SCHEDULER = 600                            # SCHEDULER_AND_RUN_THREAD
+OS_HLT = 203                               # OS'nin son HLT'si
+HANDLER_RETURN = {"SYSCALL_HLT": 331, "SYSCALL_YIELD": 461, "SYSCALL_PRN": 561}  # handler'ın CALL 600 dönüşü
+CHECK_HALTED_RETURN, CHECK_UNBLOCK_RETURN = 601, 602
+
+
+class EmulatedKernel:
+    """
+    *syscalls* – emüle edilecek syscall adları (SYSCALL_YIELD, SYSCALL_PRN, SYSCALL_HLT).
+    *threads*  – zamanlayıcının T1/T2/T3 yuvalarındaki üç thread id'si (TCB düzeninde olmalı).
+
+    emulated: syscall adı başına emüle edilen çağrı sayısı; guest_ie: yürütülmeden
+    sayılan misafir OS komutu toplamı; handoffs: zamanlayıcının misafire devredildiği sayı.
+    """
+
+    def __init__(self, cpu: CPU, *, syscalls: Iterable[str] = tuple(sorted(SYSCALLS)),
+                 threads: Sequence[int] = DEFAULT_THREADS) -> None:
+        syscalls = tuple(syscalls)
+        unknown = [name for name in syscalls if name not in SYSCALLS]
+        if unknown:
+            raise ValueError(f"Unknown syscalls {unknown}, expected some of {sorted(SYSCALLS)}")
+        threads = tuple(sorted(set(threads)))
+        if len(threads) != 3:
+            raise ValueError(f"The guest OS schedules exactly three threads, got {list(threads)}")
+        self.cpu = cpu
+        self.syscalls = syscalls
+        self.threads = threads
+        self.emulated = Counter()
+        self.guest_ie = 0
+        self.handoffs = 0
+        self._layout = None
+        self._originals = None
+
+    # --- bağlama ---
+    def attach(self) -> "EmulatedKernel":
+        if self._originals is not None:
+            return self
+        cpu = self.cpu
+        self._refresh_layout()
+        dispatch = cpu._dispatch
+        self._originals = list(dispatch)
+        self._halt = dispatch[CPU.OPCODES["HLT"].code]
+        for name in self.syscalls:
+            code = CPU.OPCODES[name].code
+            dispatch[code] = self._wrap(name, dispatch[code])
+        return self
+
+    def detach(self) -> None:
+        if self._originals is None:
+            return
+        self.cpu._dispatch[:] = self._originals
+        self._originals = None
+
+    def __enter__(self) -> "EmulatedKernel":
+        return self.attach()
+
+    def __exit__(self, *exc) -> None:
+        self.detach()
+
+    def _refresh_layout(self) -> None:
+        """TCB alan adreslerini cpu.tcb_layout'tan (bir kez) hesaplar."""
+        layout = self.cpu.tcb_layout
+        missing = [tid for tid in self.threads + (OS_THREAD,) if tid not in layout.bases]
+        if missing:
+            raise ValueError(f"Threads {missing} are not in the TCB layout")
+        self._layout = layout
+        self._field = {tid: {name: layout.bases[tid] + offset for name, offset in layout.offsets.items()}
+                       for tid in self.threads + (OS_THREAD,)}
+
+    def _wrap(self, name, handler):
+        kernel = self
+        on_syscall = {"SYSCALL_YIELD": self._yield, "SYSCALL_PRN": self._prn, "SYSCALL_HLT": self._thread_halt}[name]
+
+        def emulated(*operands):
+            guest_handler = handler(*operands)
+            if guest_handler is None:
+                return None  # CPU handler'ı hata verdi ve durdu
+            if kernel.cpu.tcb_layout is not kernel._layout:
+                kernel._refresh_layout()
+            caller = kernel.cpu._data[15]
+            if caller not in kernel.threads:
+                return guest_handler  # Bilinmeyen çağıran: misafir OS halleder
+            kernel.emulated[name] += 1
+            kernel.cpu._data[CPU.REG_INSTR_EXECUTED] += 1  # syscall komutunun kendisi
+            return on_syscall(caller)
+        return emulated
+
+    # --- misafir komutlarının sayımı ---
+    def _account(self, count: int, counted: bool = True) -> None:
+        """
+        Yürütülmeyen *count* misafir komutunu sayar: her biri o anki thread'in (memory[15])
+        UsedIE'sini, counted ise IE'yi de artırır (son komutun IE'sini çalıştırma döngüsü sayar).
+        """
+        data = self.cpu._data
+        used_ie = self.cpu._used_ie_index.get(data[15])
+        if used_ie is not None:
+            data[used_ie] += count
+        if counted:
+            data[CPU.REG_INSTR_EXECUTED] += count
+        self.guest_ie += count
+
+    def _slot(self, value) -> int:
+        """Misafirin `ADD x, -1; JIF` zinciri: <= T1 -> 0, T2 -> 1, >= T3 -> 2."""
+        for index, tid in enumerate(self.threads[:2]):
+            if value <= tid:
+                return index
+        return 2
+
+    def _enter(self, caller, before: int) -> int:
+        """
+        Handler girişi: memory[72] = çağıran, *before* komut (çağıranın UsedIE'sine),
+        ardından SET 0, 15. Çağıranın yuvasını misafirin dallanmasıyla seçer (memory[70]/[71]).
+        """
+        data = self.cpu._data
+        data[TEMP_ID] = caller
+        self._account(before)
+        data[15] = OS_THREAD
+        return self._slot(caller)
+
+    def _branch(self, slot: int) -> None:
+        """CPY 72, 70; ADD 70, -1; JIF 70 (+ T1 değilse CPY 70, 71; ADD 71, -1; JIF 71)."""
+        data = self.cpu._data
+        data[TEMP_A] = data[TEMP_ID] - 1
+        self._account(3)
+        if slot > 0:
+            data[TEMP_B] = data[TEMP_A] - 1
+            self._account(3)
+
+    # --- syscall'lar (300/400/500) ---
+    def _yield(self, caller) -> Optional[int]:
+        data = self.cpu._data
+        slot = self._enter(caller, 2)                       # 400-401
+        data[SAVED_PC] = data[CPU.REG_SYSCALL_RESULT]       # 402
+        data[SAVED_SP] = data[CPU.REG_SP]                   # 403
+        self._account(2)
+        self._branch(slot)                                  # 404-409
+        field = self._field[self.threads[slot]]
+        data[field["pc"]] = data[SAVED_PC]
+        data[field["sp"]] = data[SAVED_SP]
+        data[field["state"]] = READY
+        data[NEXT_THREAD] = self.threads[(slot + 1) % 3]
+        self._account(5)                                    # kaydet + JIF 15, 460
+        return self._schedule("SYSCALL_YIELD", caller)
+
+    def _prn(self, caller) -> Optional[int]:
+        data = self.cpu._data
+        data[SAVED_PC] = data[CPU.REG_SYSCALL_RESULT]       # 501
+        data[SAVED_SP] = data[CPU.REG_SP]                   # 502
+        slot = self._enter(caller, 4)                       # 500-503
+        data[TEMP_UNBLOCK] = data[CPU.REG_INSTR_EXECUTED] + PRN_BLOCK_IE  # 504-505
+        self._account(2)
+        self._branch(slot)                                  # 506-511
+        field = self._field[self.threads[slot]]
+        data[field["pc"]] = data[SAVED_PC]
+        data[field["sp"]] = data[SAVED_SP]
+        data[field["state"]] = BLOCKED
+        data[field["unblock_ie"]] = data[TEMP_UNBLOCK]
+        self._account(5)                                    # kaydet + JIF 15, 560
+        return self._schedule("SYSCALL_PRN", caller)
+
+    def _thread_halt(self, caller) -> Optional[int]:
+        data = self.cpu._data
+        slot = self._enter(caller, 2)                       # 300-301
+        self._branch(slot)                                  # 302-307
+        data[self._field[self.threads[slot]]["state"]] = HALTED
+        self._account(2)                                    # SET 3 + JIF 15, 330
+        return self._schedule("SYSCALL_HLT", caller)
+
+    # --- zamanlayıcı (600, 700, 570) ---
+    def _call(self, return_address: int) -> None:
+        data = self.cpu._data
+        sp = data[CPU.REG_SP] - 1
+        data[sp] = return_address
+        data[CPU.REG_SP] = sp
+        self._account(1)
+
+    def _all_halted(self) -> bool:
+        """CHECK_IF_ALL_THREADS_HALTED (700-709), RET hariç."""
+        data = self.cpu._data
+        for tid, copy in zip(self.threads, STATE_COPIES):
+            data[copy] = data[self._field[tid]["state"]]
+        self._account(3)
+        for copy in STATE_COPIES:
+            data[copy] -= 2
+            self._account(2)
+            if data[copy] <= 0:
+                return False
+        return True
+
+    def _unblock(self) -> None:
+        """CHECK_IF_THREAD_CAN_BE_UNBLOCKED (570-599), RET dahil."""
+        data = self.cpu._data
+        for slot, tid in enumerate(self.threads):
+            field = self._field[tid]
+            data[TEMP_ID] = data[field["state"]] - 2        # CPY, ADD, JIF
+            self._account(3)
+            if data[TEMP_ID] > 0:
+                self._account(1)                            # Halted: JIF 15 / RET
+                if slot == 2:
+                    return
+                continue
+            if slot != 1:                                   # T2 memory[70]'i yeniden okumaz
+                data[TEMP_A] = data[CPU.REG_INSTR_EXECUTED]
+                self._account(1)
+            data[TEMP_B] = data[TEMP_A] - data[field["unblock_ie"]]  # CPY, SUBI, JIF
+            self._account(3)
+            if data[TEMP_B] > 0:
+                data[field["state"]] = READY
+                data[field["unblock_ie"]] = 0
+                self._account(2)
+        self._account(1)                                    # 599: RET
+
+    def _schedule(self, name, caller) -> Optional[int]:
+        cpu = self.cpu
+        data = cpu._data
+        field = self._field
+        threads = self.threads
+        self._call(HANDLER_RETURN[name])                    # CALL 600
+        idle = 0
+        while True:
+            states = [data[field[tid]["state"]] for tid in threads]
+            self._call(CHECK_HALTED_RETURN)                 # 600: CALL 700
+            if self._all_halted():
+                self._account(1)                            # 709: JIF 15, 203
+                self._account(1, counted=False)             # 203: HLT
+                data[CPU.REG_PC] = OS_HLT
+                self._halt()
+                return None
+            self._account(1)                                # 720: RET
+            data[CPU.REG_SP] += 1
+            self._call(CHECK_UNBLOCK_RETURN)                # 601: CALL 570
+            self._unblock()
+            data[CPU.REG_SP] += 1
+
+            candidate = data[NEXT_THREAD]                   # 602-605
+            data[TEMP_B] = data[TEMP_ID] = candidate
+            data[TEMP_ID] -= 1
+            self._account(4)
+            if data[TEMP_ID] > 0:                           # 606-608
+                data[TEMP_A] = data[TEMP_ID] - 1
+                self._account(3)
+            slot = self._slot(candidate)
+            tcb = field[threads[slot]]
+            data[TEMP_ID] = data[tcb["state"]]              # CPY state, JIF
+            self._account(2)
+            if data[TEMP_ID] <= READY:
+                break
+            data[NEXT_THREAD] = threads[(slot + 1) % 3]     # SET, JIF 15, 600
+            self._account(2)
+
+            # Değişiklik olmayan turlar: tüm UnblockIE'ler geçmişse misafir sonsuza kadar döner
+            if [data[field[tid]["state"]] for tid in threads] != states:
+                idle = 0
+                continue
+            now = data[CPU.REG_INSTR_EXECUTED]
+            if any(state <= BLOCKED and data[field[tid]["unblock_ie"]] >= now
+                   for tid, state in zip(threads, states)):
+                idle = 0
+                continue
+            idle += 1
+            if idle > len(threads):
+                self.handoffs += 1
+                data[CPU.REG_INSTR_EXECUTED] -= 1           # çalıştırma döngüsü bir komut sayacak
+                return SCHEDULER
+
+        tid = threads[slot]                                 # 680-686
+        data[CPU.REG_SP] = data[tcb["sp"]]
+        self._account(2)
+        data[15] = tid
+        data[tcb["state"]] = RUNNING
+        self._account(1)
+        data[tcb["start_ie"]] = data[CPU.REG_INSTR_EXECUTED]
+        data[field[OS_THREAD]["state"]] = READY
+        data[TEMP_A] = data[tcb["pc"]]
+        self._account(3)
+        self._account(1, counted=False)                     # USER 70
+        cpu.mode = "USER"
+        if cpu._trace is not None:
+            cpu._trace(f"[HLE] Thread {caller} -> Thread {tid} (PC = {data[TEMP_A]})")
+        return data[TEMP_A]
+
+
+# --- rapor ---
+def _run_measured(cpu: CPU, max_cycles=None):
+    """
+    Programı hook arayüzüyle çalıştırır ve KERNEL modunda yürütülen komutları kendilerinden
+    önceki son syscall'a göre sayar (ilk syscall'dan önceki OS açılışı "boot").
+    (RunResult, Counter) döndürür.
+    """
+    counts = Counter()
+    current = ["boot"]
+
+    def on_syscall(cpu, name, pc):
+        current[0] = name
+
+    def on_instruction(cpu, pc, instruction):
+        if cpu.mode == "KERNEL":
+            counts[current[0]] += 1
+
+    hooks = (("syscall", on_syscall), ("before_instruction", on_instruction))
+    for event, callback in hooks:
+        cpu.add_hook(event, callback)
+    try:
+        result = cpu.run(max_cycles=max_cycles)
+    finally:
+        for event, callback in hooks:
+            cpu.remove_hook(event, callback)
+    return result, counts
+
+
+def _load(path):
+    from bios import load_and_parse_gtu_program
+    from devices import ListDevice
+    from tracing import TraceSink
+    with contextlib.redirect_stdout(io.StringIO()):
+        cpu = CPU(trace=TraceSink(enabled=False), prn_device=ListDevice())
+        data_segment, instruction_segment = load_and_parse_gtu_program(path)
+        cpu.load_program_to_memory(data_segment, instruction_segment)
+    return cpu
+
+
+def _tcb_table(cpu):
+    layout = cpu.tcb_layout
+    return {tid: layout.read(cpu.memory, tid) for tid in sorted(layout.bases) if layout.bases[tid] < len(cpu.memory)}
+
+
+def _parse_syscalls(text: str):
+    names = []
+    for part in text.split(","):
+        name = part.strip().upper()
+        if not name.startswith("SYSCALL_"):
+            name = "SYSCALL_" + name
+        if name not in SYSCALLS:
+            raise argparse.ArgumentTypeError(f"Geçersiz syscall '{part}', beklenen: PRN, YIELD, HLT")
+        names.append(name)
+    return names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="GTU-C312 programını misafir OS ile ve emüle edilen syscall'larla çalıştırıp karşılaştırır.")
+    parser.add_argument("program")
+    parser.add_argument("--syscalls", type=_parse_syscalls, default=sorted(SYSCALLS),
+                        help="emüle edilecek syscall'lar, virgülle (varsayılan: PRN,YIELD,HLT)")
+    parser.add_argument("--threads", default=",".join(map(str, DEFAULT_THREADS)),
+                        help="zamanlayıcının thread id'leri (varsayılan: 1,2,3)")
+    parser.add_argument("-c", "--cycles", type=int, default=None, help="en fazla döngü (varsayılan: durana kadar)")
+    args = parser.parse_args(argv)
+    try:
+        threads = [int(t) for t in args.threads.split(",")]
+    except ValueError:
+        parser.error(f"Geçersiz --threads: {args.threads}")
+
+    guest = _load(args.program)
+    guest_result, guest_kernel = _run_measured(guest, args.cycles)
+
+    cpu = _load(args.program)
+    try:
+        kernel = EmulatedKernel(cpu, syscalls=args.syscalls, threads=threads)
+        kernel.attach()
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        result, hle_kernel = _run_measured(cpu, args.cycles)
+    finally:
+        kernel.detach()
+
+    print(f"Emüle edilen: {', '.join(kernel.syscalls)}; thread'ler: {list(kernel.threads)}")
+    print(f"Misafir OS : {guest_result.reason}, IE={guest.instructions_executed}, {guest_result.cycles} komut, "
+          f"{guest_result.elapsed * 1000:.2f} ms, PRN={guest.prn_device.values()}")
+    print(f"HLE        : {result.reason}, IE={cpu.instructions_executed}, {result.cycles} komut, "
+          f"{result.elapsed * 1000:.2f} ms, PRN={cpu.prn_device.values()}")
+    saved = guest_result.cycles - result.cycles
+    share = 100.0 * saved / guest_result.cycles if guest_result.cycles else 0.0
+    print(f"Kazanılan misafir komutu: {saved} ({share:.1f}%)"
+          + (f"; zamanlayıcı {kernel.handoffs} kez misafire devredildi" if kernel.handoffs else ""))
+    print(f"\n{'Syscall':<14} {'çağrı':>6} {'misafir OS':>11} {'HLE':>8} {'kazanç':>8}")
+    for name in ["boot"] + sorted(SYSCALLS):
+        calls = kernel.emulated[name] if name in SYSCALLS else ""
+        before, after = guest_kernel[name], hle_kernel[name]
+        print(f"{name:<14} {calls:>6} {before:>11} {after:>8} {before - after:>8}")
+
+    # max_cycles ile kesilen koşular farklı misafir anlarında durur; karşılaştırma tam koşular içindir
+    checks = [
+        ("PRN çıktısı (sıra, TID, IE)", guest.prn_device.records == cpu.prn_device.records),
+        ("IE", guest.instructions_executed == cpu.instructions_executed),
+        ("TCB tablosu", _tcb_table(guest) == _tcb_table(cpu)),
+        ("bellek", list(guest.memory) == list(cpu.memory)),
+    ]
+    print()
+    for label, same in checks:
+        print(f"{label:<30} {'aynı' if same else 'FARKLI'}")
+    return 0 if all(same for _, same in checks) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+# cpu_simulator/hooks.py
+"""
+CPU olay (hook) arayüzü.
+
+Abone olunan olaylar CPU.add_hook(olay, callback) ile kaydedilir, remove_hook ile
+kaldırılır. Hiç abone yokken CPU.run(), step() ve run_cycle() eskisi gibi olaysız
+hızlı yolu kullanır; en az bir abone varsa olay yayan ayrı bir döngüye geçilir
+(seçim run() çağrısının başında yapılır). Böylece kullanılmayan olayların döngü
+başına maliyeti yoktur.
+
+Olaylar ve callback imzaları:
+
+    before_instruction(cpu, pc, instruction)          – çözülmüş komut yürütülmeden hemen önce
+    after_instruction(cpu, pc, instruction, next_pc)  – yürütmeden sonra (başarısızlık/HLT: next_pc None)
+    memory_read(cpu, address)                         – komutun okuduğu her adres
+    memory_write(cpu, address, value)                 – komutun yazdığı her adres (yeni değerle)
+    mode_change(cpu, old_mode, new_mode)              – KERNEL <-> USER geçişi
+    syscall(cpu, name, pc)                            – başarılı SYSCALL_PRN/HLT/YIELD
+    halt(cpu, pc)                                     – CPU bu döngüde durdu (HLT veya hata)
+
+Bellek olayları komutun semantiğinden (memory_effects) üretilir: PC ve IE'nin
+döngü tarafından güncellenmesi ve UsedIE sayacı bellek olayı sayılmaz. Sadece başarılı
+komutlar için yayılırlar; register_opcode ile eklenen komutlar için bellek olayı yoktur.
+
+Kullanım:
+    cpu.add_hook("syscall", lambda cpu, name, pc: print(name, "@", pc))
+    cpu.run()
+"""
+from __future__ import annotations
+from typing import Optional, Sequence, Tuple
+
+EVENTS = ("before_instruction", "after_instruction", "memory_read", "memory_write",
+          "mode_change", "syscall", "halt")
+SYSCALLS = frozenset(("SYSCALL_PRN", "SYSCALL_HLT", "SYSCALL_YIELD"))
+
+# komut adı -> (operandlar, data) -> (okunan adresler, yazılan adresler); komut yürütülmeden
+# önceki bellekle hesaplanır (yığın ve dolaylı adresler o andaki değerlerdir).
+_EFFECTS = {
+    "SET": lambda o, d: ((), (o[1],)),
+    "CPY": lambda o, d: ((o[0],), (o[1],)),
+    "CPYI": lambda o, d: ((o[0], d[o[0]]), (o[1],)),
+    "CPYI2": lambda o, d: ((o[0], o[1], d[o[0]]), (d[o[1]],)),
+    "ADD": lambda o, d: ((o[0],), (o[0],)),
+    "ADDI": lambda o, d: ((o[0], o[1]), (o[0],)),
+    "SUBI": lambda o, d: ((o[0], o[1]), (o[1],)),
+    "JIF": lambda o, d: ((o[0],), ()),
+    "PUSH": lambda o, d: ((o[0], 1), (1, d[1] - 1)),
+    "POP": lambda o, d: ((1, d[1]), (o[0], 1)),
+    "CALL": lambda o, d: ((1,), (1, d[1] - 1)),
+    "RET": lambda o, d: ((1, d[1]), (1,)),
+    "USER": lambda o, d: ((o[0],), ()),
+    "SYSCALL_PRN": lambda o, d: ((o[0],), (10, 2)),
+    "SYSCALL_HLT": lambda o, d: ((), (10, 2)),
+    "SYSCALL_YIELD": lambda o, d: ((), (10, 2)),
+    "HLT": lambda o, d: ((), ()),
+}
+
+
+def memory_effects(name: str, operands: Sequence[int], data) -> Optional[Tuple[tuple, tuple]]:
+    """
+    Komutun okuyacağı ve yazacağı adresleri döndürür; komut bilinmiyorsa veya
+    dolaylı adres bellek dışındaysa (komut zaten başarısız olur) None döndürür.
+    """
+    effects = _EFFECTS.get(name)
+    if effects is None:
+        return None
+    try:
+        return effects(operands, data)
+    except (IndexError, OverflowError):
+        return None
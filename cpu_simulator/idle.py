@@ -0,0 +1,579 @@
+# cpu_simulator/idle.py
+"""
+Bekleme (idle) döngülerini atlayan yürütme motoru.
+
+Tüm kullanıcı thread'leri SYSCALL_PRN sonrası bloklandığında (TCB State = 2,
+UnblockIE > IE) misafir OS, memory[3] UnblockIE'yi geçene kadar zamanlayıcı ve
+unblock kontrolü döngüsünde döner. IdleFastForward iç motoru (CPU.run veya
+BlockEngine.run) parçalar halinde çalıştırır ve her parça sonunda TCB tablosuna
+bakar: OS (thread 0) KERNEL modunda çalışıyorsa, hiçbir thread Running değilse ve
+en az bir thread bir IE'yi (wake) bekliyorsa ve wake bir sonraki kontrolden (check_interval
+döngü) sonraysa atlama denenir:
+
+    1. Döngü belleğe yazılmadan bir kez modellenir: her hücrenin değeri, döngünün
+       s döngü sonra başlaması halinde değer + katsayı * s olarak izlenir (IE ve
+       OS'nin UsedIE'si katsayı 1 ile başlar; komutların hepsi toplama/kopyalama).
+       IE'ye bağlı JIF'ler (UnblockIE karşılaştırması) IE modelin başındaki değerde
+       kalmış gibi dallanır, yani bekleme sürer. Bir PC'ye dönüldüğünde okunan her hücre
+       aynı katsayıyla ve tam katsayı * periyot kadar ilerlemişse döngü periyodiktir.
+    2. Her IE'ye bağlı JIF'in değeri periyot başına sabit bir miktar değişir; wake'e
+       ulaşıldığı için sonucunun ilk değiştiği adım doğrudan hesaplanır.
+    3. Bellek o adımdaki haline getirilir: IE, OS'nin UsedIE'si, zamanlayıcının
+       geçici hücreleri, yığın ve PC dahil. Sonucu değişen JIF'ten itibaren yürütme
+       normal devam eder.
+
+Döngü modellenemezse (dolaylı adres veya yığın IE'ye bağlıysa, USER/SYSCALL/HLT,
+komut hücresine erişim, erişim hatası) eski yönteme düşülür: döngü komut komut
+(CPU.step) yürütülür ve art arda iki periyotta aynı yol izlenip her hücre aynı
+miktarda değişmişse (S1 - S0 == S2 - S1) tam periyotlar atlanır.
+
+Atlanan döngüler tam olarak yürütülmüş gibi sonuçlanır: IE, PRN sırası ve son bellek
+tam bir koşuyla aynıdır; max_cycles de tam uygulanır (atlanan döngüler sayılır).
+Trace açıkken veya CPU'da olay abonesi (add_hook) varsa atlanan komutlar
+gözlemlenebilir olacağı için atlama yapılmaz.
+
+Kullanım:
+    engine = IdleFastForward(cpu)                       # veya IdleFastForward(cpu, BlockEngine(cpu))
+    result = engine.run(max_cycles=100000)             # CPU.run() ile aynı RunResult
+    print(engine.skipped_cycles, engine.fast_forwards)
+"""
+from __future__ import annotations
+import time
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+from cpu import CPU, RunResult
+from hooks import memory_effects
+from memory import WORD_MAX, WORD_MIN, copy_words
+
+BLOCKED, RUNNING = 2, 1
+OS_THREAD = 0
+
+_ADDRESS_INPUTS = {  # komut -> (operandlar, data) -> adresi belirleyen değerler (periyotlar arası sabit olmalı)
+    "CPYI": lambda o, d: (d[o[0]],),
+    "CPYI2": lambda o, d: (d[o[0]], d[o[1]]),
+    "PUSH": lambda o, d: (d[1],),
+    "POP": lambda o, d: (d[1],),
+    "CALL": lambda o, d: (d[1],),
+    "RET": lambda o, d: (d[1], d[d[1]] if 0 <= d[1] < len(d) else None),
+}
+_STOPPERS = frozenset(("USER", "HLT", "SYSCALL_PRN", "SYSCALL_HLT", "SYSCALL_YIELD"))
+_WORD_LIMIT = 1 << 62
+
+
+# steps: adım -> (pc, okunan adresler, yazılan adresler, JIF (değer, katsayı, dallandı) veya None)
+# log: adres -> [(adım, değer, katsayı)], head/period: döngünün başı ve uzunluğu,
+# observed: periyodikliğin kaç periyot yürütülerek doğrulandığı (1 veya 2)
+_Loop = namedtuple("_Loop", "steps log head period observed")
+
+
+class _Unmodelable(Exception):
+    """Döngü modellenemiyor (_model içinde kullanılır)."""
+
+
+class IdleFastForward:
+    """
+    *engine*         – iç motor; run(max_cycles, deadline, stop) metodu olan bir nesne
+                       (varsayılan: CPU'nun kendisi, BlockEngine(cpu) de verilebilir).
+    *check_interval* – TCB tablosuna kaç döngüde bir bakılacağı.
+    *max_period*     – aranacak en uzun döngü periyodu (komut).
+    """
+
+    def __init__(self, cpu: CPU, engine=None, *, check_interval: int = 256, max_period: int = 512) -> None:
+        if check_interval < 1:
+            raise ValueError("check_interval must be >= 1")
+        if max_period < 1:
+            raise ValueError("max_period must be >= 1")
+        self.cpu = cpu
+        self.engine = engine if engine is not None else cpu
+        self.check_interval = check_interval
+        self.max_period = max_period
+        self.fast_forwards = 0
+        self.skipped_cycles = 0
+        self.attempts = 0
+        self._cooldown = 0
+        self._backoff = 1
+        self._layout = None
+
+    # --- yürütme ---
+    def run(self, max_cycles=None, deadline=None, stop=None) -> RunResult:
+        """CPU.run() ile aynı sözleşme; deadline ve stop iç motora iletilir."""
+        cpu = self.cpu
+        runner = self.engine.run
+        if cpu._hooks or cpu._trace is not None:
+            return runner(max_cycles, deadline, stop)
+        data = cpu._data
+        perf_counter = time.perf_counter
+        start_ie = data[CPU.REG_INSTR_EXECUTED]
+        start = perf_counter()
+        cycles = 0
+        reason = "halted"
+
+        while not cpu.is_halted:
+            chunk = self.check_interval
+            if max_cycles is not None:
+                if cycles >= max_cycles:
+                    reason = "max_cycles"
+                    break
+                chunk = min(chunk, max_cycles - cycles)
+            result = runner(chunk, deadline, stop)
+            cycles += result.cycles
+            if result.reason != "max_cycles":
+                reason = result.reason
+                break
+            if self._cooldown:
+                self._cooldown -= 1
+                continue
+            wake = self._waiting()
+            # bekleme bir sonraki kontrolden önce bitiyorsa modellemek yürütmekten pahalıdır
+            if wake is not None and wake - data[CPU.REG_INSTR_EXECUTED] > self.check_interval:
+                remaining = None if max_cycles is None else max_cycles - cycles
+                skipped = self._jump(remaining)
+                if skipped is not None:
+                    cycles += skipped
+                    continue
+                executed, stopped = self._fast_forward(remaining, stop)
+                cycles += executed
+                if stopped:
+                    reason = "stop"
+                    break
+
+        elapsed = perf_counter() - start
+        return RunResult(reason, cycles, data[CPU.REG_INSTR_EXECUTED] - start_ie, elapsed)
+
+    # --- tespit ---
+    def _fields(self):
+        layout = self.cpu.tcb_layout
+        if layout is not self._layout:
+            self._layout = layout
+            size = self.cpu._memory_size
+            states = layout.field_addresses("state", size)
+            unblocks = layout.field_addresses("unblock_ie", size)
+            self._threads = [(states[tid], unblocks[tid]) for tid in sorted(states)
+                             if tid != OS_THREAD and tid in unblocks]
+        return self._threads
+
+    def _waiting(self) -> Optional[int]:
+        """OS bir IE'yi bekliyorsa en erken UnblockIE'yi (wake), değilse None döndürür."""
+        cpu = self.cpu
+        data = cpu._data
+        if data[15] != OS_THREAD or cpu.mode != "KERNEL":
+            return None
+        ie = data[CPU.REG_INSTR_EXECUTED]
+        wake = None
+        for state, unblock_ie in self._fields():
+            if data[state] == RUNNING:
+                return None
+            if data[state] == BLOCKED and data[unblock_ie] > ie:
+                wake = data[unblock_ie] if wake is None else min(wake, data[unblock_ie])
+        return wake
+
+    # --- doğrudan atlama ---
+    def _jump(self, remaining) -> Optional[int]:
+        """
+        Döngüyü modelleyip bekleme bitene (veya max_cycles'a) kadar atlar; atlanan döngü
+        sayısını, döngü modellenemezse None döndürür (periyot gözlemine düşülür).
+        """
+        self.attempts += 1
+        try:
+            loop = self._model()
+        except _Unmodelable:
+            return None
+        if loop is None:
+            return self._give_up()
+
+        # Model, IE'ye bağlı JIF'leri IE hiç ilerlemiyormuş gibi dallandırır; gerçek yürütme
+        # ilk sonucu farklı çıkan JIF'te ayrılır. Modellenen adımlar gerçek değerlerle yürür.
+        steps, head, period = loop.steps, loop.head, loop.period
+        target = None
+        for index, step in enumerate(steps):
+            jif = step[3]
+            if jif is not None and (jif[0] <= 0) != jif[2]:
+                target = index
+                break
+        if target is None:
+            # k. periyotta JIF değeri değer + k * değişim; ilk işaret değişimi çıkıştır
+            for offset in range(period):
+                index = head + offset
+                if steps[index][3] is None:
+                    continue
+                value, rate = steps[index][3][0], _rate(loop, index)
+                if not rate or (value <= 0) != (rate > 0):
+                    continue  # değer bu yönde değişirken dallanma sonucu hiç dönmez
+                k = -value // rate + 1 if rate > 0 else -(-value // -rate)
+                index += k * period
+                target = index if target is None else min(target, index)
+        if remaining is not None:
+            target = remaining if target is None else min(target, remaining)
+        if not target:
+            return self._give_up()  # çıkışı olmayan döngü veya hemen uyanma
+
+        cells = _state_at(loop, target)
+        if cells is None:
+            return self._give_up()  # aradaki bir toplama 64 bit'i taşar: CPU orada durmalı
+        data = self.cpu._data
+        used_ie = self.cpu._used_ie_index.get(data[15])
+        for address, value in cells.items():
+            data[address] = value
+        data[CPU.REG_PC] = steps[target if target < head else head + (target - head) % period][0]
+        data[CPU.REG_INSTR_EXECUTED] += target
+        if used_ie is not None:
+            data[used_ie] += target
+        self.fast_forwards += 1
+        self.skipped_cycles += target
+        self._backoff = 1
+        return target
+
+    def _give_up(self) -> int:
+        self._cooldown = self._backoff
+        self._backoff = min(self._backoff * 2, 64)
+        return 0
+
+    def _model(self):
+        """
+        Döngüyü data'ya yazmadan yürütür ve _Loop döndürür; yol USER/SYSCALL/HLT'ye varıyorsa
+        (bekleme yok) None, modellenemezse _Unmodelable.
+        Periyot, başındaki hücreler kaydırılmış olarak tekrar ediyorsa bir (S1 = S0 + katsayı
+        * periyot), her hücre iki periyotta aynı miktar değiştiyse iki periyot sonra bulunur.
+        """
+        cpu = self.cpu
+        data = cpu._data
+        code = cpu._code
+        names = cpu._opcode_names
+        can_access = cpu._can_access
+        ie = data[CPU.REG_INSTR_EXECUTED]
+        used_ie = cpu._used_ie_index.get(data[15])
+        used = data[used_ie] if used_ie is not None else 0
+        # döngünün güncellediği hücreler; komut yazarsa model bozulur
+        fixed = {CPU.REG_PC, CPU.REG_INSTR_EXECUTED, 15, used_ie}
+        cells: Dict[int, tuple] = {}     # adres -> (değer, katsayı); yoksa (data[adres], 0)
+        log: Dict[int, List[tuple]] = {}
+        steps: List[tuple] = []
+        visits: Dict[int, List[int]] = {}
+
+        def get(address):
+            if not can_access(address) or address in code:
+                raise _Unmodelable
+            reads.append(address)
+            return cells.get(address) or (data[address], 0)
+
+        def get_address(address):
+            value, coefficient = get(address)
+            if coefficient:
+                raise _Unmodelable  # adres IE'ye bağlı: periyotlar arası sabit değil
+            return value
+
+        pc = data[CPU.REG_PC]
+        jumped = False
+        for index in range(3 * self.max_period):
+            # döngü geriye dallanan bir JIF ile kapanır; periyot yalnızca onun hedefinde aranır
+            for head in reversed(visits.get(pc, ()) if jumped else ()):
+                period = index - head
+                if period > self.max_period:
+                    break
+                if _shifted(steps, log, cells, data, fixed, head, index):
+                    return _Loop(steps, log, head, period, 1)
+                first = head - period
+                if first >= 0 and _drifting(steps, log, cells, data, fixed, first, head, index):
+                    return _Loop(steps, log, first, period, 2)
+            visits.setdefault(pc, []).append(index)
+
+            entry = code.get(pc) if can_access(pc) else None
+            if entry is None or entry[1][2] is not None:
+                raise _Unmodelable
+            opcode_id, operands, _ = entry[1]
+            name = names[opcode_id]
+            cells[CPU.REG_PC] = (pc, 0)
+            cells[CPU.REG_INSTR_EXECUTED] = (ie + index, 1)
+            if used_ie is not None:
+                cells[used_ie] = (used + index + 1, 1)  # UsedIE döngü başında artar
+            reads: List[int] = []
+            writes: List[tuple] = []
+            jif = None
+            next_pc = pc + 1
+            if name == "SET":
+                if operands[1] == CPU.REG_PC and can_access(CPU.REG_PC):
+                    next_pc = operands[0]
+                else:
+                    writes.append((operands[1], operands[0], 0))
+            elif name == "CPY":
+                writes.append((operands[1],) + get(operands[0]))
+            elif name == "CPYI":
+                writes.append((operands[1],) + get(get_address(operands[0])))
+            elif name == "CPYI2":
+                source = get_address(operands[0])
+                writes.append((get_address(operands[1]),) + get(source))
+            elif name == "ADD":
+                value, coefficient = get(operands[0])
+                writes.append((operands[0], value + operands[1], coefficient))
+            elif name == "ADDI":
+                value, coefficient = get(operands[0])
+                other, other_coefficient = get(operands[1])
+                writes.append((operands[0], value + other, coefficient + other_coefficient))
+            elif name == "SUBI":
+                value, coefficient = get(operands[0])
+                other, other_coefficient = get(operands[1])
+                writes.append((operands[1], value - other, coefficient - other_coefficient))
+            elif name == "JIF":
+                value, coefficient = get(operands[0])
+                taken = value - coefficient * index <= 0  # IE modelin başındaymış gibi
+                jif = (value, coefficient, taken)
+                if taken:
+                    next_pc = operands[1]
+            elif name == "PUSH" and operands[0] != CPU.REG_SP:
+                sp = get_address(CPU.REG_SP) - 1
+                writes.append((CPU.REG_SP, sp, 0))
+                writes.append((sp,) + get(operands[0]))
+            elif name == "POP" and operands[0] != CPU.REG_SP:
+                sp = get_address(CPU.REG_SP)
+                writes.append((operands[0],) + get(sp))
+                writes.append((CPU.REG_SP, sp + 1, 0))
+            elif name == "CALL":
+                sp = get_address(CPU.REG_SP) - 1
+                writes.append((CPU.REG_SP, sp, 0))
+                writes.append((sp, pc + 1, 0))
+                next_pc = operands[0]
+            elif name == "RET":
+                sp = get_address(CPU.REG_SP)
+                next_pc = get_address(sp)
+                writes.append((CPU.REG_SP, sp + 1, 0))
+            elif name in _STOPPERS:
+                return _leaving(steps)
+            else:
+                raise _Unmodelable  # register_opcode ile eklenen komutlar
+
+            if len(writes) == 2 and writes[0][0] == writes[1][0]:
+                raise _Unmodelable  # yığın SP'nin üzerine yazıyor
+            for address, value, coefficient in writes:
+                if address == 15:
+                    return _leaving(steps)  # OS başka bir thread'e geçiyor
+                if address in fixed or not can_access(address) or address in code:
+                    raise _Unmodelable
+                if not WORD_MIN <= value <= WORD_MAX:
+                    raise _Unmodelable
+                cells[address] = (value, coefficient)
+                log.setdefault(address, []).append((index, value, coefficient))
+            steps.append((pc, reads, [w[0] for w in writes], jif))
+            jumped = next_pc <= pc and name in ("JIF", "SET")
+            pc = next_pc
+        raise _Unmodelable
+
+    # --- periyot gözlemi (yedek yol) ---
+    def _fast_forward(self, remaining, stop):
+        """
+        Döngüyü gözler ve mümkünse atlar; (yürütülen + atlanan döngü, stop tetiklendi mi)
+        döndürür. Gözlem sırasında yürütülen komutlar gerçekten yürütülmüştür.
+        """
+        cpu = self.cpu
+        data = cpu._data
+        code = cpu._code
+        names = cpu._opcode_names
+        step = cpu.step
+
+        start_pc = data[0]
+        budget = 2 * self.max_period
+        if remaining is not None:
+            budget = min(budget, remaining)
+        trace: List[tuple] = []      # adım başına (pc, adres girdileri, JIF değeri)
+        visits: List[int] = [0]      # start_pc'ye dönülen adım indeksleri
+        snapshots = [copy_words(data)]
+        written = set()
+
+        executed = 0
+        while executed < budget:
+            if stop is not None and stop(cpu):
+                return executed, True
+            pc = data[0]
+            entry = code.get(pc)
+            if entry is None or entry[1][2] is not None:
+                break
+            opcode_id, operands, _ = entry[1]
+            name = names[opcode_id]
+            effects = memory_effects(name, operands, data)
+            if effects is None or name in _STOPPERS:
+                break
+            if not all(map(cpu._can_access, effects[0] + effects[1])):
+                break  # komut hata verecek: normal yürütmeye bırakılır
+            writes = effects[1]
+            if any(address in code for address in writes):
+                break  # self-modifying kod: atlanmaz
+            if CPU.REG_PC in writes and name != "SET":
+                break  # PC'ye kopyalanan değer dallanmadır, sabit olduğu bilinemez
+            written.update(writes)
+            address_inputs = _ADDRESS_INPUTS.get(name)
+            # memory[15] döngünün hangi UsedIE'yi artıracağını belirler
+            trace.append((pc,
+                          (data[15],) + (address_inputs(operands, data) if address_inputs else ()),
+                          data[operands[0]] if name == "JIF" else None))
+            step()
+            executed += 1
+            if cpu.is_halted or cpu.mode != "KERNEL":
+                break
+            if data[0] == start_pc:
+                visits.append(executed)
+                snapshots.append(copy_words(data))
+                skipped = self._try_skip(trace, visits, snapshots, written, remaining, executed)
+                if skipped is not None:
+                    return executed + skipped, False
+
+        self._cooldown = self._backoff
+        self._backoff = min(self._backoff * 2, 64)
+        return executed, False
+
+    def _try_skip(self, trace, visits, snapshots, written, remaining, executed) -> Optional[int]:
+        """Son ziyaret iki eşit periyodu tamamlıyorsa atlar ve atlanan döngü sayısını döndürür."""
+        last = len(visits) - 1
+        if last % 2:
+            return None
+        half = last // 2
+        v0, v1, v2 = visits[0], visits[half], visits[last]
+        period = v1 - v0
+        if v2 - v1 != period or period > self.max_period:
+            return None
+        first, second = trace[v0:v1], trace[v1:v2]
+        if any(a[0] != b[0] or a[1] != b[1] for a, b in zip(first, second)):
+            return None
+
+        cpu = self.cpu
+        s0, s1, s2 = snapshots[0], snapshots[half], snapshots[last]
+        counters = set(cpu._used_ie_index.values())
+        counters.update((CPU.REG_PC, CPU.REG_INSTR_EXECUTED))
+        delta: Dict[int, int] = {}
+        for address in written | counters:
+            d = s1[address] - s0[address]
+            if s2[address] - s1[address] != d:
+                return None
+            if d:
+                delta[address] = d
+
+        # Atlanan k. periyotta (k = 2, 3, ...) JIF değeri a + k*d; sonucu (<= 0) değişmemeli.
+        periods = None
+        for a, b in zip(first, second):
+            value = a[2]
+            if value is None:
+                continue
+            d = b[2] - value
+            if d > 0 and value <= 0:
+                limit = -value // d          # value + k*d <= 0
+            elif d < 0 and value > 0:
+                limit = (value - 1) // -d    # value + k*d > 0
+            else:
+                continue
+            periods = limit if periods is None else min(periods, limit)
+        skip = (periods - 1 if periods is not None else None)
+        if remaining is not None:
+            fit = (remaining - executed) // period
+            skip = fit if skip is None else min(skip, fit)
+        if skip is None:
+            return None  # Çıkışı olmayan döngü: durmayan program atlanarak sonsuza gidemez
+        if skip <= 0:
+            return None
+
+        data = cpu._data
+        for address, d in delta.items():
+            value = data[address] + skip * d
+            if not -_WORD_LIMIT < value < _WORD_LIMIT:
+                return None
+        for address, d in delta.items():
+            data[address] += skip * d
+        self.fast_forwards += 1
+        self.skipped_cycles += skip * period
+        self._backoff = 1
+        return skip * period
+
+
+
+def _value_before(log, address, index) -> Optional[tuple]:
+    """Hücreye index. adımdan önce yapılan son yazmanın (değer, katsayı)'sı; yazılmadıysa None."""
+    value = None
+    for step, written, coefficient in log.get(address, ()):
+        if step >= index:
+            break
+        value = (written, coefficient)
+    return value
+
+
+def _leaving(steps) -> None:
+    """Model OS'nin döngüden çıktığı yere vardı: bekleme yok (None). Gerçek yürütme daha
+    önce ayrıldıysa çıkış modelin yoluna aittir, döngü bilinmiyor sayılır."""
+    if any(jif and (jif[0] <= 0) != jif[2] for _, _, _, jif in steps):
+        raise _Unmodelable
+    return None
+
+
+def _live_in(steps, fixed, head, index):
+    """head..index adımlarında yazılmadan önce okunan hücreler (döngünün girdileri)."""
+    seen = set(fixed)
+    for _, reads, writes, _ in steps[head:index]:
+        for address in reads:
+            if address not in seen:
+                seen.add(address)
+                yield address
+        seen.update(writes)
+
+
+def _shifted(steps, log, cells, data, fixed, head, index) -> bool:
+    """Periyot sonunda her girdi aynı katsayıyla tam katsayı * periyot kadar mı ilerledi?"""
+    period = index - head
+    for address in _live_in(steps, fixed, head, index):
+        value, coefficient = cells.get(address) or (data[address], 0)
+        before, before_coefficient = _value_before(log, address, head) or (data[address], 0)
+        if coefficient != before_coefficient or value != before + coefficient * period:
+            return False
+    return True
+
+
+def _drifting(steps, log, cells, data, fixed, first, head, index) -> bool:
+    """İki periyot aynı yoldan gitti ve her girdi iki periyotta da aynı miktar mı değişti?"""
+    for a, b in zip(steps[first:head], steps[head:index]):
+        if a[:3] != b[:3] or (a[3] is None) != (b[3] is None) or (a[3] and a[3][1:] != b[3][1:]):
+            return False
+    for address in _live_in(steps, fixed, first, head):
+        v0, c0 = _value_before(log, address, first) or (data[address], 0)
+        v1, c1 = _value_before(log, address, head) or (data[address], 0)
+        v2, c2 = cells.get(address) or (data[address], 0)
+        if not c0 == c1 == c2 or v2 - v1 != v1 - v0:
+            return False
+    return True
+
+
+def _rate(loop, index, address=None, value=None) -> int:
+    """Baş periyottaki index. adımın JIF değerinin (veya address'e yazdığı değerin) periyot başına değişimi."""
+    if loop.observed == 1:
+        step = loop.steps[index]
+        coefficient = step[3][1] if address is None else _value_before(loop.log, address, index + 1)[1]
+        return coefficient * loop.period
+    if address is None:
+        return loop.steps[index + loop.period][3][0] - loop.steps[index][3][0]
+    later = _value_before(loop.log, address, index + loop.period + 1)
+    return later[0] - value
+
+
+def _state_at(loop, target) -> Optional[Dict[int, int]]:
+    """Yazılan hücrelerin target. adımın başındaki değerleri; 64 bit'i taşan bir yazma varsa None."""
+    steps, log, head, period = loop.steps, loop.log, loop.head, loop.period
+    cells = {}
+    if target <= len(steps):
+        for address in log:
+            value = _value_before(log, address, target)
+            if value is not None:
+                cells[address] = value[0]
+        return cells
+    k, offset = divmod(target - head, period)
+    for address, entries in log.items():
+        value = last = None
+        for index, written, _ in entries:
+            if index < head:
+                value = written
+                continue
+            if index >= head + period:
+                break
+            # bu yazma son kez k. (offset'ten önceyse) veya k-1. periyotta yapıldı
+            repeats = k if index < head + offset else k - 1
+            value = written + _rate(loop, index, address, written) * repeats
+            if not WORD_MIN <= value <= WORD_MAX:
+                return None
+            if index < head + offset:
+                last = value
+        cells[address] = last if last is not None else value
+    return cells
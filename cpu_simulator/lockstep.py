@@ -0,0 +1,604 @@
+# cpu_simulator/lockstep.py
+"""
+Aynı programın N kopyasını NumPy ile birlikte (lockstep) çalıştıran motor.
+
+Parametre taramalarında (örn. bubble sort thread'inin 3551-3555'teki dizisi her
+kopyada farklı) N ayrı CPU yerine tek bir LockstepEngine kullanılır. Tüm kopyaların
+(lane) belleği tek bir int64 dizisidir: memory[adres, lane]. Komut deposu paylaşılır;
+her komut, o PC'deki tüm lane'ler için tek bir vektör işlemi olarak yürütülür.
+
+    - PC'leri farklılaşan lane'ler (JIF) ayrı gruplar olur. Her adımda en küçük PC'deki
+      grup yürütülür; geride kalan lane'ler böylece öndekilere yetişip birleşir.
+      Lane'ler birbirinden bağımsız olduğu için sıralama sonucu değiştirmez.
+    - UsedIE, IE ve PC CPU.run() ile aynı sırada güncellenir; her lane'in belleği,
+      modu, PRN çıktısı ve döngü sayısı tek başına CPU.run() ile birebir aynıdır.
+    - Hata verecek (geçersiz/korumalı adres, taşma), komut hücresine dokunan veya
+      vektör karşılığı olmayan (register_opcode ile eklenen/değiştirilen) bir komuta
+      gelen lane o komuttan önce kendi CPU'suna devredilir (scalar) ve oradan CPU.run()
+      ile devam eder; hata mesajları ve durma davranışı bu yüzden aynıdır.
+    - Erişim kontrolü şablon CPU'nun koruma nesnesini (mpu.py) izler: her lane'in o
+      anki erişim haritası (KERNEL ya da memory[15]'teki thread'in USER haritası) ayrı
+      tutulur; --isolate ile izole edilen thread'ler de böylece birebir aynı çalışır.
+
+Bellek lane başına memory_size * 8 bayttır (11000 kelime, 1000 lane: ~88 MB).
+CALL/RET/USER trace satırları üretilmez. NumPy isteğe bağlıdır: yalnızca bu modül
+kullanır ve yoksa LockstepEngine oluşturulurken ImportError verilir.
+
+Kullanım:
+    engine = LockstepEngine(cpu, lanes=1000)            # cpu: program yüklenmiş şablon
+    engine.memory[3551:3556] = arrays.T                 # lane başına girdi (5 x 1000)
+    result = engine.run(max_cycles=100000)             # RunResult, toplam komut sayısıyla
+    print(engine.read(3551), engine.prn_values(0))
+
+    python lockstep.py os_plus_threads.gtu -n 1000 --vary 3551:3556 --check 8
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import sys
+import time
+from array import array
+from typing import Dict, List
+
+try:
+    import numpy as np
+except ImportError:  # NumPy yalnızca bu motor için gerekir
+    np = None
+
+from cpu import CPU, RunResult, Snapshot
+from devices import ListDevice, PrnRecord
+from mpu import AccessMap
+from tracing import TraceSink
+
+_WORD_MIN, _WORD_MAX = -(1 << 63), (1 << 63) - 1
+
+# Sabit (komuta gömülü) adreslerin durumu; komut başına bir kez hesaplanır
+_STATIC_OK, _STATIC_MAPPED, _STATIC_NEVER = 0, 1, 2   # MAPPED: bir haritada kapalı adres var
+
+# komut -> (vektör handler metodu, veri adresi olan operand indeksleri, adresler KERNEL modunda mı kontrol edilir)
+_VECTOR = {
+    "SET": ("_op_set", (1,), False),
+    "CPY": ("_op_cpy", (0, 1), False),
+    "CPYI": ("_op_cpyi", (0, 1), False),
+    "CPYI2": ("_op_cpyi2", (0, 1), False),
+    "ADD": ("_op_add", (0,), False),
+    "ADDI": ("_op_addi", (0, 1), False),
+    "SUBI": ("_op_subi", (0, 1), False),
+    "JIF": ("_op_jif", (0,), False),
+    "PUSH": ("_op_push", (0,), False),
+    "POP": ("_op_pop", (0,), False),
+    "CALL": ("_op_call", (), False),
+    "RET": ("_op_ret", (), False),
+    "USER": ("_op_user", (0,), False),
+    "SYSCALL_PRN": ("_op_syscall_prn", (0,), True),   # mod adres kontrolünden önce KERNEL olur
+    "SYSCALL_HLT": ("_op_syscall_hlt", (), True),
+    "SYSCALL_YIELD": ("_op_syscall_yield", (), True),
+    "HLT": ("_op_hlt", (), False),
+}
+_IMMEDIATE = {"SET": 0, "ADD": 1}  # int64'e sığmayan sabit scalar yolda OverflowError verir
+_NO_STEP = object()                # boş hücre: PC ve IE değişmez (CPU.run() ile aynı)
+_ALL = slice(None)                 # tüm lane'ler
+
+
+class LockstepEngine:
+    """
+    *cpu*   – program yüklenmiş şablon CPU; durumu (bellek, mod) her lane'e kopyalanır,
+              kendisi değiştirilmez.
+    *lanes* – kopya sayısı.
+    """
+
+    def __init__(self, cpu: CPU, lanes: int) -> None:
+        if np is None:
+            raise ImportError("LockstepEngine requires NumPy (pip install numpy)")
+        if lanes < 1:
+            raise ValueError("lanes must be >= 1")
+        self.cpu = cpu
+        self.lanes = lanes
+        self._snapshot = cpu.snapshot()
+        self._size = size = cpu._memory_size
+
+        row = np.asarray(self._snapshot.data, dtype=np.int64)    # PagedWords (seyrek bellek) de olabilir
+        self.memory = np.repeat(row[:, None], lanes, axis=1)    # memory[adres, lane]
+        self.user = np.full(lanes, cpu.mode == "USER")
+        self.halted = np.full(lanes, cpu.is_halted)
+        self.cycles = np.zeros(lanes, dtype=np.int64)
+        self.outputs: List[List[PrnRecord]] = [[] for _ in range(lanes)]
+        self.scalar: Dict[int, CPU] = {}                         # lane -> devredildiği CPU
+        self._vector = np.ones(lanes, dtype=bool)
+        self._ids = np.arange(lanes)
+
+        self._code = self._snapshot.code
+        self._decoded: Dict[int, tuple] = {}
+        self._is_code = np.zeros(size, dtype=bool)
+        self._is_code[[a for a in self._code if 0 <= a < size]] = True
+        self._used_ie = dict(cpu._used_ie_index)
+        self._used_lut = np.full(max(self._used_ie, default=0) + 1, -1, dtype=np.int64)
+        for tid, address in self._used_ie.items():
+            if tid >= 0:
+                self._used_lut[tid] = address
+
+        # Erişim haritaları: satır 0 KERNEL, diğerleri kullanıldıkça eklenen USER haritaları
+        self._protection = cpu.protection
+        self._maps = np.ones((1, size), dtype=bool)
+        self._map_rows: Dict[AccessMap, int] = {cpu.protection.kernel_map: 0}
+        self._denied = np.zeros(size, dtype=bool)                # bir haritada kapalı adresler
+        self._map = np.full(lanes, self._map_row(cpu._access), dtype=np.int64)
+
+        # Alt sınıf bir komutu yeniden tanımladıysa o komut scalar yolda yorumlanır.
+        table = type(cpu).OPCODES
+        self._handlers = [None] * len(table)
+        for name, op in table.items():
+            spec = _VECTOR.get(name)
+            if spec is not None and op.handler is CPU.OPCODES[name].handler:
+                self._handlers[op.code] = (name, getattr(self, spec[0]), spec[1], spec[2])
+
+        self.vector_cycles = 0   # vektör yolda yürütülen lane-döngü sayısı
+        self.groups = 0          # vektör komut çağrısı sayısı (vector_cycles / groups = ortalama grup boyu)
+
+    # --- yürütme ---
+    def run(self, max_cycles=None, deadline=None) -> RunResult:
+        """
+        Tüm lane'ler durana veya bir sınıra ulaşana kadar çalıştırır.
+
+        max_cycles her lane için ayrı ve tam uygulanır (CPU.run(max_cycles) gibi).
+        Sonuçtaki cycles ve instructions tüm lane'lerin toplamıdır; ips toplam hızdır.
+        reason: "halted" (tüm lane'ler durdu), "max_cycles" veya "deadline".
+        """
+        memory = self.memory
+        perf_counter = time.perf_counter
+        start = perf_counter()
+        start_cycles = int(self.cycles.sum())
+        start_ie = int(self.read(CPU.REG_INSTR_EXECUTED).sum())
+        limit = None if max_cycles is None else self.cycles + max_cycles
+        reason = "halted"
+
+        runnable = self._runnable(limit)
+        while runnable.size:
+            if deadline is not None and perf_counter() >= deadline:
+                reason = "deadline"
+                break
+            pcs = memory[0, runnable]
+            pc = pcs.min()
+            if pc != pcs.max():
+                lanes = runnable[pcs == pc]
+            else:
+                # Tüm lane'ler aynı PC'deyse satır erişimleri kopyasız dilimlerle yapılır.
+                lanes = _ALL if runnable.size == self.lanes else runnable
+            if self._execute(int(pc), lanes) or (limit is not None and (self.cycles[lanes] >= limit[lanes]).any()):
+                runnable = self._runnable(limit)
+
+        for lane, cpu in self.scalar.items():
+            if cpu.is_halted:
+                continue
+            budget = None if limit is None else int(limit[lane] - self.cycles[lane])
+            if budget is not None and budget <= 0:
+                continue
+            result = cpu.run(budget, deadline)
+            self.cycles[lane] += result.cycles
+            self.halted[lane] = cpu.is_halted
+            if result.reason == "deadline":
+                reason = "deadline"
+
+        if reason != "deadline" and not self.halted.all():
+            reason = "max_cycles"
+        elapsed = perf_counter() - start
+        return RunResult(reason, int(self.cycles.sum()) - start_cycles,
+                         int(self.read(CPU.REG_INSTR_EXECUTED).sum()) - start_ie, elapsed)
+
+    def _runnable(self, limit):
+        runnable = self._vector & ~self.halted
+        if limit is not None:
+            runnable &= self.cycles < limit
+        return np.flatnonzero(runnable)
+
+    def _lane_ids(self, lanes):
+        """_ALL dilimini lane indeks dizisine çevirir (dolaylı erişimler ve maskeler için)."""
+        return self._ids if lanes is _ALL else lanes
+
+    def _execute(self, pc: int, lanes) -> bool:
+        """
+        PC'si pc olan lane'lerde bir döngü yürütür; lane kümesi değiştiyse True döndürür.
+        lanes bir lane indeks dizisi veya tüm lane'ler için _ALL dilimidir.
+        """
+        changed = False
+        if not 0 <= pc < self._size:
+            self._evict(self._lane_ids(lanes))
+            return True
+        if self._denied[pc]:
+            denied = ~self._maps[self._map[lanes], pc]
+            if denied.any():
+                lanes = self._lane_ids(lanes)
+                self._evict(lanes[denied])
+                lanes = lanes[~denied]
+                changed = True
+                if not lanes.size:
+                    return True
+
+        decoded = self._decoded.get(pc)
+        if decoded is None:
+            decoded = self._decoded[pc] = self._decode(pc)
+        handler, operands, static, checked = decoded
+        if static == _STATIC_NEVER:
+            self._evict(self._lane_ids(lanes))
+            return True
+        if static == _STATIC_MAPPED:
+            denied = ~self._maps[self._map[lanes][:, None], checked].all(axis=1)
+            if denied.any():
+                lanes = self._lane_ids(lanes)
+                self._evict(lanes[denied])
+                lanes = lanes[~denied]
+                changed = True
+                if not lanes.size:
+                    return True
+
+        self._count_used_ie(lanes, 1)
+        bad, next_pc = handler(pc, lanes, *operands)
+        if bad is not None:
+            # Hiçbir şey yazılmadı; sapan lane'ler scalar CPU'da bu komuttan devam eder.
+            lanes = self._lane_ids(lanes)
+            self._count_used_ie(lanes[bad], -1)
+            self._evict(lanes[bad])
+            lanes = lanes[~bad]
+            changed = True
+            if not lanes.size:
+                return True
+            bad, next_pc = handler(pc, lanes, *operands)
+
+        self.cycles[lanes] += 1
+        self.vector_cycles += self.lanes if lanes is _ALL else lanes.size
+        self.groups += 1
+        if next_pc is None:
+            self.halted[lanes] = True
+            return True
+        if next_pc is not _NO_STEP:
+            memory = self.memory
+            memory[0, lanes] = next_pc
+            memory[3, lanes] += 1
+        return changed
+
+    def _decode(self, pc: int) -> tuple:
+        """
+        (handler, operandlar, sabit adres durumu, haritalarda kontrol edilecek adresler);
+        vektör karşılığı yoksa _STATIC_NEVER.
+        """
+        entry = self._code.get(pc)
+        if entry is None:
+            return self._op_empty, (), _STATIC_OK, ()
+        opcode_id, operands, error = entry[1]
+        spec = self._handlers[opcode_id] if error is None else None
+        if spec is None:
+            return None, operands, _STATIC_NEVER, ()
+        name, handler, address_operands, kernel = spec
+        immediate = _IMMEDIATE.get(name)
+        if immediate is not None and not _WORD_MIN <= operands[immediate] <= _WORD_MAX:
+            return handler, operands, _STATIC_NEVER, ()
+        checked = []
+        for index in address_operands:
+            address = operands[index]
+            if not 0 <= address < self._size or self._is_code[address]:
+                return handler, operands, _STATIC_NEVER, ()
+            if self._denied[address] and not kernel:
+                checked.append(address)
+        return handler, operands, _STATIC_MAPPED if checked else _STATIC_OK, checked
+
+    def _map_row(self, access: AccessMap) -> int:
+        """Erişim haritasının _maps satırı; yeni haritayı ekler (sabit adres kararları yeniden hesaplanır)."""
+        row = self._map_rows.get(access)
+        if row is None:
+            allowed = np.zeros(self._size, dtype=bool)
+            for region in access.ranges:
+                allowed[region.start:region.stop] = True
+            row = self._map_rows[access] = len(self._maps)
+            self._maps = np.vstack((self._maps, allowed))
+            self._denied |= ~allowed
+            self._decoded.clear()
+        return row
+
+    def _count_used_ie(self, lanes, delta: int) -> None:
+        """Lane'lerin çalışan thread'inin (memory[15]) UsedIE alanına delta ekler."""
+        memory = self.memory
+        tids = memory[15, lanes]
+        first = tids[0]
+        if first == tids.max() and first == tids.min():
+            address = self._used_ie.get(int(first))
+            if address is not None:
+                memory[address, lanes] += delta
+            return
+        lut = self._used_lut
+        known = (tids >= 0) & (tids < lut.size)
+        addresses = lut[np.where(known, tids, 0)]
+        known &= addresses >= 0
+        memory[addresses[known], self._lane_ids(lanes)[known]] += delta
+
+    def _data_bad(self, addresses, lanes, kernel=False):
+        """Dolaylı veri adresleri: bellek dışı, komut hücresi veya lane'in haritasında kapalı olanların maskesi."""
+        bad = (addresses < 0) | (addresses >= self._size)
+        safe = np.where(bad, 0, addresses)
+        bad |= self._is_code[safe]
+        if not kernel:
+            bad |= ~self._maps[self._map[lanes], safe]
+        return bad if bad.any() else None
+
+    def _jump_bad(self, addresses):
+        """KERNEL modunda atlanan handler adresleri (syscall'lar) için sınır kontrolü."""
+        bad = (addresses < 0) | (addresses >= self._size)
+        return bad if bad.any() else None
+
+    # --- scalar devir ---
+    def _evict(self, lanes) -> None:
+        """Lane'leri kendi CPU'larına devreder; bu lane'ler run() sonunda CPU.run() ile sürer."""
+        snapshot = self._snapshot
+        for lane in lanes.tolist():
+            device = ListDevice()
+            device.records = self.outputs[lane]
+            with contextlib.redirect_stdout(io.StringIO()):
+                cpu = type(self.cpu)(memory_size=self._size, trace=TraceSink(enabled=False), prn_device=device)
+            cpu.set_protection(self._protection)
+            cpu.restore(Snapshot(array("q", self.memory[:, lane].tobytes()), snapshot.code,
+                                 "USER" if self.user[lane] else "KERNEL", False))
+            cpu.set_tcb_layout(self.cpu.tcb_layout)
+            self.scalar[lane] = cpu
+            self._vector[lane] = False
+
+    # --- sonuçlar ---
+    def read(self, address: int):
+        """Adresin her lane'deki değeri (int64 dizisi)."""
+        values = self.memory[address].copy()
+        for lane, cpu in self.scalar.items():
+            values[lane] = cpu._data[address]
+        return values
+
+    def lane_memory(self, lane: int):
+        """Bir lane'in tüm belleği (int64 dizisi; komut hücreleri 0)."""
+        cpu = self.scalar.get(lane)
+        if cpu is not None:
+            return np.frombuffer(cpu._data, dtype=np.int64).copy()
+        return self.memory[:, lane].copy()
+
+    def lane_mode(self, lane: int) -> str:
+        cpu = self.scalar.get(lane)
+        if cpu is not None:
+            return cpu.mode
+        return "USER" if self.user[lane] else "KERNEL"
+
+    def prn_values(self, lane: int) -> list:
+        return [record.value for record in self.outputs[lane]]
+
+    # --- vektör komutlar ---
+    # Her handler (pc, lanes, *operandlar) alır ve (bad, next_pc) döndürür. bad None değilse
+    # hiçbir şey yazılmamıştır ve maskedeki lane'ler devredilir. next_pc None -> HLT.
+    # Sabit adresler _decode'da kontrol edilmiştir; burada yalnızca dolaylı adreslere bakılır.
+
+    def _op_empty(self, pc, lanes):
+        bad = self.memory[pc, lanes] != 0   # Veri hücresi yürütülemez (scalar yol uyarır)
+        if bad.any():
+            return bad, None
+        return None, _NO_STEP
+
+    def _op_hlt(self, pc, lanes):
+        return None, None
+
+    def _op_set(self, pc, lanes, value, address):
+        self.memory[address, lanes] = value
+        return None, (value if address == CPU.REG_PC else pc + 1)
+
+    def _op_cpy(self, pc, lanes, source, dest):
+        memory = self.memory
+        memory[dest, lanes] = memory[source, lanes]
+        return None, (memory[0, lanes] if dest == CPU.REG_PC else pc + 1)
+
+    def _op_cpyi(self, pc, lanes, pointer, dest):
+        memory = self.memory
+        source = memory[pointer, lanes]
+        bad = self._data_bad(source, lanes)
+        if bad is not None:
+            return bad, None
+        memory[dest, lanes] = memory[source, self._lane_ids(lanes)]
+        return None, (memory[0, lanes] + 1 if dest == CPU.REG_PC else pc + 1)
+
+    def _op_cpyi2(self, pc, lanes, source_pointer, dest_pointer):
+        memory = self.memory
+        ids = self._lane_ids(lanes)
+        # Kopya olarak okunur: hedef, işaretçi hücresinin kendisi olabilir (dilim okuması görünüm verir).
+        source = memory[source_pointer, ids]
+        dest = memory[dest_pointer, ids]
+        bad = self._data_bad(np.concatenate((source, dest)), np.concatenate((ids, ids)))
+        if bad is not None:
+            n = ids.size
+            return bad[:n] | bad[n:], None
+        memory[dest, ids] = memory[source, ids]
+        return None, memory[0, lanes] + (dest != CPU.REG_PC)
+
+    def _op_add(self, pc, lanes, address, value):
+        memory = self.memory
+        current = memory[address, lanes]
+        if value > 0:
+            bad = current > _WORD_MAX - value
+        else:
+            bad = current < _WORD_MIN - value
+        if bad.any():
+            return bad, None
+        memory[address, lanes] = current + value
+        return None, (memory[0, lanes] + 1 if address == CPU.REG_PC else pc + 1)
+
+    def _op_addi(self, pc, lanes, dest, source):
+        memory = self.memory
+        x = memory[dest, lanes]
+        y = memory[source, lanes]
+        result = x + y
+        bad = ((x ^ result) & (y ^ result)) < 0
+        if bad.any():
+            return bad, None
+        memory[dest, lanes] = result
+        return None, (memory[0, lanes] + 1 if dest == CPU.REG_PC else pc + 1)
+
+    def _op_subi(self, pc, lanes, address1, address2):
+        memory = self.memory
+        x = memory[address1, lanes]
+        y = memory[address2, lanes]
+        result = x - y
+        bad = ((x ^ y) & (x ^ result)) < 0
+        if bad.any():
+            return bad, None
+        memory[address2, lanes] = result
+        return None, (memory[0, lanes] + 1 if address2 == CPU.REG_PC else pc + 1)
+
+    def _op_jif(self, pc, lanes, condition, target):
+        return None, np.where(self.memory[condition, lanes] <= 0, target, pc + 1)
+
+    def _op_push(self, pc, lanes, source):
+        memory = self.memory
+        sp = memory[CPU.REG_SP, lanes] - 1
+        bad = self._data_bad(sp, lanes)
+        if bad is not None:
+            return bad, None
+        ids = self._lane_ids(lanes)
+        memory[CPU.REG_SP, lanes] = sp
+        memory[sp, ids] = memory[source, lanes]
+        return None, memory[0, lanes] + 1
+
+    def _op_pop(self, pc, lanes, dest):
+        memory = self.memory
+        sp = memory[CPU.REG_SP, lanes]
+        bad = self._data_bad(sp, lanes)
+        if bad is not None:
+            return bad, None
+        memory[dest, lanes] = memory[sp, self._lane_ids(lanes)]
+        memory[CPU.REG_SP, lanes] += 1
+        return None, memory[0, lanes] + 1
+
+    def _op_call(self, pc, lanes, target):
+        memory = self.memory
+        sp = memory[CPU.REG_SP, lanes] - 1
+        bad = self._data_bad(sp, lanes)
+        if bad is not None:
+            return bad, None
+        memory[CPU.REG_SP, lanes] = sp
+        memory[sp, self._lane_ids(lanes)] = pc + 1
+        return None, target
+
+    def _op_ret(self, pc, lanes):
+        memory = self.memory
+        sp = memory[CPU.REG_SP, lanes]
+        bad = self._data_bad(sp, lanes)
+        if bad is not None:
+            return bad, None
+        return_address = memory[sp, self._lane_ids(lanes)]
+        memory[CPU.REG_SP, lanes] = sp + 1
+        return None, return_address
+
+    def _op_user(self, pc, lanes, address):
+        self.user[lanes] = True
+        ids = self._lane_ids(lanes)
+        tids = self.memory[15, ids]
+        for tid in np.unique(tids).tolist():
+            self._map[ids[tids == tid]] = self._map_row(self._protection.user_map(tid))
+        return None, self.memory[address, lanes]
+
+    def _syscall(self, lanes, kind, result, handler_address):
+        memory = self.memory
+        handler = memory[handler_address, lanes]
+        bad = self._jump_bad(handler)
+        if bad is not None:
+            return bad, None
+        self.user[lanes] = False
+        self._map[lanes] = 0
+        memory[CPU.MEM_OS_SYSCALL_TYPE, lanes] = kind
+        memory[CPU.REG_SYSCALL_RESULT, lanes] = result
+        return None, handler
+
+    def _op_syscall_prn(self, pc, lanes, address):
+        memory = self.memory
+        if self._jump_bad(memory[CPU.MEM_OS_SYSCALL_PRN_HANDLER, lanes]) is None:
+            outputs = self.outputs
+            for lane, value, tid, ie in zip(self._lane_ids(lanes).tolist(), memory[address, lanes].tolist(),
+                                            memory[15, lanes].tolist(), memory[3, lanes].tolist()):
+                outputs[lane].append(PrnRecord(value, tid, pc, ie))
+        return self._syscall(lanes, 0, pc + 1, CPU.MEM_OS_SYSCALL_PRN_HANDLER)
+
+    def _op_syscall_hlt(self, pc, lanes):
+        return self._syscall(lanes, 1, 0, CPU.MEM_OS_SYSCALL_HLT_HANDLER)
+
+    def _op_syscall_yield(self, pc, lanes):
+        return self._syscall(lanes, 2, pc + 1, CPU.MEM_OS_SYSCALL_YIELD_HANDLER)
+
+
+def _load(path):
+    from bios import load_and_parse_gtu_program
+    with contextlib.redirect_stdout(io.StringIO()):
+        cpu = CPU(trace=TraceSink(enabled=False), prn_device=ListDevice())
+        data_segment, instruction_segment = load_and_parse_gtu_program(path)
+        cpu.load_program_to_memory(data_segment, instruction_segment)
+    return cpu
+
+
+def _parse_range(text: str):
+    try:
+        start, end = (int(part) for part in text.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Geçersiz aralık '{text}', beklenen BAŞLANGIÇ:BİTİŞ")
+    if end <= start:
+        raise argparse.ArgumentTypeError(f"Boş aralık '{text}'")
+    return start, end
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="GTU-C312 programını farklı girdilerle N kopya halinde NumPy üzerinde birlikte çalıştırır.")
+    parser.add_argument("program")
+    parser.add_argument("-n", "--lanes", type=int, default=1000, help="kopya sayısı (varsayılan: 1000)")
+    parser.add_argument("--vary", type=_parse_range, action="append", default=[], metavar="BAŞ:BİT",
+                        help="her lane'de rastgele doldurulacak [BAŞ, BİT) adresleri (tekrarlanabilir)")
+    parser.add_argument("--low", type=int, default=-100, help="rastgele değerlerin alt sınırı")
+    parser.add_argument("--high", type=int, default=100, help="rastgele değerlerin üst sınırı (dahil)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-c", "--cycles", type=int, default=None, help="lane başına en fazla döngü")
+    parser.add_argument("--check", type=int, default=4,
+                        help="ayrı CPU ile doğrulanacak lane sayısı (varsayılan: 4)")
+    args = parser.parse_args(argv)
+    if args.lanes < 1:
+        parser.error("--lanes must be >= 1")
+    if np is None:
+        parser.error("lockstep.py requires NumPy (pip install numpy)")
+
+    template = _load(args.program)
+    engine = LockstepEngine(template, args.lanes)
+    rng = np.random.default_rng(args.seed)
+    inputs = []  # (başlangıç, değerler[adres, lane]); doğrulama için saklanır
+    for start, end in args.vary:
+        values = rng.integers(args.low, args.high, size=(end - start, args.lanes), endpoint=True)
+        engine.memory[start:end] = values
+        inputs.append((start, values))
+
+    result = engine.run(max_cycles=args.cycles)
+    print(f"Lockstep   : {args.lanes} lane, {result.reason}, {result.instructions} komut, "
+          f"{result.elapsed * 1000:.1f} ms, {result.ips:,.0f} komut/sn")
+    groups = max(engine.groups, 1)
+    print(f"Vektör     : {engine.vector_cycles} lane-döngü, {engine.groups} grup "
+          f"(ortalama {engine.vector_cycles / groups:.1f} lane/grup), scalar'a devredilen {len(engine.scalar)}")
+
+    checked = min(args.check, args.lanes)
+    same = True
+    elapsed = instructions = 0
+    for lane in np.linspace(0, args.lanes - 1, checked, dtype=int).tolist() if checked else ():
+        cpu = _load(args.program)
+        for start, values in inputs:
+            for offset, value in enumerate(values[:, lane].tolist()):
+                cpu.memory[start + offset] = value
+        reference = cpu.run(max_cycles=args.cycles)
+        elapsed += reference.elapsed
+        instructions += reference.instructions
+        lane_same = (np.array_equal(np.frombuffer(cpu._data, dtype=np.int64), engine.lane_memory(lane))
+                     and cpu.mode == engine.lane_mode(lane) and cpu.is_halted == bool(engine.halted[lane])
+                     and cpu.prn_device.records == engine.outputs[lane])
+        same &= lane_same
+        print(f"lane {lane:>6}: PRN={engine.prn_values(lane)} {'aynı' if lane_same else 'FARKLI'}")
+    if instructions and elapsed:
+        scalar_ips = instructions / elapsed
+        print(f"Tek CPU    : {scalar_ips:,.0f} komut/sn -> toplam hız {result.ips / scalar_ips:.1f}x")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
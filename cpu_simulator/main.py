@@ -1,64 +1,157 @@
 # main.py
+import os
 import sys
 from cpu import CPU
 from bios import load_and_parse_gtu_program
+from tracing import TraceSink
+from devices import FileDevice
+from blocks import BlockEngine
+from mpu import MemoryProtection
+from memory import PagedMemory
+from checkpoint import MappedMemory
+from monitor import DEFAULT_NAME, SharedMachineMemory
+
+def _parse_program(program_filepath):
+    """Programı BIOS ile ayrıştırır; (data, instruction) segmentleri ya da yüklenemezse None."""
+    try:
+        data_segment, instruction_segment = load_and_parse_gtu_program(program_filepath)
+    except (OSError, ValueError) as e:
+        print(f"Program yüklenemedi: {e}")
+        return None
+    if data_segment is None or instruction_segment is None:
+        print(f"Program yüklenemedi: {program_filepath}")
+        return None
+    return data_segment, instruction_segment
 
 def main():
-    if len(sys.argv) < 2:
-        print("Kullanım: python main.py <gtu_dosya_yolu>")
+    # --jit: sıcak temel blokları derleyen BlockEngine ile çalıştır
+    use_blocks = "--jit" in sys.argv
+    # --isolate: her kullanıcı thread'i yalnızca kendi 1000'lik bloğuna erişebilir (mpu.py)
+    isolate = "--isolate" in sys.argv
+    # --paged[=BOYUT]: sayfaları ilk dokunuşta ayrılan seyrek bellek (memory.py), BOYUT kelimelik adres alanı
+    # --mmap=DOSYA: bellek bir dosyaya eşlenir (checkpoint.MappedMemory); dosyada program varsa oradan devam edilir
+    # --shm[=AD]: bellek paylaşımlı bellekte tutulur; monitor.py (gtu-top) çalışmayı canlı izler
+    paged_size = None
+    mapped_path = None
+    shared_name = None
+    for arg in sys.argv:
+        if arg == "--paged" or arg.startswith("--paged="):
+            try:
+                paged_size = int(arg.partition("=")[2] or 11000)
+            except ValueError:
+                print(f"Geçersiz bellek boyutu: {arg}")
+                sys.exit(1)
+        elif arg.startswith("--mmap="):
+            mapped_path = arg.partition("=")[2]
+        elif arg == "--shm" or arg.startswith("--shm="):
+            shared_name = arg.partition("=")[2] or DEFAULT_NAME
+    if sum(option is not None for option in (paged_size, mapped_path, shared_name)) > 1:
+        print("--paged, --mmap ve --shm birlikte kullanılamaz.")
         sys.exit(1)
+    args = [arg for arg in sys.argv
+            if arg not in ("--jit", "--isolate") and not arg.startswith(("--paged", "--mmap=", "--shm"))]
 
-    open("instructions_output.txt", "w", encoding="utf-8").close()
-    open("output.txt", "w", encoding="utf-8").close()
-    
-    program_filepath = sys.argv[1]
+    if len(args) < 2:
+        print("Kullanım: python main.py <gtu_dosya_yolu> [max_cycle] [--jit] [--isolate] [--paged[=BOYUT] | --mmap=DOSYA | --shm[=AD]]")
+        sys.exit(1)
+
+    program_filepath = args[1]
 
     # Eğer kullanıcı 2. argüman olarak cycle sayısı girdiyse onu al
     max_execution_cycles = 1000  # Varsayılan değer
-    if len(sys.argv) >= 3:
+    if len(args) >= 3:
         try:
-            max_execution_cycles = int(sys.argv[2])
+            max_execution_cycles = int(args[2])
         except ValueError:
-            print(f"Geçersiz döngü sayısı: {sys.argv[2]}. Varsayılan 1000 kullanılacak.")
+            print(f"Geçersiz döngü sayısı: {args[2]}. Varsayılan 1000 kullanılacak.")
 
     print(f"GTU-C312 Simülatörü Başlatılıyor...")
     print(f"Program Dosyası: {program_filepath}")
 
-    # 1. CPU örneğini oluştur
-    my_cpu = CPU()
+    # 1. BIOS ile programı ayrıştır. Bellek (paylaşımlı bölge, bellek dosyası) ancak program
+    #    yüklenebildiyse oluşturulur; böylece hatalı bir çalışma geride bölge bırakmaz.
+    #    Var olan bir bellek dosyasından devam edilirken program gerekmez.
+    program = None
+    if not (mapped_path and os.path.exists(mapped_path)):
+        program = _parse_program(program_filepath)
+        if program is None:
+            sys.exit(1)
 
-    # 2. BIOS ile programı ayrıştır
-    data_segment, instruction_segment = load_and_parse_gtu_program(program_filepath)
+    # 2. CPU örneğini oluştur (trace dosyası çalışma boyunca bir kez açılır)
+    memory = None
+    if paged_size is not None:
+        memory = PagedMemory(paged_size)
+    elif mapped_path:
+        try:
+            memory = MappedMemory(mapped_path, 11000)
+        except (OSError, ValueError) as e:
+            print(f"Bellek dosyası açılamadı: {e}")
+            sys.exit(1)
+    elif shared_name:
+        try:
+            memory = SharedMachineMemory(shared_name)
+        except FileExistsError:
+            print(f"Paylaşımlı bellek zaten var: {shared_name} (başka bir simülasyon çalışıyor olabilir)")
+            sys.exit(1)
+    # Bellek dosyasından devam edilirken önceki parçanın trace ve PRN çıktısı korunur
+    resuming = bool(mapped_path and memory.code)
+    output_mode = "a" if resuming else "w"
+    trace = TraceSink("instructions_output.txt", mode=output_mode, echo=sys.stdout)
+    prn_output = FileDevice("output.txt", mode=output_mode)  # SYSCALL_PRN çıktıları toplu yazılır
+    my_cpu = CPU(trace=trace, prn_device=prn_output, memory=memory)
 
-    if data_segment is None or instruction_segment is None:
-        print(f"Program yüklenemedi: {program_filepath}")
-        sys.exit(1)
-    
-    # 3. Programı CPU belleğine yükle
-    my_cpu.load_program_to_memory(data_segment, instruction_segment)
+    if resuming:
+        # Dosyada önceki bir çalışmanın durumu var: program yeniden yüklenmez
+        my_cpu.restore(memory.state())
+        print(f"Bellek dosyasından devam ediliyor: {mapped_path} (PC={my_cpu.pc}, IE={my_cpu.instructions_executed})")
+    else:
+        if program is None:
+            # Bellek dosyası var ama henüz program içermiyor
+            program = _parse_program(program_filepath)
+            if program is None:
+                memory.close()
+                sys.exit(1)
+
+        # 3. Programı CPU belleğine yükle
+        my_cpu.load_program_to_memory(*program)
+        if mapped_path:
+            memory.sync(my_cpu.mode, my_cpu.is_halted)
+    if shared_name:
+        memory.publish(my_cpu.mode, my_cpu.is_halted)
+        print(f"Bellek paylaşımlı bellekte: {shared_name} (izlemek için: python monitor.py {shared_name})")
+    if isolate:
+        my_cpu.set_protection(MemoryProtection.thread_blocks(len(my_cpu.memory), my_cpu.tcb_layout.bases))
     
     print("\nCPU Çalıştırılıyor...")
-    # 4. CPU'yu çalıştır
-    current_cycles = 0
+    # 4. CPU'yu çalıştır (adım adım debug gerekmediği için hızlı döngü kullanılır;
+    #    debug modları simulate.py'dadır)
+    result = None
+    engine = BlockEngine(my_cpu) if use_blocks else None
     try:
-        while not my_cpu.is_halted and current_cycles < max_execution_cycles:
-            my_cpu.run_cycle()
-            current_cycles += 1
-            # Debug modları burada devreye girecek (ileride)
-            # if debug_mode == 1: my_cpu.dump_memory(...)
-            # if debug_mode == 2: my_cpu.dump_memory(...); input("Devam etmek için Enter'a basın...")
+        if engine is not None:
+            result = engine.run(max_cycles=max_execution_cycles)
+        else:
+            result = my_cpu.run(max_cycles=max_execution_cycles)
 
-        if current_cycles >= max_execution_cycles and not my_cpu.is_halted:
+        if result.reason == "max_cycles":
             print("\nMaksimum döngü sayısına ulaşıldı, CPU durdurulmadı. Programda sonsuz döngü olabilir.")
     except Exception as e:
         print(f"\nSimülasyon sırasında bir hata oluştu: {e}")
     finally:
+        trace.close()
+        prn_output.close()
         print("\nSimülasyon Durumu:")
         print(f"  CPU Durumu: {'DURDU (Halted)' if my_cpu.is_halted else 'ÇALIŞIYOR (Not Halted)'}")
         print(f"  Toplam Yürütülen Komut Sayısı: {my_cpu.instructions_executed}")
         print(f"  Program Sayacı (PC): {my_cpu.pc}")
         print(f"  Yığın İşaretçisi (SP): {my_cpu.sp}")
         print(f"  Sistem Çağrısı Sonucu: {my_cpu.syscall_result}")
+        if result is not None:
+            print(f"  Döngü Sayısı: {result.cycles} ({result.elapsed:.3f} sn, {result.ips:.0f} komut/sn)")
+        if engine is not None:
+            print(f"  Derlenen Blok: {engine.compiled_blocks} (blokta {engine.block_cycles}, yorumlanan {engine.interpreted_cycles} döngü)")
+        if paged_size is not None:
+            print(f"  Ayrılan Sayfa: {memory.allocated_pages} x {memory.data.page_size} kelime ({len(memory)} kelimelik adres alanı)")
         print(f"\nDEBUG - Kritik Memory Adresleri:")
         print(f"  memory[17] (saved_pc): {my_cpu.memory[17]}")
         print(f"  memory[30] (TCB2_PC): {my_cpu.memory[30]}")
@@ -66,6 +159,13 @@ def main():
         print(f"  memory[15] (current_thread_id): {my_cpu.memory[15]}")
         print(f"  memory[16] (next_thread_id): {my_cpu.memory[16]}")
         print(f"  OS Sistem Çağrısı Tipi: {my_cpu.memory[CPU.MEM_OS_SYSCALL_TYPE]}") # OS syscall tipini de yazdıralım
+        if mapped_path:
+            memory.sync(my_cpu.mode, my_cpu.is_halted)
+            memory.close()
+            print(f"  Bellek dosyası: {mapped_path}")
+        if shared_name:
+            memory.publish(my_cpu.mode, my_cpu.is_halted)
+            memory.close()
 
         # İsteğe bağlı: Belleğin belirli bir kısmını dök
         # print("\nSon Bellek Durumu (Örnek Adresler):")
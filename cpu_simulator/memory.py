@@ -0,0 +1,437 @@
+# cpu_simulator/memory.py
+"""
+GTU-C312 bellek modeli.
+
+Eskiden CPU.memory, Python int'leri ile komut string'lerini aynı hücrelerde karıştıran
+düz bir listeydi. Memory iki ayrı depo tutar:
+
+    data – tüm adresler için işaretli 64-bit kelimeler (array('q'))
+    code – komut içeren adresler için {adres: (komut_string, çözülmüş_komut)}
+
+Dışarıdan bakan kod için memory[i] semantiği aynıdır: komut hücresi okunursa komut
+string'i, diğer hücreler için tamsayı değer döner. Bir komut hücresine yazılan her
+değer o hücrenin çözülmüş kaydını geçersiz kılar (self-modifying kod desteği).
+
+CPU handler'ları hız için data/code depolarına doğrudan erişir; yazma yaptıkları
+adres code içindeyse invalidate() çağırırlar. Komut deposundaki her değişiklik
+code_version'ı artırır ve değişen adres kısa bir kayda eklenir; code_changes(sürüm)
+o sürümden beri değişen hücreleri verir (derlenmiş bloklar yalnızca bunları atar).
+
+enable_write_tracking() data deposunu yazılan adresleri kaydeden bir array alt sınıfıyla
+değiştirir (debug modları için); take_writes() son çağrıdan beri yazılan adresleri verir.
+Takip kapalıyken normal array kullanıldığından yürütmeye ek maliyet yoktur.
+
+PagedMemory aynı arayüzle seyrek (sparse) bir adres alanı sunar: data deposu sabit
+boyutlu sayfalardan oluşur ve bir sayfa yalnızca ilk kez sıfırdan farklı bir değer
+yazıldığında ayrılır (okunan boş sayfa 0 döner). Milyonlarca hücrelik bir adres alanı
+böylece yalnızca dokunulan sayfalar kadar yer tutar; nonzero() (dump'lar) ve snapshot()
+yalnızca ayrılmış sayfaları gezer. Erişim dense belleğe göre daha yavaştır (her
+indeksleme bir Python çağrısı), bu yüzden varsayılan bellek Memory'dir.
+
+    cpu = CPU(memory=PagedMemory(4_000_000))
+    python main.py program.gtu 20000 --paged=4000000
+
+ViewMemory kelimeleri dışarıda sahiplenilen bir buffer üzerindeki memoryview('q')'de tutar
+(dosya eşlemesi: checkpoint.MappedMemory, paylaşımlı bellek: monitor.SharedMachineMemory).
+Erişim array kadar hızlıdır; dilim bir görünüm olduğu için kopyalar copy_words() ile alınır.
+"""
+from __future__ import annotations
+from array import array
+from itertools import compress
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+WORD_TYPECODE = "q"  # signed long long – proje dokümanındaki "signed long integer"
+WORD_MIN, WORD_MAX = -(1 << 63), (1 << 63) - 1  # bir bellek kelimesinin değer aralığı
+DEFAULT_PAGE_SIZE = 1024  # kelime; 2'nin kuvveti olmalı (adres -> sayfa bir kaydırma ile bulunur)
+CODE_LOG_SIZE = 4096  # code_changes() için tutulan en fazla değişiklik kaydı
+
+
+def copy_words(words):
+    """Kelime deposunun bağımsız bir kopyası (array, PagedWords veya memoryview; görünüm dilimi kopya değildir)."""
+    if isinstance(words, memoryview):
+        return array(WORD_TYPECODE, words.tobytes())
+    return words[:]
+
+
+class TrackedWords(array):
+    """Her yazılan adresi self.written kümesine ekleyen array('q')."""
+
+    def __new__(cls, initial=b""):
+        self = super().__new__(cls, WORD_TYPECODE, initial)
+        self.written = set()
+        return self
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self.written.update(range(*index.indices(len(self))))
+        else:
+            self.written.add(index if index >= 0 else index + len(self))
+        super().__setitem__(index, value)
+
+
+class Memory:
+    """Yoğun (dense) bellek: tüm adres alanı için tek bir array('q') ayrılır."""
+
+    def __init__(self, size: int, decode: Optional[Callable[[str], tuple]] = None) -> None:
+        self.size = size
+        self.data = array(WORD_TYPECODE, bytes(size * array(WORD_TYPECODE).itemsize))
+        self.code: Dict[int, Tuple[str, tuple]] = {}
+        # Komut string'lerini çözen fonksiyon; CPU kendi komut tablosuna göre ayarlar.
+        self.decode = decode
+        # Komut deposu her değiştiğinde artar; derlenmiş bloklar bununla geçerliliğini kontrol eder.
+        self.code_version = 0
+        self._code_log = []  # code_version artışı başına değişen adres (None: tüm depo)
+
+    # --- list benzeri arayüz ---
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, address):
+        if isinstance(address, slice):
+            return [self[i] for i in range(*address.indices(self.size))]
+        entry = self.code.get(address)
+        if entry is not None:
+            return entry[0]
+        return self.data[address]
+
+    def __setitem__(self, address: int, value) -> None:
+        if isinstance(value, str):
+            self.data[address] = 0
+            self.code[address] = (value, self.decode(value) if self.decode else None)
+            self.code_changed(address)
+            return
+        self.data[address] = value
+        if address in self.code:
+            self.invalidate(address)
+
+    def __iter__(self) -> Iterator:
+        code = self.code
+        if not code:
+            return iter(self.data)
+        return (code[i][0] if i in code else v for i, v in enumerate(self.data))
+
+    # --- komut deposu ---
+    def invalidate(self, address: int) -> None:
+        """Adresteki çözülmüş komutu siler; hücre artık veri hücresidir."""
+        del self.code[address]
+        self.code_changed(address)
+
+    def copy_cell(self, source: int, dest: int) -> None:
+        """source hücresini (veri veya komut) dest hücresine kopyalar."""
+        self.data[dest] = self.data[source]
+        entry = self.code.get(source)
+        if entry is not None:
+            self.code[dest] = entry
+            self.code_changed(dest)
+        elif dest in self.code:
+            self.invalidate(dest)
+
+    # --- yazma takibi ---
+    def enable_write_tracking(self) -> None:
+        """data deposunu TrackedWords ile değiştirir; bağlı referanslar yenilenmelidir."""
+        if not isinstance(self.data, TrackedWords):
+            self.data = TrackedWords(self.data)
+
+    def disable_write_tracking(self) -> None:
+        if isinstance(self.data, TrackedWords):
+            self.data = array(WORD_TYPECODE, self.data)
+
+    def take_writes(self) -> list:
+        """Son çağrıdan beri yazılan adresleri artan sırayla döndürür ve kaydı sıfırlar."""
+        written = getattr(self.data, "written", None)
+        if not written:
+            return []
+        addresses = sorted(written)
+        written.clear()
+        return addresses
+
+    # --- anlık görüntü ---
+    def snapshot(self) -> Tuple[array, Dict[int, Tuple[str, tuple]]]:
+        """(data kopyası, code kopyası) döndürür; data tek bir buffer kopyasıdır."""
+        return self.data[:], dict(self.code)
+
+    def restore(self, data, code) -> None:
+        """
+        snapshot() çıktısını (veya aynı boyutta bir kelime dizisini) geri yükler.
+        data dizisi yerinde güncellenir; CPU'nun bağladığı referanslar geçerli kalır.
+        code değerleri (komut_string, çözülmüş) veya sadece komut_string olabilir.
+        """
+        if len(data) != self.size:
+            raise ValueError(f"Snapshot size {len(data)} does not match memory size {self.size}")
+        self.data[:] = data if isinstance(data, array) else array(WORD_TYPECODE, data)
+        self._restore_code(code)
+
+    def _restore_code(self, code) -> None:
+        self.code.clear()
+        for address, entry in code.items():
+            if isinstance(entry, str):
+                entry = (entry, self.decode(entry) if self.decode else None)
+            self.code[address] = entry
+        self.code_changed()
+
+    def code_changed(self, address: Optional[int] = None) -> None:
+        """Komut deposundaki bir değişikliği kaydeder; address None ise tüm depo değişmiştir."""
+        self.code_version += 1
+        log = self._code_log
+        log.append(address)
+        if len(log) > CODE_LOG_SIZE:
+            del log[:CODE_LOG_SIZE // 2]
+
+    def code_changes(self, since: int) -> Optional[list]:
+        """
+        since sürümünden beri değişen komut adreslerini döndürür. Kayıt o sürüme kadar
+        uzanmıyorsa veya arada tüm depo değiştiyse None döner (her şey değişmiş sayılır).
+        """
+        count = self.code_version - since
+        if count <= 0:
+            return []
+        log = self._code_log
+        if count > len(log):
+            return None
+        changes = log[-count:]
+        return None if None in changes else changes
+
+    # --- toplu tarama ---
+    def nonzero(self, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, object]]:
+        """[start, end) aralığındaki sıfır olmayan hücreleri (adres, değer) olarak artan sırayla verir."""
+        end = self.size if end is None else min(end, self.size)
+        start = max(start, 0)
+        if start >= end:
+            return iter(())
+        # compress() taramayı C seviyesinde yapar; Python döngüsü sadece dolu hücrelerde döner.
+        addresses = list(compress(range(start, end), self.data[start:end]))
+        code_in_range = [a for a in self.code if start <= a < end]
+        if code_in_range:
+            addresses = sorted(set(addresses).union(code_in_range))
+        return ((a, self[a]) for a in addresses)
+
+
+class PagedWords:
+    """
+    array('q') gibi indekslenen sayfalı kelime deposu. Sayfalar ilk sıfırdan farklı
+    yazmada ayrılır; written bir küme ise (yazma takibi) yazılan adresler eklenir.
+    """
+    __slots__ = ("size", "page_size", "_shift", "_mask", "_pages", "written")
+
+    def __init__(self, size: int, page_size: int = DEFAULT_PAGE_SIZE) -> None:
+        if size < 0:
+            raise ValueError("size must be >= 0")
+        if page_size < 1 or page_size & (page_size - 1):
+            raise ValueError("page_size must be a power of two")
+        self.size = size
+        self.page_size = page_size
+        self._shift = page_size.bit_length() - 1
+        self._mask = page_size - 1
+        self._pages = [None] * ((size + page_size - 1) >> self._shift)
+        self.written = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if index == slice(None):
+                return self.copy()
+            return array(WORD_TYPECODE, (self[i] for i in range(*index.indices(self.size))))
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("memory index out of range")
+        page = self._pages[index >> self._shift]
+        return 0 if page is None else page[index & self._mask]
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            addresses = range(*index.indices(self.size))
+            values = list(value)
+            if len(values) != len(addresses):
+                raise ValueError("slice assignment must not change the memory size")
+            for address, word in zip(addresses, values):
+                self[address] = word
+            return
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("memory index out of range")
+        number = index >> self._shift
+        page = self._pages[number]
+        if page is None:
+            if value == 0:
+                if self.written is not None:
+                    self.written.add(index)
+                return
+            page = self._pages[number] = array(WORD_TYPECODE, bytes(self.page_size * array(WORD_TYPECODE).itemsize))
+        page[index & self._mask] = value
+        if self.written is not None:
+            self.written.add(index)
+
+    def __iter__(self) -> Iterator[int]:
+        zeros = array(WORD_TYPECODE, bytes(self.page_size * array(WORD_TYPECODE).itemsize))
+        remaining = self.size
+        for page in self._pages:
+            count = min(remaining, self.page_size)
+            yield from (zeros if page is None else page)[:count]
+            remaining -= count
+
+    def pages(self) -> Iterator[Tuple[int, array]]:
+        """Ayrılmış sayfaları (başlangıç adresi, sayfa) olarak artan sırayla verir."""
+        shift = self._shift
+        return ((number << shift, page) for number, page in enumerate(self._pages) if page is not None)
+
+    @property
+    def allocated_pages(self) -> int:
+        return sum(page is not None for page in self._pages)
+
+    def copy(self) -> "PagedWords":
+        """Yalnızca ayrılmış sayfaları kopyalayan bağımsız bir kopya (yazma takibi kopyalanmaz)."""
+        clone = PagedWords(self.size, self.page_size)
+        clone._pages = [None if page is None else page[:] for page in self._pages]
+        return clone
+
+
+class PagedMemory(Memory):
+    """Seyrek bellek: data deposu PagedWords; sayfalar ilk dokunuşta ayrılır."""
+
+    def __init__(self, size: int, decode: Optional[Callable[[str], tuple]] = None,
+                 page_size: int = DEFAULT_PAGE_SIZE) -> None:
+        self.size = size
+        self.data = PagedWords(size, page_size)
+        self.code: Dict[int, Tuple[str, tuple]] = {}
+        self.decode = decode
+        self.code_version = 0
+        self._code_log = []
+
+    @property
+    def allocated_pages(self) -> int:
+        return self.data.allocated_pages
+
+    # --- yazma takibi (depo değiştirilmez, yalnızca kayıt açılır) ---
+    def enable_write_tracking(self) -> None:
+        if self.data.written is None:
+            self.data.written = set()
+
+    def disable_write_tracking(self) -> None:
+        self.data.written = None
+
+    # --- anlık görüntü ---
+    def restore(self, data, code) -> None:
+        """
+        snapshot() çıktısını veya aynı boyutta dense bir kelime dizisini geri yükler;
+        dense dizide yalnızca sıfır olmayan sayfalar ayrılır.
+        """
+        if len(data) != self.size:
+            raise ValueError(f"Snapshot size {len(data)} does not match memory size {self.size}")
+        words = self.data
+        if isinstance(data, PagedWords) and data.page_size == words.page_size:
+            words._pages = [None if page is None else page[:] for page in data._pages]
+        else:
+            if not isinstance(data, array):
+                data = array(WORD_TYPECODE, data)
+            step = words.page_size
+            pages = words._pages
+            for number in range(len(pages)):
+                chunk = data[number * step:(number + 1) * step]
+                if any(chunk):
+                    if len(chunk) < step:  # son sayfa adres alanının sonunda biter
+                        chunk.extend([0] * (step - len(chunk)))
+                    pages[number] = chunk
+                else:
+                    pages[number] = None
+        if words.written is not None:
+            words.written.update(range(self.size))
+        self._restore_code(code)
+
+    # --- toplu tarama ---
+    def nonzero(self, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, object]]:
+        """Memory.nonzero() ile aynı; yalnızca aralıkla kesişen ayrılmış sayfaları tarar."""
+        end = self.size if end is None else min(end, self.size)
+        start = max(start, 0)
+        if start >= end:
+            return iter(())
+        addresses = []
+        for base, page in self.data.pages():
+            low, high = max(start, base), min(end, base + len(page))
+            if low < high:
+                addresses.extend(compress(range(low, high), page[low - base:high - base]))
+        code_in_range = [a for a in self.code if start <= a < end]
+        if code_in_range:
+            addresses = sorted(set(addresses).union(code_in_range))
+        return ((a, self[a]) for a in addresses)
+
+
+class ViewMemory(Memory):
+    """
+    Kelimeleri bir memoryview('q') üzerinde tutan bellek; buffer'ın sahibi alt sınıftır.
+    Komutlar çözücü (decode) atandığında çözülür, böylece buffer'la birlikte yüklenen
+    komutlar CPU kendi çözücüsünü bağladığında hazır olur.
+    int64'e sığmayan bir değer yazılırsa OverflowError yerine ValueError oluşur (memoryview).
+    """
+
+    def __init__(self, words: memoryview, code=None, decode: Optional[Callable[[str], tuple]] = None) -> None:
+        self.size = len(words)
+        self._words = words
+        self.data = words
+        self.code: Dict[int, Tuple[str, tuple]] = {}
+        self._decode = None
+        self.code_version = 0
+        self._code_log = []
+        if code:
+            self._restore_code(code)
+        self.decode = decode
+
+    @property
+    def decode(self):
+        return self._decode
+
+    @decode.setter
+    def decode(self, decode) -> None:
+        self._decode = decode
+        if decode is not None and self.code:
+            self._restore_code({address: entry[0] for address, entry in self.code.items()})
+
+    # --- yazma takibi (data buffer'a bağlı kalmalı; yazılar sarmalayıcıyla kaydedilir) ---
+    def enable_write_tracking(self) -> None:
+        if self.data is self._words:
+            self.data = TrackedView(self._words)
+
+    def disable_write_tracking(self) -> None:
+        self.data = self._words
+
+    # --- anlık görüntü ---
+    def snapshot(self):
+        return copy_words(self._words), dict(self.code)
+
+    def restore(self, data, code) -> None:
+        """Memory.restore() ile aynı; data bu belleğin kendi görünümüyse kelimeler kopyalanmaz."""
+        if data is not self._words:
+            if len(data) != self.size:
+                raise ValueError(f"Snapshot size {len(data)} does not match memory size {self.size}")
+            self.data[:] = data if isinstance(data, array) else array(WORD_TYPECODE, data)
+        self._restore_code(code)
+
+
+class TrackedView:
+    """memoryview üzerinde TrackedWords karşılığı: yazılan adresleri written kümesine ekler."""
+    __slots__ = ("words", "written")
+
+    def __init__(self, words) -> None:
+        self.words = words
+        self.written = set()
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return copy_words(self.words[index])
+        return self.words[index]
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            self.written.update(range(*index.indices(len(self.words))))
+        else:
+            self.written.add(index if index >= 0 else index + len(self.words))
+        self.words[index] = value
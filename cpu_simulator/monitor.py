@@ -0,0 +1,253 @@
+# cpu_simulator/monitor.py
+"""
+Çalışan bir simülasyonu paylaşımlı bellekten izleyen canlı monitör ("gtu-top").
+
+simulate.py -D 3 TCB tablosunu her bağlam değişiminde dosyalara döker. Bunun yerine
+simülatör belleğini multiprocessing.shared_memory üzerinde tutabilir
+(SharedMachineMemory): kelimeler doğrudan paylaşımlı bölgede durur, CPU onlara dense
+bellek kadar hızlı erişir ve çalışma döngüsüne hiçbir ek iş eklenmez. Ayrı bir süreç
+bölgeye salt okunur bağlanır (MachineView) ve PC/SP, IE, IE/sn, çalışan thread ve
+TCB tablosunu (State, SavedPC/SP, UnblockIE, StartIE, UsedIE) periyodik olarak okur.
+
+Bölge düzeni (başlık little-endian):
+
+    0   8s   MAGIC  b"GTUSHM\\0\\0"
+    8   H    format sürümü (SHM_VERSION)
+    10  H    bayraklar: 1 = USER modu, 2 = CPU durmuş
+    12  I    kelime boyutu (bayt, 8)
+    16  Q    bellek boyutu (kelime sayısı)
+    24  Q    simülatör süreç kimliği (pid)
+    32  ...  bellek kelimeleri (makinenin bayt sırasıyla)
+
+Mod/durma bayrakları yalnızca publish() ile (yükleme sonrası ve çalışma sonunda)
+güncellenir; çalışma sırasındaki durum bellekteki TCB'lerden okunur. TCB düzeni
+bellekteki tanımlayıcıdan (memory[4]) veya varsayılan düzenden çözülür. Okumalar
+kilitsizdir: bir kare, aynı anda değişen alanların farklı anlardaki değerlerini
+gösterebilir.
+
+Kullanım:
+    python main.py program.gtu 5000000 --shm               # simülatör
+    python monitor.py                                      # başka bir terminalde
+    python monitor.py gtu-c312 --interval 0.5
+    python monitor.py gtu-c312 --once
+"""
+from __future__ import annotations
+import argparse
+import os
+import struct
+import sys
+import time
+from array import array
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional
+
+from memory import WORD_TYPECODE, ViewMemory
+from tcb import DEFAULT_TCB_LAYOUT, TcbLayout
+
+MAGIC = b"GTUSHM\0\0"
+SHM_VERSION = 1
+DEFAULT_NAME = "gtu-c312"
+_HEADER = struct.Struct("<8sHHIQQ")
+
+FLAG_USER_MODE = 1
+FLAG_HALTED = 2
+
+_WORD_SIZE = array(WORD_TYPECODE).itemsize
+STATE_NAMES = {0: "Ready", 1: "Running", 2: "Blocked", 3: "Halted"}
+
+
+def _flags(mode: str, is_halted: bool) -> int:
+    return (FLAG_USER_MODE if mode == "USER" else 0) | (FLAG_HALTED if is_halted else 0)
+
+
+class SharedMachineMemory(ViewMemory):
+    """
+    Kelimeleri *name* adlı yeni bir paylaşımlı bellek bölgesinde tutan bellek.
+    Bölge bu nesne tarafından oluşturulur ve close() ile kaldırılır (unlink);
+    aynı adda bir bölge varsa FileExistsError verilir.
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME, size: int = 11000,
+                 decode: Optional[Callable[[str], tuple]] = None) -> None:
+        if size < 0:
+            raise ValueError("size must be >= 0")
+        self.name = name
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=_HEADER.size + size * _WORD_SIZE)
+        self._view = self._shm.buf
+        self._view[:_HEADER.size] = _HEADER.pack(MAGIC, SHM_VERSION, 0, _WORD_SIZE, size, os.getpid())
+        super().__init__(self._view[_HEADER.size:_HEADER.size + size * _WORD_SIZE].cast(WORD_TYPECODE),
+                         decode=decode)
+
+    def publish(self, mode: str, is_halted: bool) -> None:
+        """Başlıktaki mod/durma bayraklarını günceller (monitör durmuş makineyi buradan görür)."""
+        struct.pack_into("<H", self._view, 10, _flags(mode, is_halted))
+
+    def close(self) -> None:
+        """Bölgeyi kapatır ve kaldırır; bağlı monitörler son durumu görmeye devam eder."""
+        if self._shm is None:
+            return
+        self.data = None
+        self._words.release()
+        self._view = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+
+class MachineView:
+    """
+    Bir SharedMachineMemory bölgesine salt okunur bağlanır.
+
+    words – bellek kelimeleri (salt okunur memoryview 'q'); close()'dan önce bırakılmalıdır.
+    mode, is_halted – başlıktaki son yayınlanan durum (her okumada yeniden okunur).
+    memory_size, pid – simülatörün bellek boyutu ve süreç kimliği.
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME) -> None:
+        self.name = name
+        self._shm = _attach(name)
+        buf = self._shm.buf
+        if len(buf) < _HEADER.size:
+            self._shm.close()
+            raise ValueError(f"{name}: not a GTU shared memory region")
+        magic, version, _, word_size, memory_size, pid = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != SHM_VERSION or word_size != _WORD_SIZE \
+                or len(buf) < _HEADER.size + memory_size * word_size:
+            self._shm.close()
+            raise ValueError(f"{name}: not a GTU shared memory region (version {version})")
+        self.memory_size = memory_size
+        self.pid = pid
+        self._view = buf.toreadonly()
+        self.words = self._view[_HEADER.size:_HEADER.size + memory_size * word_size].cast(WORD_TYPECODE)
+
+    @property
+    def flags(self) -> int:
+        return struct.unpack_from("<H", self._view, 10)[0]
+
+    @property
+    def mode(self) -> str:
+        return "USER" if self.flags & FLAG_USER_MODE else "KERNEL"
+
+    @property
+    def is_halted(self) -> bool:
+        return bool(self.flags & FLAG_HALTED)
+
+    def alive(self) -> bool:
+        """Simülatör süreci hâlâ çalışıyor mu (yalnızca POSIX'te kontrol edilebilir)."""
+        if os.name != "posix":
+            return True
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def tcb_layout(self) -> TcbLayout:
+        """CPU'nun yükleme sırasında çözdüğü düzen: tanımlayıcı (memory[4]) veya varsayılan."""
+        try:
+            layout = TcbLayout.from_memory(self.words)
+        except ValueError:
+            layout = None
+        return layout if layout is not None else DEFAULT_TCB_LAYOUT
+
+    def close(self) -> None:
+        if self._shm is not None:
+            self.words.release()
+            self._view.release()
+            self._shm.close()
+            self._shm = None
+
+    def __enter__(self) -> "MachineView":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Bölgeye bağlanır; bağlanan süreç bölgeyi sahiplenmez (çıkışta kaldırmaz)."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == "posix":
+        # 3.13 öncesinde resource_tracker bağlanan süreci de sahip sayar ve çıkışta bölgeyi siler.
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+# --- gösterim ---
+def render(view: MachineView, rate: Optional[float] = None) -> List[str]:
+    """Bir karenin satırları: yazmaçlar, IE/sn (iki örnekten, verilirse) ve TCB tablosu."""
+    words = view.words
+    ie = words[3]
+    status = "halted" if view.is_halted else ("running" if view.alive() else "exited")
+    lines = [
+        f"gtu-top  {view.name} (pid {view.pid})  {status}",
+        f"PC={words[0]}  SP={words[1]}  IE={ie}  IE/sn={'-' if rate is None else f'{rate:,.0f}'}  thread={words[15]}  syscall={words[10]}",
+        "",
+        f"{'TID':>4} {'State':<8} {'SavedPC':>8} {'SavedSP':>8} {'UnblockIE':>10} {'StartIE':>10} {'UsedIE':>10} {'%':>6}",
+    ]
+    layout = view.tcb_layout()
+    size = len(words)
+    rows = [(tid, layout.read(words, tid)) for tid in sorted(layout.bases) if 0 <= layout.bases[tid] < size]
+    total = sum(max(tcb["used_ie"], 0) for _, tcb in rows) or 1
+    for tid, tcb in rows:
+        state = STATE_NAMES.get(tcb["state"], str(tcb["state"]))
+        marker = "*" if tid == words[15] else " "
+        lines.append(f"{tid:>3}{marker} {state:<8} {tcb['pc']:>8} {tcb['sp']:>8} {tcb['unblock_ie']:>10} "
+                     f"{tcb['start_ie']:>10} {tcb['used_ie']:>10} {100 * max(tcb['used_ie'], 0) / total:>5.1f}%")
+    return lines
+
+
+def watch(view: MachineView, interval: float, count: Optional[int] = None, out=sys.stdout) -> int:
+    """Kareleri interval saniyede bir yazar; makine durunca veya simülatör çıkınca son kareyle biter."""
+    clear = "\x1b[H\x1b[2J" if out.isatty() else ""
+    previous = None
+    frames = 0
+    while True:
+        current = (time.perf_counter(), view.words[3])
+        rate = None
+        if previous is not None and current[0] > previous[0]:
+            rate = (current[1] - previous[1]) / (current[0] - previous[0])
+        out.write(clear + "\n".join(render(view, rate)) + "\n")
+        out.flush()
+        frames += 1
+        if view.is_halted or not view.alive() or (count is not None and frames >= count):
+            return frames
+        previous = current
+        time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paylaşımlı bellekteki GTU-C312 simülasyonunu canlı izler (gtu-top).")
+    parser.add_argument("name", nargs="?", default=DEFAULT_NAME, help=f"paylaşımlı bellek adı (varsayılan: {DEFAULT_NAME})")
+    parser.add_argument("-i", "--interval", type=float, default=1.0, help="yenileme aralığı (saniye)")
+    parser.add_argument("-n", "--count", type=int, default=None, help="en fazla kare sayısı")
+    parser.add_argument("--once", action="store_true", help="tek kare yazdır ve çık")
+    args = parser.parse_args(argv)
+    if args.interval <= 0:
+        parser.error("--interval must be > 0")
+
+    try:
+        view = MachineView(args.name)
+    except FileNotFoundError:
+        print(f"Paylaşımlı bellek bulunamadı: {args.name} (simülatörü --shm ile başlatın)", file=sys.stderr)
+        return 1
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    with view:
+        try:
+            watch(view, args.interval, 1 if args.once else args.count)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+# cpu_simulator/mpu.py
+"""
+Bellek koruma birimi (MPU): mod ve thread başına önceden hesaplanmış erişim haritaları.
+
+Eskiden her bellek erişimi _is_valid_address'te sınır kontrolü, mod string
+karşılaştırması ve sabit "USER modu 1000 altına erişemez" kuralından geçiyordu.
+MemoryProtection her erişim bağlamı için bir izin haritası hazırlar:
+
+    kernel_map     – KERNEL modu (OS): tüm bellek
+    user_map(tid)  – USER modunda thread tid'in erişebildiği bölgeler
+
+CPU o anki haritayı tutar ve onu yalnızca mod değişirken seçer (USER komutu, syscall
+girişi, restore): USER'a geçerken memory[15]'teki thread'in haritası kullanılır.
+Erişim kontrolü haritanın [low, high) sınırlarıyla bir karşılaştırma, birden çok bölge
+varsa aradaki deliklere de bakmaktır; hata mesajı yalnızca ihlalde biçimlendirilir.
+
+Harita adres başına bellek ayırmaz, yalnızca bölge listesini tutar. Böylece seyrek
+bellekle (PagedMemory) milyonlarca hücrelik bir makine de yalnızca dokunulan sayfalar
+kadar yer tutar.
+
+regions verilmezse tüm thread'ler [user_floor, boyut) aralığını paylaşır (eski kural).
+thread_blocks() her thread'i kendi 1000'lik bloğuna kısıtlar (thread 1: 1000-1999,
+thread 2: 2000-2999, ...); bir thread diğerinin belleğini okuyamaz, yazamaz ve orada
+komut yürütemez. Bölge tablosunda olmayan bir thread USER modunda hiçbir adrese erişemez.
+
+Kullanım:
+    cpu.set_protection(MemoryProtection.thread_blocks(len(cpu.memory), cpu.tcb_layout.bases))
+    python main.py os_plus_threads.gtu 20000 --isolate
+"""
+from __future__ import annotations
+from bisect import bisect_right
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Tuple
+
+USER_FLOOR = 1000        # eski kural: USER modu bu adresin altına erişemez
+THREAD_BLOCK_SIZE = 1000
+OS_THREAD = 0            # OS KERNEL modunda çalışır, bölgesi yoktur
+
+
+class AddressRanges:
+    """Sıralı, ayrık bölgelerden oluşan adres kümesi; `adres in küme` ikili aramayla."""
+
+    __slots__ = ("ranges", "_starts")
+
+    def __init__(self, ranges: Sequence[range]) -> None:
+        self.ranges = tuple(ranges)  # sıralı, boş olmayan, çakışmayan
+        self._starts = [r.start for r in self.ranges]
+
+    def __contains__(self, address) -> bool:
+        index = bisect_right(self._starts, address) - 1
+        return index >= 0 and address < self.ranges[index].stop
+
+
+class AccessMap:
+    """
+    Bir erişim bağlamının izin haritası: [low, high) sınırları ve aradaki yasak delikler.
+
+    Tek bölgeli haritalarda (kernel, eski kural, thread bloğu) holes boş bir frozenset'tir;
+    kontrol `low <= adres < high` karşılaştırmasına iner. CPU sınırları ve delikleri ayrı
+    alanlarda tutar, sıcak yolda nesnenin kendisine bakmaz.
+    """
+
+    __slots__ = ("ranges", "low", "high", "holes")
+
+    def __init__(self, ranges: Sequence[range] = ()) -> None:
+        self.ranges = tuple(ranges)  # sıralı, boş olmayan, çakışmayan
+        self.low = self.ranges[0].start if self.ranges else 0
+        self.high = self.ranges[-1].stop if self.ranges else 0
+        gaps = [range(a.stop, b.start) for a, b in zip(self.ranges, self.ranges[1:])]
+        self.holes = AddressRanges(gaps) if gaps else frozenset()
+
+    def __contains__(self, address) -> bool:
+        return self.low <= address < self.high and address not in self.holes
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, AccessMap) and self.ranges == other.ranges
+
+    def __hash__(self) -> int:
+        return hash(self.ranges)
+
+    def __repr__(self) -> str:
+        return f"AccessMap({list(self.ranges)})"
+
+
+class MemoryProtection:
+    """
+    *size*       – bellek boyutu (kelime).
+    *regions*    – {thread_id: [(başlangıç, bitiş), ...]} USER modu bölgeleri, [başlangıç, bitiş);
+                   None -> tüm thread'ler için [user_floor, size).
+    *user_floor* – regions verilmediğinde USER modunun erişebildiği en küçük adres.
+    """
+
+    def __init__(self, size: int,
+                 regions: Optional[Mapping[int, Sequence[Tuple[int, int]]]] = None,
+                 *, user_floor: int = USER_FLOOR) -> None:
+        if size < 0:
+            raise ValueError("size must be >= 0")
+        self.size = size
+        self.user_floor = user_floor
+        self.regions = None
+        if regions is not None:
+            self.regions = {}
+            for tid, ranges in regions.items():
+                ranges = [(int(start), int(end)) for start, end in ranges]
+                for start, end in ranges:
+                    if end < start:
+                        raise ValueError(f"Thread {tid}: region end {end} is before start {start}")
+                self.regions[tid] = ranges
+        self.kernel_map = AccessMap([range(0, size)] if size else [])
+        self._shared = self._build([(user_floor, size)]) if regions is None else None
+        self._maps: Dict[int, AccessMap] = {}
+
+    @classmethod
+    def thread_blocks(cls, size: int, thread_ids: Iterable[int],
+                      block_size: int = THREAD_BLOCK_SIZE) -> "MemoryProtection":
+        """Her thread'e (OS hariç) kendi bloğunu verir: thread t -> [t * block_size, (t + 1) * block_size)."""
+        if block_size < 1:
+            raise ValueError("block_size must be >= 1")
+        return cls(size, {tid: [(tid * block_size, (tid + 1) * block_size)]
+                          for tid in thread_ids if tid != OS_THREAD})
+
+    @property
+    def isolated(self) -> bool:
+        """Thread'lerin ayrı bölgeleri varsa True (eski ortak kural değilse)."""
+        return self.regions is not None
+
+    def user_map(self, tid: int) -> AccessMap:
+        """USER modunda thread tid'in izin haritası (thread başına bir kez hesaplanır)."""
+        if self._shared is not None:
+            return self._shared
+        access = self._maps.get(tid)
+        if access is None:
+            access = self._maps[tid] = self._build(self.regions.get(tid, ()))
+        return access
+
+    def _build(self, ranges) -> AccessMap:
+        merged = []
+        for start, end in sorted((max(start, 0), min(end, self.size)) for start, end in ranges):
+            if start >= end:
+                continue
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return AccessMap([range(start, end) for start, end in merged])
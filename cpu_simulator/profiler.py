@@ -0,0 +1,260 @@
+# cpu_simulator/profiler.py
+"""
+Komut seviyesinde sıcak nokta (hot-spot) profilleyicisi.
+
+Profiler bir CPU örneğine bağlanır ve o örneğin dispatch tablosundaki handler'ları
+sayan sarmalayıcılarla değiştirir. CPU.run(), run_cycle() ve step() aynı tabloyu
+kullandığı için yürütme döngüsünde değişiklik yoktur; profiler bağlı değilken ek
+maliyet de yoktur. Her örnekte (sample_every komutta bir) şunlar sayılır:
+
+    pc_counts     – komut adresi (memory[0]) başına
+    opcode_counts – komut adı başına
+    thread_counts – memory[15] (çalışan thread id) başına
+    stack_counts  – gölge çağrı yığını başına (collapsed-stack / flamegraph çıktısı için)
+
+Gölge yığın CALL/RET ile tutulur; örnekleme seyrek olsa bile CALL, RET, USER ve
+SYSCALL_* her seferinde izlenir. KERNEL modunun yığını bir syscall ile başlar
+(ilk çerçeve syscall'ın adıdır, örn. SYSCALL_PRN) ve USER komutu ile atılır; OS
+zamanlayıcısı CALL ile girilip USER ile terk edildiği için böylece yığın büyümez.
+USER modunda her thread'in (memory[15]) kendi yığını vardır.
+
+BlockEngine ile birlikte kullanılırsa yalnızca yorumlanan komutlar sayılır.
+
+Kullanım:
+    with Profiler(cpu, sample_every=1, symbols={600: "scheduler"}) as profiler:
+        cpu.run()
+    print(profiler.report(top=10))
+    profiler.write_collapsed("os.folded")   # flamegraph.pl os.folded > os.svg
+
+    python profiler.py os_plus_threads.gtu --symbol 600=scheduler --collapsed os.folded
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import sys
+from collections import Counter
+from typing import Dict, List, Optional
+
+from cpu import CPU
+
+_SYSCALLS = ("SYSCALL_PRN", "SYSCALL_HLT", "SYSCALL_YIELD")
+
+
+class Profiler:
+    """
+    *sample_every* – her N. komutta bir örnek alınır (1 -> her komut).
+    *symbols*      – {adres: isim}; CALL hedefleri yığında bu isimle gösterilir
+                     (verilmezse sub_<adres>).
+    """
+
+    def __init__(self, cpu: CPU, *, sample_every: int = 1, symbols: Optional[Dict[int, str]] = None) -> None:
+        if sample_every < 1:
+            raise ValueError("sample_every must be >= 1")
+        self.cpu = cpu
+        self.sample_every = sample_every
+        self.symbols = dict(symbols or {})
+        self.reset()
+        self._originals = None
+
+    def reset(self) -> None:
+        """Sayaçları ve gölge yığınları sıfırlar."""
+        self.samples = 0
+        self.pc_counts = Counter()
+        self.opcode_counts = Counter()
+        self.thread_counts = Counter()
+        self.stack_counts = Counter()
+        self.mode_counts = Counter()
+        self.syscall_counts = Counter()
+        self.context_switches = 0  # başarılı USER komutu sayısı
+        self._kernel_stack: List[str] = []
+        self._user_stacks: Dict[int, List[str]] = {}
+        self._countdown = self.sample_every
+
+    # --- bağlama ---
+    def attach(self) -> "Profiler":
+        if self._originals is not None:
+            return self
+        cpu = self.cpu
+        dispatch = cpu._dispatch
+        self._originals = list(dispatch)
+        for op in type(cpu).OPCODES.values():
+            dispatch[op.code] = self._wrap(op.name, dispatch[op.code])
+        return self
+
+    def detach(self) -> None:
+        if self._originals is None:
+            return
+        self.cpu._dispatch[:] = self._originals
+        self._originals = None
+
+    def __enter__(self) -> "Profiler":
+        return self.attach()
+
+    def __exit__(self, *exc) -> None:
+        self.detach()
+
+    def _wrap(self, name, handler):
+        profiler = self
+        every = self.sample_every
+        record = self._record
+        after = {"CALL": self._after_call, "RET": self._after_ret, "USER": self._after_user}.get(name)
+        if name in _SYSCALLS:
+            after = self._after_syscall
+
+        if after is None:
+            def counted(*operands):
+                profiler._countdown -= 1
+                if not profiler._countdown:
+                    profiler._countdown = every
+                    record(name)
+                return handler(*operands)
+        else:
+            def counted(*operands):
+                profiler._countdown -= 1
+                if not profiler._countdown:
+                    profiler._countdown = every
+                    record(name)
+                stack = profiler._current_stack()
+                next_pc = handler(*operands)
+                if next_pc is not None:
+                    after(name, operands, stack)
+                return next_pc
+        return counted
+
+    # --- gölge yığın ---
+    def _current_stack(self) -> List[str]:
+        cpu = self.cpu
+        if cpu.mode == "USER":
+            return self._user_stacks.setdefault(cpu._data[15], [])
+        return self._kernel_stack
+
+    def _after_call(self, name, operands, stack) -> None:
+        target = operands[0]
+        stack.append(self.symbols.get(target, f"sub_{target}"))
+
+    def _after_ret(self, name, operands, stack) -> None:
+        if stack:
+            stack.pop()
+
+    def _after_user(self, name, operands, stack) -> None:
+        self.context_switches += 1
+        self._kernel_stack.clear()
+
+    def _after_syscall(self, name, operands, stack) -> None:
+        self.syscall_counts[name] += 1
+        self._kernel_stack[:] = [name]
+
+    def _record(self, name) -> None:
+        cpu = self.cpu
+        data = cpu._data
+        tid = data[15]
+        self.samples += 1
+        self.pc_counts[data[0]] += 1
+        self.opcode_counts[name] += 1
+        self.thread_counts[tid] += 1
+        self.mode_counts[cpu.mode] += 1
+        if cpu.mode == "USER":
+            key = ("USER", f"T{tid}") + tuple(self._user_stacks.get(tid, ()))
+        else:
+            key = ("KERNEL",) + tuple(self._kernel_stack)
+        self.stack_counts[key] += 1
+
+    # --- çıktılar ---
+    def collapsed(self) -> str:
+        """Brendan Gregg'in collapsed-stack formatı: 'çerçeve;çerçeve sayı' satırları."""
+        lines = [f"{';'.join(stack)} {count}" for stack, count in sorted(self.stack_counts.items())]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+
+    def inclusive_counts(self) -> Counter:
+        """Her yığın çerçevesinin kapsayıcı (alt çağrılar dahil) örnek sayısı."""
+        totals = Counter()
+        for stack, count in self.stack_counts.items():
+            for frame in set(stack):
+                totals[frame] += count
+        return totals
+
+    def _instruction_at(self, pc) -> str:
+        entry = self.cpu._code.get(pc)
+        return entry[0].strip() if entry is not None else ""
+
+    def report(self, top: int = 10) -> str:
+        """İnsan okuması için top-N metin raporu."""
+        total = self.samples
+        every = self.sample_every
+
+        def share(count):
+            return f"{count:>9} {100.0 * count / total if total else 0.0:6.2f}%"
+
+        lines = [f"Profil: {total} örnek (her {every} komutta bir), {self.context_switches} context switch"]
+        kernel, user = self.mode_counts["KERNEL"], self.mode_counts["USER"]
+        lines.append(f"KERNEL: {share(kernel)}   USER: {share(user)}")
+        if self.context_switches:
+            lines.append(f"Context switch başına OS komutu: {kernel * every / self.context_switches:.1f}, "
+                         f"thread komutu: {user * every / self.context_switches:.1f}")
+        if self.syscall_counts:
+            lines.append("Syscall'lar: " + ", ".join(f"{n}={c}" for n, c in sorted(self.syscall_counts.items())))
+
+        lines.append(f"\nEn sık {top} PC:")
+        for pc, count in self.pc_counts.most_common(top):
+            lines.append(f"  {pc:>6} {share(count)}  {self._instruction_at(pc)}")
+        lines.append("\nKomutlar:")
+        for name, count in self.opcode_counts.most_common(top):
+            lines.append(f"  {name:<14} {share(count)}")
+        lines.append("\nThread'ler (memory[15]):")
+        for tid, count in self.thread_counts.most_common(top):
+            lines.append(f"  {tid:>6} {share(count)}")
+        lines.append("\nYığın çerçeveleri (kapsayıcı):")
+        for frame, count in self.inclusive_counts().most_common(top):
+            lines.append(f"  {frame:<20} {share(count)}")
+        return "\n".join(lines)
+
+
+def _parse_symbol(text: str):
+    address, sep, name = text.partition("=")
+    try:
+        if not sep or not name:
+            raise ValueError
+        return int(address), name
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Geçersiz sembol '{text}', beklenen: ADRES=İSİM")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GTU-C312 programını profilleyerek çalıştırır.")
+    parser.add_argument("program")
+    parser.add_argument("-c", "--cycles", type=int, default=None, help="en fazla döngü (varsayılan: durana kadar)")
+    parser.add_argument("--every", type=int, default=1, help="her N komutta bir örnek al (varsayılan 1)")
+    parser.add_argument("--top", type=int, default=10, help="raporda gösterilecek satır sayısı")
+    parser.add_argument("--symbol", type=_parse_symbol, action="append", default=[],
+                        metavar="ADRES=İSİM", help="CALL hedefi için isim (tekrarlanabilir)")
+    parser.add_argument("--collapsed", help="collapsed-stack çıktısını bu dosyaya yaz")
+    args = parser.parse_args(argv)
+    if args.every < 1:
+        parser.error("--every must be >= 1")
+
+    from bios import load_and_parse_gtu_program
+    from devices import ListDevice
+    from tracing import TraceSink
+    with contextlib.redirect_stdout(io.StringIO()):
+        cpu = CPU(trace=TraceSink(enabled=False), prn_device=ListDevice())
+        data_segment, instruction_segment = load_and_parse_gtu_program(args.program)
+        cpu.load_program_to_memory(data_segment, instruction_segment)
+
+    with Profiler(cpu, sample_every=args.every, symbols=dict(args.symbol)) as profiler:
+        result = cpu.run(max_cycles=args.cycles)
+    print(f"Durum: {result.reason}, {result.cycles} döngü, IE={cpu.instructions_executed}, "
+          f"PRN={cpu.prn_device.values()}")
+    print(profiler.report(top=args.top))
+    if args.collapsed:
+        profiler.write_collapsed(args.collapsed)
+        print(f"\nCollapsed-stack çıktısı yazıldı: {args.collapsed}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+# cpu_simulator/program_image.py
+"""
+Derlenmiş program imajı (.gtu -> .gtu.img) ve imaj önbelleği.
+
+load_and_parse_gtu_program her çalıştırmada .gtu metnini baştan ayrıştırır. Aynı programı
+binlerce kez başlatan batch işleri için program bir kez ikili imaja derlenir ve kaynağın
+yanına yazılır. İmaj, kaynak içeriğinin SHA-256 özeti ve format sürümüyle anahtarlanır;
+kaynak değişmediyse metin hiç ayrıştırılmaz, dosya tek okumayla belleğe alınır.
+
+Dosya düzeni (little-endian):
+
+    0   8s   MAGIC  b"GTUIMG\\0\\0"
+    8   H    format sürümü (IMAGE_VERSION)
+    10  H    bayraklar: 1 = allow_overlap ile derlendi
+    12  32s  kaynak dosyanın SHA-256 özeti
+    44  I    (ayrılmış)
+    48  Q    veri kaydı sayısı (n)
+    56  Q    komut bölümünün bayt uzunluğu
+    64  ...  n adet adres (int64), n adet değer (int64)
+    ...      marshal: [(adres, komut, komut_adı, operandlar), ...], [BIOS uyarıları]
+
+Komutlar önceden çözülmüş olarak (komut adı + tamsayı operandlar) saklanır; CPU
+yüklerken adı kendi komut tablosundan koda çevirir. Adı tanımayan veya argüman sayısı
+uymayan komutlar için normal decode yolu kullanılır (hata mesajı aynı kalır).
+
+Kullanım:
+    image = load_program("os_plus_threads.gtu")     # gerekirse derler ve önbelleğe yazar
+    cpu.load_program_image(image)
+"""
+from __future__ import annotations
+import hashlib
+import io
+import contextlib
+import marshal
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+from pathlib import Path
+from typing import Optional
+
+from bios import load_and_parse_gtu_program
+from memory import WORD_TYPECODE
+
+MAGIC = b"GTUIMG\0\0"
+IMAGE_VERSION = 1
+IMAGE_SUFFIX = ".img"
+_HEADER = struct.Struct("<8sHH32sIQQ")
+FLAG_ALLOW_OVERLAP = 1
+
+# data_addresses / data_values: array('q'), instructions: [(adres, komut, komut_adı, operandlar)],
+# warnings: derleme sırasında BIOS'un yazdığı uyarı satırları (yüklemede tekrar basılır)
+ProgramImage = namedtuple("ProgramImage", "data_addresses data_values instructions warnings")
+
+
+def _predecode(instruction: str):
+    """Komutu (komut_adı, operandlar) biçimine ayırır; sayısal olmayan argümanda None döner."""
+    parts = instruction.split()
+    args = [arg.rstrip(",") for arg in parts[1:]]
+    try:
+        return parts[0], tuple(int(arg) for arg in args)
+    except ValueError:
+        return None, ()
+
+
+def compile_image(source_path, *, allow_overlap: bool = False) -> ProgramImage:
+    """.gtu dosyasını BIOS ile ayrıştırıp bir ProgramImage üretir."""
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        data_segment, instruction_segment = load_and_parse_gtu_program(source_path, allow_overlap=allow_overlap)
+    warnings = log.getvalue().splitlines()
+    for line in warnings:
+        print(line)
+    addresses = array(WORD_TYPECODE, (a for a, _ in data_segment))
+    values = array(WORD_TYPECODE, (v for _, v in data_segment))
+    instructions = [(a, text) + _predecode(text) for a, text in instruction_segment]
+    return ProgramImage(addresses, values, instructions, warnings)
+
+
+def source_digest(source_path) -> bytes:
+    with open(source_path, "rb") as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+def image_path_for(source_path) -> str:
+    return f"{source_path}{IMAGE_SUFFIX}"
+
+
+def write_image(image: ProgramImage, path, digest: bytes, *, allow_overlap: bool = False) -> None:
+    """İmajı path'e yazar (geçici dosya + os.replace; paralel yazarlar birbirini bozmaz)."""
+    code = marshal.dumps((image.instructions, image.warnings))
+    flags = FLAG_ALLOW_OVERLAP if allow_overlap else 0
+    addresses, values = image.data_addresses, image.data_values
+    if sys.byteorder == "big":  # dosya her zaman little-endian
+        addresses, values = array(WORD_TYPECODE, addresses), array(WORD_TYPECODE, values)
+        addresses.byteswap()
+        values.byteswap()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, IMAGE_VERSION, flags, digest, 0, len(addresses), len(code)))
+        addresses.tofile(f)
+        values.tofile(f)
+        f.write(code)
+    os.replace(tmp_path, path)
+
+
+def read_image(path, digest: Optional[bytes] = None, *, allow_overlap: bool = False) -> Optional[ProgramImage]:
+    """
+    İmajı tek okumayla yükler. Dosya yoksa, sürüm/bayrak uymuyorsa veya digest
+    verilip kaynak özeti farklıysa None döndürür (imaj yeniden derlenmelidir).
+    """
+    try:
+        with open(path, "rb") as f:
+            blob = f.read()
+    except OSError:
+        return None
+    if len(blob) < _HEADER.size:
+        return None
+    magic, version, flags, image_digest, _, count, code_length = _HEADER.unpack_from(blob, 0)
+    if magic != MAGIC or version != IMAGE_VERSION:
+        return None
+    if bool(flags & FLAG_ALLOW_OVERLAP) != allow_overlap:
+        return None
+    if digest is not None and image_digest != digest:
+        return None
+    word_size = array(WORD_TYPECODE).itemsize
+    data_end = _HEADER.size + 2 * count * word_size
+    if len(blob) != data_end + code_length:
+        return None
+    view = memoryview(blob)
+    addresses = array(WORD_TYPECODE)
+    addresses.frombytes(view[_HEADER.size:_HEADER.size + count * word_size])
+    values = array(WORD_TYPECODE)
+    values.frombytes(view[_HEADER.size + count * word_size:data_end])
+    if sys.byteorder == "big":
+        addresses.byteswap()
+        values.byteswap()
+    try:
+        instructions, warnings = marshal.loads(view[data_end:])
+    except (EOFError, ValueError, TypeError):
+        return None
+    return ProgramImage(addresses, values, instructions, warnings)
+
+
+def load_program(source_path, *, allow_overlap: bool = False, cache: bool = True) -> ProgramImage:
+    """
+    Programın imajını döndürür. cache=True ise kaynağın yanındaki .img dosyası
+    kaynak özeti ve format sürümü uyuyorsa kullanılır; aksi halde program derlenip
+    imaj (yazılabiliyorsa) güncellenir.
+    """
+    source_path = Path(source_path)
+    if not source_path.is_file():
+        raise FileNotFoundError(source_path)
+    if not cache:
+        return compile_image(source_path, allow_overlap=allow_overlap)
+
+    digest = source_digest(source_path)
+    cache_path = image_path_for(source_path)
+    image = read_image(cache_path, digest, allow_overlap=allow_overlap)
+    if image is not None:
+        for line in image.warnings:
+            print(line)
+        return image
+
+    image = compile_image(source_path, allow_overlap=allow_overlap)
+    try:
+        write_image(image, cache_path, digest, allow_overlap=allow_overlap)
+    except OSError:
+        pass  # Salt okunur dizin: önbelleksiz devam
+    return image
@@ -0,0 +1,431 @@
+# cpu_simulator/server.py
+"""
+asyncio tabanlı simülasyon servisi (JSON satırları, TCP veya Unix soketi).
+
+İstemci her satıra bir JSON istek yazar; sunucu her satıra bir JSON olay döndürür.
+Programlar sıcak tutulan işçi süreçlerde çalışır: her işçi açılışta modülleri bir kez
+yükler ve bellek boyutu başına tek bir CPU'yu saklar; her iş bu CPU'yu başlangıç
+anlık görüntüsüne (CPU.snapshot/restore) döndürerek başlar. Böylece iş başına Python
+açılışı ve CPU() kurulumu ödenmez. Uzun bir iş yalnızca kendi işçisini meşgul eder;
+diğer istemcilerin işleri boştaki işçilerde çalışır.
+
+İstekler:
+
+    {"op": "run", "id": "j1", "source": "<.gtu metni>", "cycles": 5000}
+    {"op": "run", "id": "j2", "path": "os_plus_threads.gtu", "cycles": null,
+     "jit": false, "fast_forward": false, "progress_every": 10000}
+    {"op": "cancel", "id": "j1"}
+    {"op": "ping"}
+
+Olaylar (her biri isteğin "id"sini taşır):
+
+    queued    – iş kuyruğa alındı
+    started   – iş bir işçide başladı ("worker": işçi numarası)
+    prn       – SYSCALL_PRN çıktısı: value, thread, pc, ie (çalışma sürerken akar)
+    progress  – her progress_every döngüde: cycles, ie, pc
+    done      – reason (halted / max_cycles), halted, cycles, ie, pc, sp, prn, elapsed, log
+    cancelled – iş iptal edildi (çalışmışsa cycles, ie)
+    error     – geçersiz istek veya yükleme/çalıştırma hatası: message
+
+İptal döngü parçaları (progress_every) arasında uygulanır. İstemci bağlantısı
+koparsa o istemcinin tüm işleri iptal edilir.
+
+Kullanım:
+    python server.py --port 8765 -j 4
+    python server.py --unix /tmp/gtu.sock
+    printf '{"op": "run", "id": "a", "path": "os_plus_threads.gtu", "cycles": null}\\n' | nc localhost 8765
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from batch import DEFAULT_CYCLES
+
+DEFAULT_PROGRESS_CYCLES = 10_000
+DEFAULT_MEMORY_SIZE = 11000        # CPU() varsayılanı
+MAX_LINE_BYTES = 64 * 1024 * 1024  # tek bir istek satırı (program metni dahil)
+
+
+# --- işçi süreç ---
+def _worker_main(jobs, events) -> None:
+    """İşçi süreç döngüsü: jobs'tan ("run", iş) / ("cancel", id) / None alır, events'e yazar."""
+    from bios import parse_gtu_text
+    from cpu import CPU
+    from devices import ListDevice, PipeDevice
+    from program_image import load_program
+    from tracing import TraceSink
+
+    cpus = {}  # bellek boyutu -> (CPU, başlangıç anlık görüntüsü)
+
+    def fresh_cpu(memory_size):
+        entry = cpus.get(memory_size)
+        if entry is None:
+            cpu = CPU(memory_size=memory_size, trace=TraceSink(enabled=False))
+            entry = cpus[memory_size] = (cpu, cpu.snapshot())
+        cpu, snapshot = entry
+        cpu.restore(snapshot)
+        return cpu
+
+    class _StreamDevice(PipeDevice):
+        """Kayıtları hem akışa (parça sonunda flush) hem de done olayı için listeye yazar."""
+
+        def __init__(self):
+            super().__init__(events, batch_size=1 << 30)
+            self.values = ListDevice()
+
+        def write(self, record):
+            self.values.write(record)
+            super().write(record)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        fresh_cpu(DEFAULT_MEMORY_SIZE)
+
+    while True:
+        message = jobs.recv()
+        if message is None:
+            return
+        if message[0] != "run":
+            continue  # bitmiş bir işin geç gelen iptali
+        job = message[1]
+        log = io.StringIO()
+        start = time.perf_counter()
+        cycles = 0
+        reason = None
+        cpu = None
+        try:
+            with contextlib.redirect_stdout(log):
+                cpu = fresh_cpu(job["memory_size"])
+                device = cpu.prn_device = _StreamDevice()
+                if job.get("source") is not None:
+                    data_segment, instruction_segment = parse_gtu_text(job["source"], source=job["id"])
+                    cpu.load_program_to_memory(data_segment, instruction_segment)
+                else:
+                    cpu.load_program_image(load_program(job["path"]))
+                engine = cpu
+                if job["jit"]:
+                    from blocks import BlockEngine
+                    engine = BlockEngine(cpu)
+                if job["fast_forward"]:
+                    from idle import IdleFastForward
+                    engine = IdleFastForward(cpu, engine)
+
+                budget = job["cycles"]
+                while not cpu.is_halted:
+                    chunk = job["progress_every"]
+                    if budget is not None:
+                        if cycles >= budget:
+                            break
+                        chunk = min(chunk, budget - cycles)
+                    result = engine.run(max_cycles=chunk)
+                    cycles += result.cycles
+                    device.flush()
+                    events.send(("progress", {"cycles": cycles, "ie": cpu.instructions_executed, "pc": cpu.pc}))
+                    while jobs.poll():
+                        control = jobs.recv()
+                        if control is None:
+                            return
+                        if control == ("cancel", job["token"]):
+                            reason = "cancelled"
+                    if reason is not None:
+                        break
+                device.flush()
+        except Exception as e:  # Bir işin hatası işçiyi durdurmasın
+            events.send(("error", {"message": f"{type(e).__name__}: {e}", "log": log.getvalue()}))
+            continue
+        summary = {"cycles": cycles, "ie": cpu.instructions_executed, "pc": cpu.pc, "sp": cpu.sp,
+                   "halted": cpu.is_halted, "prn": device.values.values(),
+                   "elapsed": time.perf_counter() - start, "log": log.getvalue()}
+        if reason == "cancelled":
+            events.send(("cancelled", summary))
+        else:
+            summary["reason"] = "halted" if cpu.is_halted else "max_cycles"
+            events.send(("done", summary))
+
+
+class _Worker:
+    """Bir işçi süreç ve ona giden/gelen iki tek yönlü Pipe."""
+
+    def __init__(self, index: int, context) -> None:
+        self.index = index
+        self._context = context
+        self._spawn()
+
+    def _spawn(self) -> None:
+        job_reader, self.jobs = self._context.Pipe(duplex=False)
+        self.events, event_writer = self._context.Pipe(duplex=False)
+        self.process = self._context.Process(target=_worker_main, args=(job_reader, event_writer),
+                                             name=f"gtu-worker-{self.index}", daemon=True)
+        self.process.start()
+        job_reader.close()
+        event_writer.close()
+
+    def respawn(self) -> None:
+        self.close()
+        self._spawn()
+
+    def close(self) -> None:
+        try:
+            self.jobs.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.jobs.close()
+        self.events.close()
+
+
+class _Job:
+    def __init__(self, job_id, request, client) -> None:
+        self.id = job_id
+        self.request = request
+        self.client = client
+        self.cancelled = False
+        self.worker: Optional[_Worker] = None
+
+
+class SimulationServer:
+    """
+    *workers*        – işçi süreç sayısı (varsayılan: çekirdek sayısı).
+    *progress_every* – varsayılan progress/iptal aralığı (döngü).
+    """
+
+    def __init__(self, *, workers: Optional[int] = None, progress_every: int = DEFAULT_PROGRESS_CYCLES) -> None:
+        if progress_every < 1:
+            raise ValueError("progress_every must be >= 1")
+        self.worker_count = workers or os.cpu_count() or 1
+        self.progress_every = progress_every
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._tasks = []
+        self._executor = None
+        self._server = None
+        self._tokens = itertools.count(1)  # işçiye giden iptallerin hangi işe ait olduğu
+        self._handlers = set()
+
+    # --- yaşam döngüsü ---
+    async def start(self, *, host: Optional[str] = "127.0.0.1", port: Optional[int] = 0,
+                    path: Optional[str] = None):
+        """İşçileri başlatır ve dinlemeye başlar; path verilirse Unix soketi kullanılır."""
+        context = multiprocessing.get_context()
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.worker_count, thread_name_prefix="gtu-events")
+        self._workers = [_Worker(i, context) for i in range(self.worker_count)]
+        self._tasks = [asyncio.create_task(self._drive(worker)) for worker in self._workers]
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_client, path=path, limit=MAX_LINE_BYTES)
+        else:
+            self._server = await asyncio.start_server(self._handle_client, host, port, limit=MAX_LINE_BYTES)
+        return self._server
+
+    @property
+    def addresses(self):
+        return [sock.getsockname() for sock in self._server.sockets] if self._server else []
+
+    async def serve_forever(self) -> None:
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        tasks = self._tasks + list(self._handlers)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        for worker in self._workers:
+            worker.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    # --- işçi sürücüsü ---
+    async def _drive(self, worker: _Worker) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            if job.cancelled:
+                continue
+            job.worker = worker
+            await job.client.emit(job.id, "started", worker=worker.index)
+            try:
+                worker.jobs.send(("run", job.request))
+                while True:
+                    message = await loop.run_in_executor(self._executor, worker.events.recv)
+                    if isinstance(message, list):  # PipeDevice: PrnRecord listesi
+                        for record in message:
+                            await job.client.emit(job.id, "prn", value=record.value, thread=record.tid,
+                                                  pc=record.pc, ie=record.ie)
+                        continue
+                    kind, fields = message
+                    await job.client.emit(job.id, kind, **fields)
+                    if kind in ("done", "cancelled", "error"):
+                        break
+            except (EOFError, OSError) as e:
+                await job.client.emit(job.id, "error", message=f"worker {worker.index} failed: {e!r}")
+                worker.respawn()
+            finally:
+                job.worker = None
+                job.client.jobs.pop(job.id, None)
+
+    # --- istemci ---
+    async def _handle_client(self, reader, writer) -> None:
+        client = _Client(writer)
+        self._handlers.add(asyncio.current_task())
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    await client.emit(None, "error", message="request line too long")
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    await self._handle_request(client, line)
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # istemci koptu veya sunucu kapanıyor
+        finally:
+            for job in list(client.jobs.values()):
+                self._cancel(job)
+            client.closed = True
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _handle_request(self, client, line: bytes) -> None:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            await client.emit(None, "error", message=f"invalid JSON: {e}")
+            return
+        op = request.get("op")
+        job_id = request.get("id")
+        if op == "ping":
+            await client.emit(job_id, "pong")
+        elif op == "run":
+            try:
+                job = self._make_job(client, request)
+            except (TypeError, ValueError) as e:
+                await client.emit(job_id, "error", message=str(e))
+                return
+            client.jobs[job.id] = job
+            await client.emit(job.id, "queued")
+            self._queue.put_nowait(job)
+        elif op == "cancel":
+            job = client.jobs.get(job_id)
+            if job is None:
+                await client.emit(job_id, "error", message=f"unknown job '{job_id}'")
+            elif self._cancel(job):
+                await client.emit(job_id, "cancelled")
+        else:
+            await client.emit(job_id, "error", message=f"unknown op '{op}'")
+
+    def _make_job(self, client, request) -> _Job:
+        job_id = request.get("id")
+        if job_id is None:
+            job_id = f"job-{next(client.counter)}"
+        if not isinstance(job_id, (str, int)):
+            raise ValueError("id must be a string or an integer")
+        if job_id in client.jobs:
+            raise ValueError(f"job '{job_id}' is already active")
+        source, path = request.get("source"), request.get("path")
+        if (source is None) == (path is None):
+            raise ValueError("exactly one of 'source' and 'path' is required")
+        if source is not None and not isinstance(source, str):
+            raise ValueError("source must be a string")
+        cycles = request.get("cycles", DEFAULT_CYCLES)
+        if cycles is not None and (not isinstance(cycles, int) or cycles < 0):
+            raise ValueError("cycles must be a non-negative integer or null")
+        progress_every = request.get("progress_every", self.progress_every)
+        memory_size = request.get("memory_size", DEFAULT_MEMORY_SIZE)
+        for name, value in (("progress_every", progress_every), ("memory_size", memory_size)):
+            if not isinstance(value, int) or value < 1:
+                raise ValueError(f"{name} must be a positive integer")
+        return _Job(job_id, {
+            "id": str(job_id), "token": next(self._tokens), "source": source, "path": path, "cycles": cycles,
+            "progress_every": progress_every, "memory_size": memory_size,
+            "jit": bool(request.get("jit", False)), "fast_forward": bool(request.get("fast_forward", False)),
+        }, client)
+
+    def _cancel(self, job: _Job) -> bool:
+        """Kuyruktaki işi atlar (True) veya çalışan işe iptal gönderir (olay işçiden gelir)."""
+        if job.worker is None:
+            if job.cancelled:
+                return False
+            job.cancelled = True
+            job.client.jobs.pop(job.id, None)
+            return True
+        with contextlib.suppress(OSError, ValueError):
+            job.worker.jobs.send(("cancel", job.request["token"]))
+        return False
+
+
+class _Client:
+    def __init__(self, writer) -> None:
+        self.writer = writer
+        self.jobs: Dict[object, _Job] = {}
+        self.counter = itertools.count(1)
+        self.closed = False
+        self._lock = asyncio.Lock()
+
+    async def emit(self, job_id, event: str, **fields) -> None:
+        """Olayı tek bir JSON satırı olarak yazar; kopmuş istemciye yazılmaz."""
+        if self.closed:
+            return
+        record = {"id": job_id, "event": event, **fields}
+        async with self._lock:
+            try:
+                self.writer.write(json.dumps(record).encode() + b"\n")
+                await self.writer.drain()
+            except ConnectionError:
+                self.closed = True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GTU-C312 simülasyon servisi (JSON satırları).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="TCP yerine bu Unix soketini dinle")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="işçi süreç sayısı (varsayılan: çekirdek sayısı)")
+    parser.add_argument("--progress-every", type=int, default=DEFAULT_PROGRESS_CYCLES,
+                        help=f"varsayılan progress/iptal aralığı, döngü (varsayılan {DEFAULT_PROGRESS_CYCLES})")
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be >= 1")
+    if args.progress_every < 1:
+        parser.error("--progress-every must be >= 1")
+
+    async def serve():
+        server = SimulationServer(workers=args.workers, progress_every=args.progress_every)
+        await server.start(host=args.host, port=args.port, path=args.unix)
+        print(f"Dinleniyor: {args.unix or f'{args.host}:{args.port}'} ({server.worker_count} işçi)", flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+# cpu_simulator/tcb.py
+"""
+TCB (Thread Control Block) tablosunun düzeni.
+
+CPU her döngüde çalışan thread'in (memory[15]) UsedIE alanını artırır; debug mode 3
+TCB tablosunu yazdırır. Bunun için TCB'lerin nerede olduğu bilinmelidir. TcbLayout
+bu düzeni bir kez tanımlar; CPU, program yüklendiğinde düzeni çözer ve UsedIE
+adreslerini önceden hesaplar (döngü başına tek bir sözlük erişimi + tek bir yazma).
+
+Düzen üç yoldan gelir (öncelik sırasıyla):
+
+    1. Yükleyici seçeneği: load_program_to_memory(..., tcb_layout=TcbLayout(...))
+    2. .gtu veri bölümünde tanımlayıcı: memory[4] tanımlayıcının adresini (D) tutar
+           D+0        TCB sayısı (N; thread id'leri 0..N-1)
+           D+1        stride (0 ise taban adresleri tek tek listelenir)
+           D+2..D+8   alan offset'leri: ID, State, SavedPC, SavedSP, UnblockIE, StartIE, UsedIE
+           D+9        ilk TCB adresi (stride > 0)
+           D+9..      N adet TCB adresi (stride == 0)
+    3. CPU(tcb_layout=...) ile verilen ya da varsayılan düzen (DEFAULT_TCB_LAYOUT,
+       os_plus_threads.gtu'nun kullandığı 20, 30, 40, 50, 100, 107, ... adresleri).
+
+Örnek (11 TCB, 7 hücre arayla, 20'den başlayarak):
+
+    4 = 160
+    160 = 11
+    161 = 7
+    162 = 0
+    ...
+    168 = 6
+    169 = 20
+"""
+from __future__ import annotations
+from collections import namedtuple
+from typing import Dict, Mapping, Optional
+
+FIELDS = ("id", "state", "pc", "sp", "unblock_ie", "start_ie", "used_ie")
+DEFAULT_OFFSETS = {name: offset for offset, name in enumerate(FIELDS)}
+
+DESCRIPTOR_POINTER = 4   # memory[4]: tanımlayıcının adresi (0 -> tanımlanmamış)
+_MAX_TCBS = 1 << 16
+
+
+class TcbLayout(namedtuple("TcbLayout", "bases offsets")):
+    """bases: {thread_id: TCB başlangıç adresi}, offsets: {alan adı: offset} (FIELDS)."""
+    __slots__ = ()
+
+    def __new__(cls, bases: Mapping[int, int], offsets: Optional[Mapping[str, int]] = None):
+        offsets = dict(DEFAULT_OFFSETS if offsets is None else offsets)
+        missing = [name for name in FIELDS if name not in offsets]
+        if missing:
+            raise ValueError(f"TCB layout is missing field offsets: {missing}")
+        return super().__new__(cls, dict(bases), offsets)
+
+    @classmethod
+    def strided(cls, first_base: int, stride: int, count: int,
+                offsets: Optional[Mapping[str, int]] = None) -> "TcbLayout":
+        """Thread id'leri 0..count-1 olan, stride aralıklı TCB'ler."""
+        return cls({tid: first_base + tid * stride for tid in range(count)}, offsets)
+
+    @classmethod
+    def from_memory(cls, words) -> Optional["TcbLayout"]:
+        """
+        Bellekteki tanımlayıcıyı (memory[4]) çözer. Tanımlayıcı yoksa None döndürür,
+        geçersizse ValueError fırlatır. words: tamsayı kelime dizisi (Memory.data).
+        """
+        size = len(words)
+        address = words[DESCRIPTOR_POINTER] if DESCRIPTOR_POINTER < size else 0
+        if address == 0:
+            return None
+
+        def word(offset):
+            if not (0 <= address + offset < size):
+                raise ValueError(f"TCB descriptor at {address} runs past the end of memory")
+            return words[address + offset]
+
+        count, stride = word(0), word(1)
+        if not (0 < count <= _MAX_TCBS) or stride < 0:
+            raise ValueError(f"TCB descriptor at {address}: invalid count {count} or stride {stride}")
+        offsets = {name: word(2 + i) for i, name in enumerate(FIELDS)}
+        if stride:
+            layout = cls.strided(word(9), stride, count, offsets)
+        else:
+            layout = cls({tid: word(9 + tid) for tid in range(count)}, offsets)
+        for tid, base in layout.bases.items():
+            if not all(0 <= base + offset < size for offset in offsets.values()):
+                raise ValueError(f"TCB descriptor at {address}: TCB {tid} at {base} is outside memory")
+        return layout
+
+    def field_addresses(self, field: str, memory_size: Optional[int] = None) -> Dict[int, int]:
+        """{thread_id: alanın adresi}; memory_size verilirse bellek dışındaki adresler atlanır."""
+        offset = self.offsets[field]
+        addresses = {tid: base + offset for tid, base in self.bases.items()}
+        if memory_size is not None:
+            addresses = {tid: a for tid, a in addresses.items() if 0 <= a < memory_size}
+        return addresses
+
+    def read(self, words, tid: int) -> Dict[str, int]:
+        """Bir thread'in TCB alanlarını {alan: değer} olarak okur (bellek dışı alanlar 0)."""
+        base = self.bases[tid]
+        size = len(words)
+        return {name: (words[base + offset] if 0 <= base + offset < size else 0)
+                for name, offset in self.offsets.items()}
+
+
+DEFAULT_TCB_LAYOUT = TcbLayout({
+    0: 20,   # OS (Thread 0)
+    1: 30,   # Thread 1
+    2: 40,   # Thread 2
+    3: 50,   # Thread 3
+    4: 100,  # Thread 4
+    5: 107,  # Thread 5
+    6: 114,  # Thread 6
+    7: 121,  # Thread 7
+    8: 128,  # Thread 8
+    9: 135,  # Thread 9
+    10: 142  # Thread 10
+})
@@ -0,0 +1,107 @@
+# cpu_simulator/tests/test_blocks.py
+"""
+BlockEngine'in CPU.run() ile aynı belleği, PRN çıktısını ve sayaçları ürettiğini doğrular:
+
+    python -m unittest discover cpu_simulator/tests
+"""
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from bench import generate_os_program, os_plus_threads_program  # noqa: E402
+from blocks import BlockEngine  # noqa: E402
+from cpu import CPU  # noqa: E402
+from devices import ListDevice  # noqa: E402
+from tracing import TraceSink  # noqa: E402
+
+
+def load(program):
+    with contextlib.redirect_stdout(io.StringIO()):
+        cpu = CPU(memory_size=program.memory_size, trace=TraceSink(enabled=False), prn_device=ListDevice())
+        cpu.load_program_to_memory(program.data, program.instructions)
+    return cpu
+
+
+def outcome(cpu, result):
+    return (list(cpu.memory), cpu.prn_device.values(), cpu.is_halted,
+            result.reason, result.cycles, result.instructions)
+
+
+class BlockEngineTest(unittest.TestCase):
+
+    def run_both(self, program, max_cycles=None, **options):
+        reference, cpu = load(program), load(program)
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = outcome(reference, reference.run(max_cycles=max_cycles))
+            engine = BlockEngine(cpu, **options)
+            actual = outcome(cpu, engine.run(max_cycles=max_cycles))
+        self.assertEqual(actual, expected)
+        return engine
+
+    def test_os_programs(self):
+        programs = {"os_plus_threads": os_plus_threads_program(),
+                    "threads3": generate_os_program(3), "threads10": generate_os_program(10)}
+        for name, program in programs.items():
+            for hot_threshold in (1, 8, 64):
+                with self.subTest(program=name, hot_threshold=hot_threshold):
+                    engine = self.run_both(program, hot_threshold=hot_threshold)
+                    if hot_threshold == 1:
+                        self.assertGreater(engine.block_cycles, engine.interpreted_cycles)
+
+    def test_max_cycles_cut_points(self):
+        program = os_plus_threads_program()
+        for max_cycles in range(0, 1910, 29):
+            with self.subTest(max_cycles=max_cycles):
+                self.run_both(program, max_cycles=max_cycles, hot_threshold=1)
+
+    def test_resuming_after_cut(self):
+        program = generate_os_program(3)
+        reference, cpu = load(program), load(program)
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = outcome(reference, reference.run())
+            engine = BlockEngine(cpu, hot_threshold=2)
+            cycles = instructions = 0
+            while not cpu.is_halted:
+                result = engine.run(max_cycles=97)
+                cycles += result.cycles
+                instructions += result.instructions
+        self.assertEqual(outcome(cpu, result)[:4], expected[:4])
+        self.assertEqual((cycles, instructions), expected[4:])
+
+    def test_self_modifying_code_recompiles_only_changed_block(self):
+        iterations = 40
+        text = {
+            200: "ADD 50 1", 201: "ADD 51 2", 202: "JIF 80 206",
+            206: "ADD 52 1", 207: "ADD 70 1",
+            208: "CPYI 60 206",                             # 206'ya 400 ya da 401'deki komut
+            209: "CPY 60 62", 210: "CPY 61 60", 211: "CPY 62 61", 212: "JIF 70 200", 213: "HLT",
+            400: "ADD 52 1", 401: "ADD 53 1",
+        }
+
+        def build():
+            cpu = CPU(trace=TraceSink(enabled=False), prn_device=ListDevice())
+            for address, value in ((60, 400), (61, 401), (70, -iterations)):
+                cpu.memory[address] = value
+            for address, instruction in text.items():
+                cpu.memory[address] = instruction
+            cpu.pc = 200
+            return cpu
+
+        reference, cpu = build(), build()
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = outcome(reference, reference.run())
+            engine = BlockEngine(cpu, hot_threshold=1)
+            actual = outcome(cpu, engine.run())
+        self.assertEqual(actual, expected)
+        self.assertEqual(cpu.memory[53], iterations // 2)
+        # 200'deki blok bir kez derlenir; yalnızca 206'yı içeren blok her turda yeniden derlenir
+        self.assertEqual(engine.compiled_blocks, iterations + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+# cpu_simulator/tests/test_idle.py
+"""
+IdleFastForward'ın atladığı döngülerin tam bir CPU.run() koşusuyla aynı sonucu
+verdiğini doğrular:
+
+    python -m unittest discover cpu_simulator/tests
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from bios import load_and_parse_gtu_program  # noqa: E402
+from blocks import BlockEngine  # noqa: E402
+from cpu import CPU  # noqa: E402
+from devices import ListDevice  # noqa: E402
+from idle import IdleFastForward  # noqa: E402
+from tracing import TraceSink  # noqa: E402
+
+PROGRAM = os.path.join(os.path.dirname(HERE), "os_plus_threads.gtu")
+
+
+def load(path=PROGRAM):
+    with contextlib.redirect_stdout(io.StringIO()):
+        cpu = CPU(trace=TraceSink(enabled=False), prn_device=ListDevice())
+        cpu.load_program_to_memory(*load_and_parse_gtu_program(path))
+    return cpu
+
+
+def outcome(cpu, result):
+    return (list(cpu.memory), cpu.prn_device.values(), cpu.is_halted,
+            result.reason, result.cycles, result.instructions)
+
+
+class IdleFastForwardTest(unittest.TestCase):
+
+    def run_both(self, path=PROGRAM, max_cycles=None, blocks=False, **options):
+        reference, cpu = load(path), load(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = outcome(reference, reference.run(max_cycles=max_cycles))
+            engine = IdleFastForward(cpu, BlockEngine(cpu) if blocks else None, **options)
+            actual = outcome(cpu, engine.run(max_cycles=max_cycles))
+        self.assertEqual(actual, expected)
+        return engine
+
+    def test_skips_os_plus_threads_idle_loop(self):
+        for check_interval in (1, 16):
+            with self.subTest(check_interval=check_interval):
+                engine = self.run_both(check_interval=check_interval)
+                self.assertGreater(engine.skipped_cycles, 0)
+
+    def test_block_engine_inside(self):
+        engine = self.run_both(blocks=True, check_interval=1)
+        self.assertGreater(engine.skipped_cycles, 0)
+
+    def test_max_cycles_inside_idle_window(self):
+        for max_cycles in range(1500, 1910, 13):
+            with self.subTest(max_cycles=max_cycles):
+                self.run_both(max_cycles=max_cycles, check_interval=1)
+
+    def test_long_block(self):
+        with open(PROGRAM) as f:
+            source = f.read().replace("505: ADD 73, 100 ", "505: ADD 73, 20000 ")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "long_block.gtu")
+            with open(path, "w") as f:
+                f.write(source)
+            engine = self.run_both(path)
+        self.assertGreater(engine.skipped_cycles, 20000)
+
+
+if __name__ == "__main__":
+    unittest.main()
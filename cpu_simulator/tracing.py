@@ -0,0 +1,87 @@
+# cpu_simulator/tracing.py
+"""
+CPU trace çıktısı için kalıcı, tamponlu hedef (trace sink).
+
+Eskiden run_cycle her döngüde instructions_output.txt dosyasını açıp kapatıyor ve
+sys.stdout'u geçici olarak değiştiriyordu. TraceSink çalışma başına bir kez oluşturulur
+ve CPU'ya verilir; satırlar bellekte biriktirilip topluca dosyaya yazılır.
+
+Kullanım:
+    with TraceSink("instructions_output.txt", mode="w", echo=sys.stdout) as sink:
+        cpu = CPU(trace=sink)
+        ...
+"""
+from __future__ import annotations
+from typing import List, Optional, TextIO
+
+FLUSH_ON_FULL = "full"    # Tampon buffer_size karaktere ulaşınca yaz
+FLUSH_EVERY_LINE = "line" # Her satırdan sonra yaz (crash durumunda hiçbir satır kaybolmaz)
+FLUSH_ON_CLOSE = "close"  # Sadece close()/flush() çağrılınca yaz
+
+_FLUSH_POLICIES = (FLUSH_ON_FULL, FLUSH_EVERY_LINE, FLUSH_ON_CLOSE)
+
+
+class TraceSink:
+    """Trace satırlarını tamponlayıp bir dosyaya (ve istenirse bir akışa) yazar.
+
+    *path*        – trace dosyası; None ise sadece *echo* akışına yazılır.
+    *mode*        – dosya açma modu ("a" veya "w").
+    *echo*        – her satırın anında kopyalanacağı akış (örn. sys.stdout) veya None.
+    *enabled*     – False ise CPU trace satırlarını hiç üretmez (döngüde maliyet yok).
+    *buffer_size* – FLUSH_ON_FULL politikasında dosyaya yazmadan önce biriken karakter sayısı.
+    *flush_policy* – FLUSH_ON_FULL, FLUSH_EVERY_LINE veya FLUSH_ON_CLOSE.
+    """
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 *,
+                 mode: str = "a",
+                 echo: Optional[TextIO] = None,
+                 enabled: bool = True,
+                 buffer_size: int = 64 * 1024,
+                 flush_policy: str = FLUSH_ON_FULL) -> None:
+        if flush_policy not in _FLUSH_POLICIES:
+            raise ValueError(f"Unknown flush policy {flush_policy!r}; expected one of {_FLUSH_POLICIES}")
+        self.path = path
+        self.echo = echo
+        self.enabled = enabled
+        self.buffer_size = buffer_size
+        self.flush_policy = flush_policy
+
+        self._pending: List[str] = []
+        self._pending_size = 0
+        # Dosya bir kez açılır; kendi tamponumuzu tuttuğumuz için Python tamponu kapatılmaz.
+        self._file = open(path, mode, encoding="utf-8") if (path and enabled) else None
+
+    def write(self, line: str) -> None:
+        """Tek bir trace satırı ekler (satır sonu eklenir)."""
+        if self.echo is not None:
+            print(line, file=self.echo)
+        if self._file is None:
+            return
+        self._pending.append(line)
+        self._pending_size += len(line) + 1
+        if self.flush_policy == FLUSH_EVERY_LINE or \
+           (self.flush_policy == FLUSH_ON_FULL and self._pending_size >= self.buffer_size):
+            self.flush()
+
+    def flush(self) -> None:
+        """Biriken satırları dosyaya yazar."""
+        if self._file is not None and self._pending:
+            self._pending.append("")  # son satırın da '\n' ile bitmesi için
+            self._file.write("\n".join(self._pending))
+            self._file.flush()
+            self._pending.clear()
+            self._pending_size = 0
+
+    def close(self) -> None:
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "TraceSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()